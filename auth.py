@@ -2,7 +2,61 @@ import streamlit as st
 from supabase import Client
 import re
 import hashlib
+import hmac
+import base64
+import threading
+import json
+import time
+from tracing import trace_methods
+from metrics import execute_query, record_cache
 
+SESSION_TTL_SECONDS = 7 * 24 * 3600  # Session tokens stay valid for a week
+SESSION_COOKIE = "neurobux_session"
+USER_CACHE_TTL_SECONDS = 300
+
+# In-process cache of auth_users profile rows, shared by every session on this server
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+def _cache_user(email, row):
+    with _user_cache_lock:
+        _user_cache[email] = (time.time() + USER_CACHE_TTL_SECONDS, row)
+
+def _cached_user(email):
+    with _user_cache_lock:
+        entry = _user_cache.get(email)
+        if entry and entry[0] > time.time():
+            return entry[1]
+        _user_cache.pop(email, None)
+        return None
+
+def _forget_user(email):
+    with _user_cache_lock:
+        _user_cache.pop(email, None)
+
+def _write_cookie(value, max_age):
+    # Streamlit can read cookies (st.context.cookies) but not set them, so a
+    # zero-height component sets it on the app's page from the browser
+    import streamlit.components.v1 as components
+    secure = "(location.protocol === 'https:' ? '; Secure' : '')"
+    components.html(
+        f"<script>window.parent.document.cookie = {json.dumps(f'{SESSION_COOKIE}={value}; path=/; max-age={max_age}; SameSite=Strict')} + {secure};</script>",
+        height=0,
+    )
+
+def remember_session(token):
+    """Keep a session token in a browser cookie so a refresh skips the login form"""
+    _write_cookie(token, SESSION_TTL_SECONDS)
+
+def forget_session():
+    """Remove the session cookie from the browser"""
+    _write_cookie("", 0)
+
+def session_cookie():
+    """The session token the browser sent with this request, if any"""
+    return st.context.cookies.get(SESSION_COOKIE)
+
+@trace_methods
 class AuthManager:
     def __init__(self, supabase_client: Client):
         self.supabase = supabase_client
@@ -40,7 +94,7 @@ class AuthManager:
                 return False, message
             
             # Check if user already exists
-            existing_user = self.supabase.table("auth_users").select("email").eq("email", email.lower().strip()).execute()
+            existing_user = execute_query(self.supabase.table("auth_users").select("email").eq("email", email.lower().strip()), "auth_users", "select")
             if existing_user.data:
                 return False, "An account with this email already exists"
             
@@ -51,7 +105,7 @@ class AuthManager:
                 "is_verified": False
             }
             
-            result = self.supabase.table("auth_users").insert(user_data).execute()
+            result = execute_query(self.supabase.table("auth_users").insert(user_data), "auth_users", "insert")
             
             return True, "Account created successfully! Please login with your credentials."
             
@@ -68,7 +122,7 @@ class AuthManager:
                 return False, "Please enter a valid email address"
             
             # Get user from database
-            user_result = self.supabase.table("auth_users").select("*").eq("email", email.lower().strip()).execute()
+            user_result = execute_query(self.supabase.table("auth_users").select("*").eq("email", email.lower().strip()), "auth_users", "select")
             
             if not user_result.data:
                 return False, "Invalid email or password"
@@ -80,7 +134,12 @@ class AuthManager:
                 return False, "Invalid email or password"
             
             # Update last login
-            self.supabase.table("auth_users").update({"last_login": "now()"}).eq("email", email.lower().strip()).execute()
+            execute_query(self.supabase.table("auth_users").update({"last_login": "now()"}).eq("email", email.lower().strip()), "auth_users", "update")
+            
+            # Keep the profile row in memory so the sidebar doesn't hit the database again
+            profile = {k: v for k, v in user.items() if k != "password_hash"}
+            profile["last_login"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+            _cache_user(user["email"], profile)
             
             return True, "Login successful!"
             
@@ -100,7 +159,7 @@ class AuthManager:
         """Change user password"""
         try:
             # Verify current password first
-            user_result = self.supabase.table("auth_users").select("*").eq("email", email.lower().strip()).execute()
+            user_result = execute_query(self.supabase.table("auth_users").select("*").eq("email", email.lower().strip()), "auth_users", "select")
             
             if not user_result.data:
                 return False, "User not found"
@@ -117,7 +176,9 @@ class AuthManager:
             
             # Update password
             new_hash = self._hash_password(new_password)
-            self.supabase.table("auth_users").update({"password_hash": new_hash}).eq("email", email.lower().strip()).execute()
+            execute_query(self.supabase.table("auth_users").update({"password_hash": new_hash}).eq("email", email.lower().strip()), "auth_users", "update")
+            _forget_user(email.lower().strip())
+            self.revoke_sessions(email)
             
             return True, "Password changed successfully!"
             
@@ -125,14 +186,78 @@ class AuthManager:
             return False, f"Password change failed: {str(e)}"
     
     def get_user_info(self, email):
-        """Get user information - THIS WAS THE MISSING METHOD"""
+        """Get user information, served from the in-process cache when possible"""
+        email = email.lower().strip()
+        cached = _cached_user(email)
+        record_cache("user_profile", cached is not None)
+        if cached:
+            return cached
         try:
-            user_result = self.supabase.table("auth_users").select("email, created_at, last_login, is_verified").eq("email", email.lower().strip()).execute()
+            user_result = execute_query(self.supabase.table("auth_users").select("email, created_at, last_login, is_verified").eq("email", email), "auth_users", "select")
             
             if user_result.data:
+                _cache_user(email, user_result.data[0])
                 return user_result.data[0]
             return None
             
         except Exception as e:
             st.error(f"Error fetching user info: {str(e)}")
             return None
+
+    def _session_secret(self):
+        """Key used to sign session tokens, or None when no dedicated session_secret is configured"""
+        secret = st.secrets.get("session_secret")
+        return secret.encode() if secret else None
+
+    def _session_version(self, email):
+        """Current session_version of a user; tokens issued under an older one are revoked"""
+        result = execute_query(self.supabase.table("auth_users").select("session_version").eq("email", email), "auth_users", "select")
+        return result.data[0]["session_version"] if result.data else None
+
+    def revoke_sessions(self, email):
+        """Invalidate every session token issued to this user so far"""
+        try:
+            execute_query(self.supabase.rpc("bump_session_version", {"p_email": email.lower().strip()}), "auth_users", "rpc")
+            return True
+        except Exception:
+            return False
+
+    def create_session_token(self, email, ttl=SESSION_TTL_SECONDS):
+        """
+        Create a signed token of the form payload.signature that expires after
+        ttl seconds, or None if sessions can't be signed (no session_secret).
+        """
+        secret = self._session_secret()
+        if not secret:
+            return None
+        email = email.lower().strip()
+        try:
+            version = self._session_version(email)
+        except Exception:
+            return None
+        if version is None:
+            return None
+        expires_at = int(time.time()) + ttl
+        payload = base64.urlsafe_b64encode(f"{email}|{version}|{expires_at}".encode()).decode().rstrip("=")
+        signature = hmac.new(secret, payload.encode(), hashlib.sha256).hexdigest()
+        return f"{payload}.{signature}"
+
+    def verify_session_token(self, token):
+        """Return the email inside a valid, unexpired, unrevoked session token, otherwise None"""
+        secret = self._session_secret()
+        if not secret or not token:
+            return None
+        try:
+            payload, signature = token.rsplit(".", 1)
+            expected = hmac.new(secret, payload.encode(), hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(signature, expected):
+                return None
+            padded = payload + "=" * (-len(payload) % 4)
+            email, version, expires_at = base64.urlsafe_b64decode(padded).decode().rsplit("|", 2)
+            if int(expires_at) < time.time():
+                return None
+            if self._session_version(email) != int(version):
+                return None
+            return email
+        except Exception:
+            return None
@@ -0,0 +1 @@
+"""Offline benchmarks for NeuroBux: synthetic ledgers, an in-memory backend and a runner."""
@@ -0,0 +1,433 @@
+"""
+In-memory stand-in for the Supabase client.
+
+Supports the subset of the PostgREST query builder that NeuroBux uses
+(table/select/filters/order/range/insert/update/delete/execute), so the
+managers and analyzers can be benchmarked without a network round trip.
+The database-side behaviour from migrations/ (triggers and RPCs)
+is emulated in Python.
+"""
+import itertools
+import math
+import threading
+import uuid
+from datetime import datetime, timezone
+
+
+class APIResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._action = "select"
+        self._columns = None
+        self._payload = None
+        self._count = None
+        self._filters = []
+        self._order = []
+        self._offset = 0
+        self._limit = None
+
+    # --- actions ---
+    def select(self, columns="*", count=None):
+        self._action = "select"
+        cols = [c.strip() for c in columns.split(",")]
+        self._columns = None if "*" in cols else cols
+        self._count = count
+        return self
+
+    def insert(self, data):
+        self._action = "insert"
+        self._payload = data if isinstance(data, list) else [data]
+        return self
+
+    def upsert(self, data, on_conflict="id"):
+        self._action = "upsert"
+        self._payload = data if isinstance(data, list) else [data]
+        self._conflict_keys = [k.strip() for k in on_conflict.split(",")]
+        return self
+
+    def update(self, data):
+        self._action = "update"
+        self._payload = data
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    # --- filters ---
+    def _filter(self, column, predicate):
+        self._filters.append((column, predicate))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._filter(column, lambda v: v in values)
+
+    def is_(self, column, value):
+        target = None if value in (None, "null") else value
+        return self._filter(column, lambda v: v is target)
+
+    def like(self, column, pattern):
+        return self._filter(column, _like_predicate(pattern, case_sensitive=True))
+
+    def ilike(self, column, pattern):
+        return self._filter(column, _like_predicate(pattern, case_sensitive=False))
+
+    # --- modifiers ---
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self._limit = size
+        return self
+
+    def range(self, start, end):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    # --- execution ---
+    def _matches(self, row):
+        return all(predicate(row.get(column)) for column, predicate in self._filters)
+
+    def execute(self):
+        with self._client._lock:
+            rows = self._client._tables.setdefault(self._table, [])
+            if self._action == "insert":
+                inserted = [self._client._new_row(self._table, r) for r in self._payload]
+                self._client._score_anomalies(self._table, inserted)
+                rows.extend(inserted)
+                self._client._after_insert(self._table, inserted)
+                self._client._track_stats(self._table, added=inserted)
+                self._client._bump_data_versions(self._table, inserted)
+                return APIResponse(inserted)
+            if self._action == "upsert":
+                index = {tuple(r.get(k) for k in self._conflict_keys): r for r in rows}
+                written, inserted, updated, before = [], [], [], []
+                for r in self._payload:
+                    existing = index.get(tuple(r.get(k) for k in self._conflict_keys))
+                    if existing is not None:
+                        if self._table in SUMMARY_KINDS:
+                            # keep_newest_write() from migrations/003_row_ids.sql
+                            if str(r.get("updated_at", "")) < str(existing.get("updated_at", "")):
+                                continue
+                            r = dict(r, server_updated_at=datetime.now(timezone.utc).isoformat())
+                        before.append(dict(existing))
+                        existing.update(r)
+                        self._client._rescore(self._table, before[-1], existing)
+                        updated.append(existing)
+                        written.append(existing)
+                    else:
+                        new = self._client._new_row(self._table, r)
+                        self._client._score_anomalies(self._table, [new])
+                        rows.append(new)
+                        inserted.append(new)
+                        written.append(new)
+                self._client._after_insert(self._table, inserted)
+                self._client._after_change(self._table, before + updated)
+                self._client._track_stats(self._table, added=inserted)
+                self._client._track_changes(self._table, before, updated)
+                self._client._bump_data_versions(self._table, written)
+                return APIResponse(written)
+            if self._action == "update":
+                matched = [r for r in rows if self._matches(r)]
+                touched = [dict(r) for r in matched]
+                for old, r in zip(touched, matched):
+                    r.update(self._payload)
+                    if self._table in SUMMARY_KINDS:
+                        r["server_updated_at"] = datetime.now(timezone.utc).isoformat()
+                    self._client._rescore(self._table, old, r)
+                self._client._after_change(self._table, touched + matched)
+                self._client._track_changes(self._table, touched, matched)
+                self._client._bump_data_versions(self._table, touched + matched)
+                return APIResponse(matched)
+            if self._action == "delete":
+                kept, removed = [], []
+                for r in rows:
+                    (removed if self._matches(r) else kept).append(r)
+                self._client._tables[self._table] = kept
+                self._client._record_deletes(self._table, removed)
+                self._client._after_change(self._table, removed)
+                self._client._track_stats(self._table, removed=removed)
+                self._client._bump_data_versions(self._table, removed)
+                return APIResponse(removed)
+
+            matched = [r for r in rows if self._matches(r)] if self._filters else list(rows)
+        count = len(matched) if self._count else None
+        for column, desc in reversed(self._order):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self._offset or self._limit is not None:
+            end = None if self._limit is None else self._offset + self._limit
+            matched = matched[self._offset:end]
+        if self._columns is not None:
+            matched = [{c: r.get(c) for c in self._columns} for r in matched]
+        else:
+            matched = [dict(r) for r in matched]
+        return APIResponse(matched, count)
+
+
+def _like_predicate(pattern, case_sensitive):
+    import re
+    regex = "^" + ".*".join(re.escape(part) for part in pattern.split("%")) + "$"
+    compiled = re.compile(regex, 0 if case_sensitive else re.IGNORECASE)
+    return lambda v: v is not None and compiled.match(str(v)) is not None
+
+
+class _RPC:
+    def __init__(self, client, fn, params):
+        self._client = client
+        self._fn = fn
+        self._params = params or {}
+
+    def execute(self):
+        handler = getattr(self._client, f"_rpc_{self._fn}", None)
+        if handler is None:
+            raise ValueError(f"Unknown RPC: {self._fn}")
+        with self._client._lock:
+            return APIResponse(handler(**self._params))
+
+
+SUMMARY_KINDS = {"expenses": "expense", "income": "income"}
+STATS_KEYS = ("user_email", "category", "amount_paise")
+ANOMALY_MIN_SAMPLES = 5
+
+
+class InMemoryClient:
+    """Thread-safe, dict-backed replacement for supabase.Client"""
+
+    def __init__(self, tables=None):
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._tables = {}
+        for name, rows in (tables or {}).items():
+            self.load(name, rows)
+
+    def _new_row(self, table, row):
+        new = dict(row)
+        new.setdefault("id", next(self._ids))
+        new.setdefault("created_at", datetime.now().isoformat())
+        if table in SUMMARY_KINDS:
+            # migrations/003_row_ids.sql column defaults
+            stamp = datetime.now(timezone.utc).isoformat()
+            new.setdefault("row_id", str(uuid.uuid4()))
+            new.setdefault("updated_at", stamp)
+            new["server_updated_at"] = stamp
+        return new
+
+    def load(self, table, rows):
+        """Bulk-load rows without going through the query builder"""
+        with self._lock:
+            loaded = [self._new_row(table, r) for r in rows]
+            # Scored one row at a time, like the history backfill in migrations/005
+            for r in loaded:
+                self._score_anomalies(table, [r])
+                self._track_stats(table, added=[r])
+            self._tables.setdefault(table, []).extend(loaded)
+            self._after_insert(table, loaded)
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, fn, params=None):
+        return _RPC(self, fn, params)
+
+    # --- emulation of migrations/001_monthly_summaries.sql ---
+    def _summary_rows(self):
+        return {(r["user_email"], r["kind"], r["month"]): r for r in self._tables.setdefault("monthly_summaries", [])}
+
+    def _after_insert(self, table, rows):
+        kind = SUMMARY_KINDS.get(table)
+        if not kind or not rows:
+            return
+        summaries = self._summary_rows()
+        for r in rows:
+            key = (r["user_email"], kind, str(r["date"])[:7])
+            s = summaries.get(key)
+            if s is None:
+                s = {"user_email": key[0], "kind": kind, "month": key[2], "total_paise": 0, "txn_count": 0,
+                     "min_paise": None, "max_paise": None, "category_totals": {}}
+                summaries[key] = s
+                self._tables["monthly_summaries"].append(s)
+            paise = r["amount_paise"]
+            s["total_paise"] += paise
+            s["txn_count"] += 1
+            s["min_paise"] = paise if s["min_paise"] is None else min(s["min_paise"], paise)
+            s["max_paise"] = paise if s["max_paise"] is None else max(s["max_paise"], paise)
+            if kind == "expense":
+                s["category_totals"][r["category"]] = s["category_totals"].get(r["category"], 0) + paise
+        if kind == "expense":
+            self._fold_daily(rows)
+
+    def _after_change(self, table, rows):
+        kind = SUMMARY_KINDS.get(table)
+        if not kind or not rows:
+            return
+        keys = {(r["user_email"], str(r["date"])[:7]) for r in rows}
+        self._tables["monthly_summaries"] = [
+            s for s in self._tables.setdefault("monthly_summaries", [])
+            if not (s["kind"] == kind and (s["user_email"], s["month"]) in keys)
+        ]
+        if kind == "expense":
+            # Whole months are refolded below, so their days start again from zero
+            self._tables["daily_summaries"] = [
+                d for d in self._tables.setdefault("daily_summaries", [])
+                if (d["user_email"], d["day"][:7]) not in keys
+            ]
+        self._after_insert(table, [r for r in self._tables.get(table, [])
+                                   if (r["user_email"], str(r["date"])[:7]) in keys])
+
+    def _rpc_rebuild_monthly_summaries(self, p_user=None):
+        self._tables["monthly_summaries"] = [
+            s for s in self._tables.get("monthly_summaries", []) if p_user is not None and s["user_email"] != p_user
+        ]
+        for table in SUMMARY_KINDS:
+            self._after_insert(table, [r for r in self._tables.get(table, []) if p_user is None or r["user_email"] == p_user])
+        return sum(1 for s in self._tables["monthly_summaries"] if p_user is None or s["user_email"] == p_user)
+
+    # --- emulation of migrations/009_daily_summaries.sql ---
+    def _fold_daily(self, rows):
+        days = {(d["user_email"], d["day"]): d for d in self._tables.setdefault("daily_summaries", [])}
+        for r in rows:
+            if not r.get("date"):
+                continue
+            key = (r["user_email"], str(r["date"])[:10])
+            d = days.get(key)
+            if d is None:
+                d = {"user_email": key[0], "day": key[1], "total_paise": 0, "txn_count": 0}
+                days[key] = d
+                self._tables["daily_summaries"].append(d)
+            d["total_paise"] += r["amount_paise"]
+            d["txn_count"] += 1
+
+    def _rpc_rebuild_daily_summaries(self, p_user=None):
+        self._tables["daily_summaries"] = [
+            d for d in self._tables.get("daily_summaries", []) if p_user is not None and d["user_email"] != p_user
+        ]
+        self._fold_daily([r for r in self._tables.get("expenses", []) if p_user is None or r["user_email"] == p_user])
+        return sum(1 for d in self._tables["daily_summaries"] if p_user is None or d["user_email"] == p_user)
+
+    # --- emulation of migrations/002_analytics_cache.sql ---
+    def _bump_data_versions(self, table, rows):
+        if table not in SUMMARY_KINDS or not rows:
+            return
+        versions = {r["user_email"]: r for r in self._tables.setdefault("user_data_versions", [])}
+        for user in {r["user_email"] for r in rows}:
+            if user in versions:
+                versions[user]["version"] += 1
+            else:
+                self._tables["user_data_versions"].append({"user_email": user, "version": 1})
+
+    # --- emulation of migrations/005_anomaly_flags.sql ---
+    def _category_stats(self):
+        return {(r["user_email"], r["category"]): r for r in self._tables.setdefault("category_stats", [])}
+
+    def _score_anomalies(self, table, rows):
+        """score_expense_anomaly(): z-score against the statistics before this write"""
+        if table != "expenses" or not rows:
+            return
+        stats = self._category_stats()
+        for r in rows:
+            r["anomaly_z"] = r["anomaly_severity"] = None
+            s = stats.get((r["user_email"], r["category"]))
+            if s and s["n"] >= ANOMALY_MIN_SAMPLES and s["m2"] > 0:
+                z = (r["amount_paise"] - s["mean"]) / math.sqrt(s["m2"] / (s["n"] - 1))
+                r["anomaly_z"] = z
+                r["anomaly_severity"] = "high" if abs(z) > 3 else "medium" if abs(z) > 2 else None
+
+    def _rescore(self, table, old, new):
+        if table != "expenses":
+            return
+        if all(old.get(k) == new.get(k) for k in STATS_KEYS):
+            new["anomaly_z"], new["anomaly_severity"] = old.get("anomaly_z"), old.get("anomaly_severity")
+        else:
+            self._score_anomalies(table, [new])
+
+    def _track_stats(self, table, added=(), removed=()):
+        """category_stats_after_write(), one row at a time with Welford's update"""
+        if table != "expenses":
+            return
+        stats = self._category_stats()
+        for r in added:
+            key = (r["user_email"], r["category"])
+            s = stats.get(key)
+            if s is None:
+                s = stats[key] = {"user_email": key[0], "category": key[1], "n": 0, "mean": 0.0, "m2": 0.0}
+                self._tables["category_stats"].append(s)
+            s["n"] += 1
+            delta = r["amount_paise"] - s["mean"]
+            s["mean"] += delta / s["n"]
+            s["m2"] += delta * (r["amount_paise"] - s["mean"])
+        for r in removed:
+            s = stats.get((r["user_email"], r["category"]))
+            if s is None:
+                continue
+            if s["n"] <= 1:
+                self._tables["category_stats"].remove(s)
+                del stats[(r["user_email"], r["category"])]
+                continue
+            mean = (s["n"] * s["mean"] - r["amount_paise"]) / (s["n"] - 1)
+            s["m2"] = max(s["m2"] - (r["amount_paise"] - mean) * (r["amount_paise"] - s["mean"]), 0.0)
+            s["mean"] = mean
+            s["n"] -= 1
+
+    def _track_changes(self, table, before, after):
+        changed = [(old, new) for old, new in zip(before, after) if any(old.get(k) != new.get(k) for k in STATS_KEYS)]
+        self._track_stats(table, added=[new for _, new in changed], removed=[old for old, _ in changed])
+
+    def _rpc_rebuild_category_stats(self, p_user=None):
+        self._tables["category_stats"] = [
+            s for s in self._tables.get("category_stats", []) if p_user is not None and s["user_email"] != p_user
+        ]
+        self._track_stats("expenses", added=[r for r in self._tables.get("expenses", []) if p_user is None or r["user_email"] == p_user])
+        return sum(1 for s in self._tables["category_stats"] if p_user is None or s["user_email"] == p_user)
+
+    # --- emulation of migrations/011_deleted_rows.sql ---
+    def _record_deletes(self, table, rows):
+        if table not in SUMMARY_KINDS or not rows:
+            return
+        stamp = datetime.now(timezone.utc).isoformat()
+        tombstones = {(d["table_name"], d["row_id"]): d for d in self._tables.setdefault("deleted_rows", [])}
+        for r in rows:
+            d = tombstones.get((table, r["row_id"]))
+            if d is None:
+                self._tables["deleted_rows"].append({"table_name": table, "row_id": r["row_id"],
+                                                     "user_email": r["user_email"], "deleted_at": stamp})
+            else:
+                d.update(user_email=r["user_email"], deleted_at=stamp)
+
+    # --- emulation of migrations/010_session_versions.sql ---
+    def _rpc_bump_session_version(self, p_email):
+        for user in self._tables.get("auth_users", []):
+            if user["email"] == p_email:
+                user["session_version"] = user.get("session_version", 0) + 1
+                return [{"session_version": user["session_version"]}]
+        return []
+
+    def row_count(self, table):
+        return len(self._tables.get(table, []))
@@ -0,0 +1,187 @@
+"""
+Offline benchmark runner.
+
+    python -m benchmarks.run                                  # 1k / 100k / 1M rows
+    python -m benchmarks.run --sizes 1000 10000 --out bench.json
+    python -m benchmarks.run --baseline bench_prev.json       # flag regressions
+
+Every size gets a fresh in-memory backend loaded with a synthetic ledger for one
+user, so the numbers cover NeuroBux's own code plus query building, not network.
+Each size also reports the memory of the analytics frame against the wide
+select("*") frame it replaced.
+"""
+import argparse
+import io
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.backend import InMemoryClient
+from benchmarks.synthetic import generate_ledger, ledger_to_csv, user_email
+from money import display_frame
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+REGRESSION_THRESHOLD = 1.2  # 20% slower than baseline
+
+
+def _timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"min_s": min(times), "median_s": statistics.median(times), "repeat": repeat}
+
+
+def _frame_memory(client, user):
+    """Deep bytes of analytics_frame vs a select("*") frame with string day/month columns"""
+    from database import ANALYTICS_COLUMNS, analytics_frame
+
+    wide = pd.DataFrame(client.table("expenses").select("*").eq("user_email", user).execute().data)
+    wide["date"] = pd.to_datetime(wide["date"])
+    wide["day_name"] = wide["date"].dt.day_name()
+    wide["month_year"] = wide["date"].dt.to_period("M").astype(str)
+    compact = analytics_frame(client.table("expenses").select(ANALYTICS_COLUMNS).eq("user_email", user).execute().data)
+    wide_bytes = int(wide.memory_usage(deep=True).sum())
+    compact_bytes = int(compact.memory_usage(deep=True).sum())
+    return {"compact_bytes": compact_bytes, "wide_bytes": wide_bytes, "ratio": wide_bytes / compact_bytes}
+
+
+def run_size(size, repeat, pdf_max_rows, import_max_rows):
+    # Imported here so the app modules pick up the quieted streamlit logger
+    from database import ExpenseManager, IncomeManager, SpendingAnalyzer, MonthlySummaryManager
+    from synbot import SynBot
+    from utils import export_df_to_pdf, import_transactions_csv
+
+    ledger = generate_ledger(n_users=1, expenses_per_user=size)
+    client = InMemoryClient(ledger)
+    user = user_email(0)
+
+    exp_mgr = ExpenseManager()
+    inc_mgr = IncomeManager()
+    exp_mgr.supabase = client
+    inc_mgr.supabase = client
+    analyzer = SpendingAnalyzer(client)
+
+    results = {}
+    results["get_expenses"] = _timed(lambda: exp_mgr.get_expenses(user), repeat)
+    latest_month = max(r["date"] for r in ledger["expenses"])[:7]
+    results["get_expenses_month"] = _timed(lambda: exp_mgr.get_expenses(user, latest_month), repeat)
+    summaries = MonthlySummaryManager(client)
+    results["monthly_summary"] = _timed(lambda: summaries.get_month_summary(user, latest_month), repeat)
+    results["all_time_summary"] = _timed(lambda: summaries.get_all_time_summary(user), repeat)
+    results["detect_spending_patterns"] = _timed(lambda: analyzer.detect_spending_patterns(user), repeat)
+    results["analytics_frame_memory"] = _frame_memory(client, user)
+
+    # Cross-user batch mode on a separate 50-user ledger of the same total size
+    batch_users = [user_email(i) for i in range(50)]
+    batch_analyzer = SpendingAnalyzer(InMemoryClient(generate_ledger(n_users=50, expenses_per_user=max(size // 50, 1))))
+    results["detect_spending_patterns_batch_50"] = _timed(
+        lambda: batch_analyzer.detect_spending_patterns_batch(batch_users), repeat)
+
+    df = pd.DataFrame(ledger["expenses"])
+    df["date"] = pd.to_datetime(df["date"])
+    results["_detect_anomalies"] = _timed(lambda: analyzer._detect_anomalies(df), repeat)
+
+    df_exp = pd.DataFrame(exp_mgr.get_expenses(user), columns=["User", "Category", "Paise", "Date"])
+    df_inc = pd.DataFrame(inc_mgr.get_income(user), columns=["User", "Paise", "Date"])
+    patterns = analyzer.detect_spending_patterns(user)
+    analytics_data = {"peak_day": patterns["peak_spending_day"], "trend": patterns["spending_trend"],
+                      "top_category": patterns["top_category"]}
+    bot = SynBot.__new__(SynBot)  # Skip the API key check; the summary never calls out
+    results["SynBot._format_financial_summary"] = _timed(
+        lambda: bot._format_financial_summary(df_exp, df_inc, analytics_data), repeat)
+
+    from categorizer import get_categorizer, default_rules
+    keywords = [k.upper() for k, _, _ in default_rules()] + ["UNKNOWN MERCHANT"]
+    descriptions = pd.Series([f"UPI/{keywords[i % len(keywords)]}/{i % 997}" for i in range(size)])
+    categorizer = get_categorizer()
+    results["categorize"] = _timed(lambda: categorizer.categorize(descriptions), repeat)
+
+    if size <= pdf_max_rows:
+        export_df = display_frame(df_exp.drop(columns=["User"]))
+        results["export_df_to_pdf"] = _timed(lambda: export_df_to_pdf(export_df), 1)
+    else:
+        results["export_df_to_pdf"] = {"skipped": f"size > --pdf-max-rows ({pdf_max_rows})"}
+
+    if size <= import_max_rows:
+        csv_text = ledger_to_csv(ledger["expenses"])
+        import_client = InMemoryClient()
+        exp_mgr.supabase = import_client
+        results["csv_import"] = _timed(
+            lambda: import_transactions_csv(io.StringIO(csv_text), "import@example.com", exp_mgr, inc_mgr), 1)
+        exp_mgr.supabase = client
+    else:
+        results["csv_import"] = {"skipped": f"size > --import-max-rows ({import_max_rows})"}
+
+    return results
+
+
+def compare(report, baseline):
+    """Return (size, benchmark, ratio) for every benchmark slower (or, for memory, bigger) than the baseline threshold"""
+    regressions = []
+    for size, benches in report["results"].items():
+        for name, timing in benches.items():
+            before = baseline.get("results", {}).get(size, {}).get(name, {})
+            for key in ("min_s", "compact_bytes"):
+                if key in timing and before.get(key):
+                    ratio = timing[key] / before[key]
+                    if ratio > REGRESSION_THRESHOLD:
+                        regressions.append((size, name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run NeuroBux offline benchmarks")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf-max-rows", type=int, default=10_000,
+                        help="Skip the PDF export above this many rows (fpdf renders cell by cell)")
+    parser.add_argument("--import-max-rows", type=int, default=100_000,
+                        help="Skip the CSV import above this many rows")
+    parser.add_argument("--out", default="bench_output.json")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"Running {size:,} rows...", flush=True)
+        report["results"][str(size)] = run_size(size, args.repeat, args.pdf_max_rows, args.import_max_rows)
+        for name, timing in report["results"][str(size)].items():
+            if "min_s" in timing:
+                shown = f"{timing['min_s'] * 1000:10.1f} ms"
+            elif "compact_bytes" in timing:
+                shown = (f"{timing['compact_bytes'] / 2**20:10.1f} MB"
+                         f"  (select * frame {timing['wide_bytes'] / 2**20:.1f} MB, {timing['ratio']:.1f}x)")
+            else:
+                shown = f"  {timing['skipped']}"
+            print(f"  {name:<36}{shown}")
+
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(report, json.load(fh))
+        for size, name, ratio in regressions:
+            print(f"REGRESSION {name} @ {size} rows: {ratio:.2f}x the baseline")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
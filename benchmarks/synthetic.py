@@ -0,0 +1,100 @@
+"""
+Deterministic synthetic ledger generator.
+
+Produces Supabase-shaped rows for N users with M expenses and K incomes each.
+Categories follow a skewed popularity distribution with per-category log-normal
+amounts, weekends are busier than weekdays, and every user pays rent on the 1st
+and gets a salary at the start of each month.
+"""
+import numpy as np
+import pandas as pd
+
+from money import rupee_text
+
+# (category, relative frequency, median amount in ₹, log-normal sigma)
+CATEGORIES = [
+    ("Food", 30, 250, 0.6),
+    ("Groceries", 15, 900, 0.5),
+    ("Transport", 14, 150, 0.7),
+    ("Shopping", 10, 1500, 0.9),
+    ("Entertainment", 7, 600, 0.7),
+    ("Utilities", 5, 1800, 0.4),
+    ("Health", 4, 1200, 0.8),
+    ("Travel", 3, 6000, 0.9),
+    ("Education", 2, 3000, 0.6),
+    ("Subscriptions", 6, 499, 0.2),
+    ("Misc", 4, 300, 1.0),
+]
+RENT = 18000
+WEEKDAY_WEIGHTS = np.array([1.0, 0.9, 0.9, 1.0, 1.2, 1.6, 1.5])  # Mon..Sun
+
+
+def user_email(i):
+    return f"bench_user_{i:05d}@example.com"
+
+
+def generate_ledger(n_users=1, expenses_per_user=1000, incomes_per_user=None,
+                    start="2022-01-01", end="2025-12-31", seed=42):
+    """
+    Return {"auth_users": [...], "expenses": [...], "income": [...]} row lists.
+    The same arguments always produce the same rows.
+    """
+    rng = np.random.default_rng(seed)
+    if incomes_per_user is None:
+        incomes_per_user = max(1, expenses_per_user // 20)
+
+    days = pd.date_range(start, end, freq="D")
+    day_weights = WEEKDAY_WEIGHTS[days.dayofweek]
+    day_weights = day_weights / day_weights.sum()
+    month_starts = days[days.day == 1]
+
+    names = np.array([c[0] for c in CATEGORIES])
+    freq = np.array([c[1] for c in CATEGORIES], dtype=float)
+    medians = np.array([c[2] for c in CATEGORIES], dtype=float)
+    sigmas = np.array([c[3] for c in CATEGORIES], dtype=float)
+
+    auth_users, expenses, income = [], [], []
+    for u in range(n_users):
+        email = user_email(u)
+        auth_users.append({
+            "email": email,
+            "password_hash": "",
+            "is_verified": True,
+            "created_at": f"{start}T00:00:00",
+            "last_login": f"{end}T00:00:00",
+        })
+
+        # Rent takes a slot of the expense budget each month, the rest is day-to-day spending
+        n_rent = min(len(month_starts), expenses_per_user // 10)
+        n_daily = expenses_per_user - n_rent
+        cat_idx = rng.choice(len(CATEGORIES), size=n_daily, p=freq / freq.sum())
+        amounts = np.round(medians[cat_idx] * rng.lognormal(0, sigmas[cat_idx]) * 100).astype(np.int64)  # paise
+        dates = days[rng.choice(len(days), size=n_daily, p=day_weights)].strftime("%Y-%m-%d")
+        categories = names[cat_idx]
+
+        rent_dates = month_starts[-n_rent:].strftime("%Y-%m-%d") if n_rent else []
+        expenses.extend(
+            {"user_email": email, "category": c, "amount_paise": int(a), "date": d}
+            for c, a, d in zip(categories, amounts, dates)
+        )
+        expenses.extend(
+            {"user_email": email, "category": "Rent", "amount_paise": RENT * 100, "date": d}
+            for d in rent_dates
+        )
+
+        salary = int(round(rng.uniform(40000, 150000), -3)) * 100
+        income_dates = month_starts[-incomes_per_user:] if incomes_per_user <= len(month_starts) \
+            else days[np.sort(rng.choice(len(days), size=incomes_per_user))]
+        income.extend(
+            {"user_email": email, "amount_paise": salary, "date": d}
+            for d in income_dates.strftime("%Y-%m-%d")
+        )
+
+    return {"auth_users": auth_users, "expenses": expenses, "income": income}
+
+
+def ledger_to_csv(expenses):
+    """Render expense rows as the CSV format accepted by the Add Transaction import"""
+    df = pd.DataFrame(expenses, columns=["category", "amount_paise", "date"])
+    df["amount_paise"] = df["amount_paise"].map(rupee_text)
+    return df.rename(columns={"category": "Category", "amount_paise": "Amount", "date": "Date"}).to_csv(index=False)
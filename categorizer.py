@@ -0,0 +1,148 @@
+"""
+Rule-based auto-categorization for imported bank descriptions.
+
+User rules (category_rules table) and the defaults below are ordered, and
+the earliest matching rule wins: user rules first, then the defaults.
+Keyword rules compile into one prefix trie (so each position in a
+description costs one character-class test, not one test per keyword),
+scanned with a lookahead so keywords that overlap are all seen. Regex rules
+are compiled one by one and only tried while they could still beat the best
+keyword found. A column of descriptions is lower-cased and factorized first,
+so all this runs once per distinct description; bank exports repeat the
+same merchants over and over.
+"""
+import functools
+import re
+from metrics import execute_query
+
+UNCATEGORIZED = "Uncategorized"
+
+# category -> keywords (case-insensitive; must start a word, so "ola" doesn't match "cola")
+DEFAULT_RULES = {
+    "Rent": ["rent", "landlord", "nobroker"],
+    "Food": ["swiggy", "zomato", "restaurant", "cafe", "coffee", "starbucks", "domino", "pizza", "mcdonald", "kfc", "eatsure"],
+    "Groceries": ["bigbasket", "blinkit", "zepto", "dmart", "grofers", "instamart", "supermarket", "grocery", "reliance fresh", "more retail"],
+    "Transport": ["uber", "ola", "rapido", "metro", "irctc", "fuel", "petrol", "diesel", "hpcl", "bpcl", "indian oil", "fastag", "parking"],
+    "Shopping": ["amazon", "flipkart", "myntra", "ajio", "meesho", "nykaa", "decathlon", "ikea"],
+    "Subscriptions": ["netflix", "spotify", "prime video", "hotstar", "youtube premium", "apple.com", "google storage", "icloud"],
+    "Entertainment": ["bookmyshow", "pvr", "inox", "steam", "playstation"],
+    "Utilities": ["electricity", "bescom", "tata power", "adani", "water bill", "gas bill", "broadband", "airtel", "jio", "vodafone", "bsnl", "recharge"],
+    "Health": ["pharmacy", "apollo", "medplus", "1mg", "pharmeasy", "hospital", "clinic", "diagnostic", "practo"],
+    "Travel": ["makemytrip", "goibibo", "cleartrip", "indigo", "air india", "vistara", "akasa", "oyo", "airbnb", "booking.com"],
+    "Education": ["udemy", "coursera", "byju", "unacademy", "school fee", "tuition", "college"],
+}
+
+def _trie_pattern(words):
+    """Regex matching exactly the given words, factored by common prefix"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # End of a word
+
+    def emit(node):
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+class Categorizer:
+    def __init__(self, rules):
+        """rules: ordered (pattern, category, is_regex) tuples; earlier rules win"""
+        self.categories = []
+        self._regex_rules = []  # (rule, compiled), in rule order
+        keyword_rule = {}
+        for pattern, category, is_regex in rules:
+            if not pattern.strip():
+                continue
+            if is_regex:
+                try:
+                    regex = re.compile(pattern, re.IGNORECASE)
+                except re.error:
+                    continue  # add_rule rejects these; one stored before that shouldn't break the rest
+            rule = len(self.categories)
+            self.categories.append(category)
+            if is_regex:
+                self._regex_rules.append((rule, regex))
+            else:
+                keyword_rule.setdefault(pattern.strip().lower(), rule)
+        # The trie matches the longest keyword at a position; any shorter keyword it starts with matched too
+        self._keyword_rule = {
+            word: min(keyword_rule[word[:i]] for i in range(1, len(word) + 1) if word[:i] in keyword_rule)
+            for word in keyword_rule
+        }
+        self._keywords = None
+        if keyword_rule:
+            self._keywords = re.compile(r"(?<![a-z])(?=(?P<kw>" + _trie_pattern(keyword_rule) + "))")
+
+    def _rule_for(self, text):
+        """Index of the highest-priority rule matching lower-cased text, or -1"""
+        best = -1
+        if self._keywords is not None:
+            for m in self._keywords.finditer(text):
+                rule = self._keyword_rule[m.group("kw")]
+                if best < 0 or rule < best:
+                    best = rule
+        for rule, regex in self._regex_rules:
+            if best >= 0 and rule > best:
+                break
+            if regex.search(text):
+                return rule
+        return best
+
+    def categorize(self, descriptions, default=UNCATEGORIZED):
+        """Series of descriptions -> Series of categories (same index)"""
+        import numpy as np
+        import pandas as pd
+        codes, uniques = pd.factorize(descriptions.fillna("").astype(str).str.lower(), sort=False)
+        if not len(uniques) or not self.categories:
+            return pd.Series(default, index=descriptions.index)
+        lookup = np.array(self.categories + [default], dtype=object)
+        rule = np.fromiter(map(self._rule_for, uniques), dtype=np.int64, count=len(uniques))
+        return pd.Series(lookup[rule[codes]], index=descriptions.index)
+
+def default_rules():
+    return [(keyword, category, False) for category, keywords in DEFAULT_RULES.items() for keyword in keywords]
+
+@functools.lru_cache(maxsize=64)
+def _compiled(rules):
+    return Categorizer(rules)
+
+def get_categorizer(user_rules=()):
+    """Compiled categorizer for a user's rules followed by the defaults (cached per rule set)"""
+    return _compiled(tuple(user_rules) + tuple(default_rules()))
+
+class CategoryRuleManager:
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    def get_rules(self, user):
+        """User rule rows (id, pattern, category, is_regex), highest priority first"""
+        if not self.supabase: return []
+        try:
+            result = execute_query(
+                self.supabase.table("category_rules").select("id, pattern, category, is_regex")
+                .eq("user_email", user).order("priority").order("id"),
+                "category_rules", "select")
+            return result.data
+        except Exception:
+            return []  # Table missing until migrations/004 is applied; defaults still work
+
+    def add_rule(self, user, pattern, category, is_regex=False):
+        if is_regex:
+            re.compile(pattern)  # Raises re.error for the caller to show
+        execute_query(self.supabase.table("category_rules").insert(
+            {"user_email": user, "pattern": pattern, "category": category, "is_regex": is_regex}),
+            "category_rules", "insert")
+
+    def delete_rule(self, user, rule_id):
+        execute_query(self.supabase.table("category_rules").delete().eq("user_email", user).eq("id", rule_id),
+                      "category_rules", "delete")
+
+    def get_categorizer(self, user):
+        rules = self.get_rules(user)
+        return get_categorizer((r["pattern"], r["category"], bool(r["is_regex"])) for r in rules)
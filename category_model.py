@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from database import get_data_version
+from tracing import trace_methods
+from metrics import execute_query, record_cache
+from money import rupees
+
+MIN_TRAINING_ROWS = 20
+DEFAULT_MODEL_DIR = ".neurobux_models"
+AMOUNT_EDGES = np.logspace(0, 6, 25)  # ₹1 .. ₹10L, log-spaced
+
+class _CategoryClassifier:
+    """
+    Text + amount + weekday classifier for one user's categories.
+
+    Descriptions go through a stateless hashing vectorizer (character n-grams,
+    so "SWIGGY*ORDER 123" and "swiggy" share features); amount is one-hot on a
+    log scale and weekday one-hot, so everything stays non-negative for
+    Complement Naive Bayes, which trains and predicts in a few milliseconds.
+    """
+    def __init__(self):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.vectorizer = HashingVectorizer(analyzer="char_wb", ngram_range=(3, 5), n_features=2 ** 16,
+                                            alternate_sign=False, norm="l2")
+        self.model = None
+
+    def _features(self, descriptions, amounts, dates):
+        """amounts are paise; buckets are in rupees so saved models keep their meaning"""
+        n = len(amounts)
+        # Vectorize each distinct description once; imports repeat merchants heavily
+        codes, uniques = pd.factorize(pd.Series(descriptions).fillna("").astype(str).str.lower(), sort=False)
+        text = self.vectorizer.transform(uniques)[codes]
+        bucket = np.searchsorted(AMOUNT_EDGES, rupees(np.asarray(amounts, dtype=float)))
+        amount = sparse.csr_matrix((np.ones(n), (np.arange(n), bucket)), shape=(n, len(AMOUNT_EDGES) + 1))
+        weekday = pd.to_datetime(pd.Series(dates), errors="coerce").dt.weekday.fillna(0).astype(int).to_numpy()
+        day = sparse.csr_matrix((np.ones(n), (np.arange(n), weekday)), shape=(n, 7))
+        return sparse.hstack([text, amount, day], format="csr")
+
+    def fit(self, df):
+        from sklearn.naive_bayes import ComplementNB
+        self.model = ComplementNB(alpha=0.3).fit(
+            self._features(df['description'], df['amount_paise'], df['date']), df['category'].to_numpy())
+        return self
+
+    def predict(self, descriptions, amounts, dates):
+        return self.model.predict(self._features(descriptions, amounts, dates))
+
+@trace_methods
+class CategoryPredictor:
+    """
+    Per-user classifiers, cached in memory by data version and on disk by a hash of
+    the training rows, so a restart reloads instead of retraining. Once a user has a
+    model, a write only schedules a background refit; the previous model keeps
+    answering until the new one is ready, so saving an entry never waits on training.
+    """
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR):
+        self.model_dir = model_dir
+        self._models = {}
+        self._refitting = set()
+        self._lock = threading.Lock()
+
+    def _training_frame(self, client, user):
+        result = execute_query(client.table("expenses").select("*").eq("user_email", user), "expenses", "select")
+        df = pd.DataFrame(result.data)
+        if df.empty:
+            return df
+        if 'description' not in df:
+            df['description'] = ""
+        df = df[['category', 'amount_paise', 'date', 'description']].dropna(subset=['category', 'amount_paise', 'date'])
+        df['description'] = df['description'].fillna("")
+        return df
+
+    def _path(self, user):
+        return os.path.join(self.model_dir, hashlib.sha1(user.encode()).hexdigest() + ".joblib")
+
+    def get_model(self, client, user):
+        """The user's classifier, or None until they have enough labelled history"""
+        version = get_data_version(user)
+        with self._lock:
+            entry = self._models.get(user)
+            stale = entry is not None and entry[0] != version
+            refit = stale and user not in self._refitting
+            if refit:
+                self._refitting.add(user)
+        record_cache("category_model", entry is not None and entry[0] == version)
+        if entry is None:
+            return self._fit(client, user, version)
+        if refit:
+            threading.Thread(target=self._refit, args=(client, user, version),
+                             name="category-model-refit", daemon=True).start()
+        return entry[1]
+
+    def _refit(self, client, user, version):
+        try:
+            self._fit(client, user, version)
+        except Exception:
+            pass  # The previous model keeps serving; the next version change retries
+        finally:
+            with self._lock:
+                self._refitting.discard(user)
+
+    def _fit(self, client, user, version):
+        import joblib
+        df = self._training_frame(client, user)
+        classifier = None
+        if len(df) >= MIN_TRAINING_ROWS and df['category'].nunique() >= 2:
+            fingerprint = int(pd.util.hash_pandas_object(df, index=False).sum())
+            path = self._path(user)
+            try:
+                saved = joblib.load(path)
+                if saved['fingerprint'] == fingerprint:
+                    classifier = saved['classifier']
+            except Exception:
+                pass  # Missing or unreadable file; retrain below
+            if classifier is None:
+                classifier = _CategoryClassifier().fit(df)
+                try:
+                    os.makedirs(self.model_dir, exist_ok=True)
+                    joblib.dump({'fingerprint': fingerprint, 'classifier': classifier}, path)
+                except OSError:
+                    pass  # Read-only filesystem: the in-memory copy still works
+        with self._lock:
+            self._models[user] = (version, classifier)
+        return classifier
+
+    def predict(self, client, user, descriptions, amounts, dates):
+        """Batch prediction; None when the user has no model yet"""
+        classifier = self.get_model(client, user)
+        if classifier is None:
+            return None
+        return classifier.predict(descriptions, amounts, dates)
+
+    def suggest(self, client, user, description, amount, date):
+        """Single-entry suggestion for the manual form, or None"""
+        predicted = self.predict(client, user, [description or ""], [amount], [date])
+        return None if predicted is None else str(predicted[0])
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    global _predictor
+    with _predictor_lock:
+        if _predictor is None:
+            import streamlit as st
+            try:
+                model_dir = st.secrets.get("model_cache_dir", DEFAULT_MODEL_DIR)
+            except Exception:
+                model_dir = DEFAULT_MODEL_DIR
+            _predictor = CategoryPredictor(model_dir)
+        return _predictor
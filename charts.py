@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+from database import get_data_version
+from tracing import span
+from metrics import record_cache
+
+MAX_CACHED_FIGURES = 256
+
+# Figures shared across sessions, keyed on (user, chart id, data version, month)
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+def cached_figure(user, chart_id, month, build):
+    """
+    Return the figure for this chart, calling build() only when the user's data
+    has changed since it was last built. Old versions age out of the LRU.
+    """
+    key = (user, chart_id, get_data_version(user), month)
+    with _figure_cache_lock:
+        fig = _figure_cache.get(key)
+        record_cache("figure", fig is not None)
+        if fig is not None:
+            _figure_cache.move_to_end(key)
+            return fig
+
+    with span(f"figure:{chart_id}"):
+        fig = build()
+
+    with _figure_cache_lock:
+        _figure_cache[key] = fig
+        while len(_figure_cache) > MAX_CACHED_FIGURES:
+            _figure_cache.popitem(last=False)
+    return fig
+
+# Rollup granularities offered in the UI, mapped to pandas period frequencies
+GRANULARITIES = {"Daily": "D", "Weekly": "W", "Monthly": "M"}
+
+def rollup(df, by, granularity="Daily", date_col="Date", amount_col="Paise"):
+    """
+    Collapse per-transaction rows into one row per (period, by) before plotting,
+    so the chart payload grows with the number of days rather than transactions.
+    """
+    import pandas as pd
+    dates = pd.to_datetime(df[date_col], errors='coerce')
+    periods = dates.dt.to_period(GRANULARITIES[granularity]).dt.start_time
+    return (
+        df.assign(**{date_col: periods})
+        .groupby([date_col, by], as_index=False, observed=True)[amount_col]
+        .sum()
+    )
+
+def daily_totals(df, by, date_col="Date", amount_col="Paise"):
+    """Collapse per-transaction rows into one row per (day, by) before plotting"""
+    return rollup(df, by, "Daily", date_col, amount_col)
+
+def calendar_grid(totals, start, end):
+    """
+    Lay {date: paise} out for a calendar heatmap of start..end: returns (paise,
+    days), two (weekday x week) frames with Monday = row 0 and one column per
+    week (labelled by its Monday). Days without spending are 0; cells before
+    start or after end are NaN / None.
+    """
+    import pandas as pd
+    days = pd.date_range(start, end)
+    cells = pd.DataFrame({
+        'week': days - pd.to_timedelta(days.dayofweek, unit='D'),
+        'weekday': days.dayofweek,
+        'paise': [totals.get(day.date(), 0) for day in days],
+        'day': days.strftime('%Y-%m-%d'),
+    })
+    paise = cells.pivot(index='weekday', columns='week', values='paise').reindex(range(7))
+    labels = cells.pivot(index='weekday', columns='week', values='day').reindex(range(7))
+    return paise, labels.astype(object).where(labels.notna(), None)
+
+def _shift_month(month, years=0, months=0):
+    year, mon = map(int, month.split('-'))
+    index = year * 12 + mon - 1 + years * 12 + months
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+def period_comparison(category_months, month):
+    """
+    Per-category spend in month ('YYYY-MM') against the month before and the
+    same month a year earlier, from {'YYYY-MM': {category: paise}} monthly
+    rollups. Columns: this_month, last_month, last_year (paise) and mom / yoy
+    (fractional change, NaN when the earlier period had no spend); biggest
+    categories first.
+    """
+    import pandas as pd
+    frame = pd.DataFrame({
+        'this_month': pd.Series(category_months.get(month, {}), dtype='int64'),
+        'last_month': pd.Series(category_months.get(_shift_month(month, months=-1), {}), dtype='int64'),
+        'last_year': pd.Series(category_months.get(_shift_month(month, years=-1), {}), dtype='int64'),
+    }).fillna(0).astype('int64')
+    frame['mom'] = frame['this_month'] / frame['last_month'].where(frame['last_month'] > 0) - 1
+    frame['yoy'] = frame['this_month'] / frame['last_year'].where(frame['last_year'] > 0) - 1
+    return frame.sort_values(['this_month', 'last_month'], ascending=False)
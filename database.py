@@ -1,8 +1,13 @@
 import streamlit as st
 from supabase import create_client, Client
-import pandas as pd
-from datetime import datetime
-import calendar
+from datetime import date, datetime, timedelta
+import bisect
+import functools
+import inspect
+import threading
+import time
+from tracing import trace_methods
+from metrics import execute_query, is_unreachable, SINGLEFLIGHT_SHARED
 
 # Initialize Supabase client
 @st.cache_resource
@@ -16,49 +21,396 @@ def init_supabase():
         st.error(f"Failed to connect to Supabase: {str(e)}")
         return None
 
+@st.cache_resource
+def init_local_replica(_remote):
+    """Serve expenses/income from the local offline-first replica (localstore.py) if local_replica = true"""
+    try:
+        enabled = st.secrets.get("local_replica", False)
+        path = st.secrets.get("local_replica_path")
+    except Exception:
+        enabled, path = False, None
+    if not enabled:
+        return _remote
+    from localstore import LocalReplicaClient, DEFAULT_REPLICA_PATH
+    return LocalReplicaClient(_remote, path or DEFAULT_REPLICA_PATH)
+
 supabase = init_supabase()
 
+def use_local_replica():
+    """
+    Route this process's managers through the local replica, when configured.
+    Only the app entry point (ui.py) calls this: scripts and precompute workers
+    talk to Supabase directly, so there is one replica file and sync thread per app.
+    """
+    global supabase
+    supabase = init_local_replica(init_supabase())
+    return supabase
+
+# Per-user data version that every cache keys on: (user_data_versions.version, local writes).
+# The database part is bumped by triggers on every write from any process
+# (migrations/002_analytics_cache.sql) and read once per request; the local part
+# counts this process's writes, so a change shows up in the same request and
+# while the database is out of reach (local replica writes not pushed yet).
+_data_versions = {}
+_data_versions_lock = threading.Lock()
+_request = threading.local()
+
+def begin_request():
+    """Start a request (a script run): database versions are read again, once per user"""
+    _request.versions = {}
+
+def _stored_data_version(user):
+    try:
+        result = execute_query(supabase.table("user_data_versions").select("version").eq("user_email", user),
+                               "user_data_versions", "select")
+    except Exception:
+        return None  # Offline or migration not applied; local writes still count
+    return result.data[0]['version'] if result.data else 0
+
+def get_data_version(user):
+    memo = getattr(_request, "versions", None)
+    if memo is not None and user in memo:
+        stored = memo[user]
+    else:
+        stored = _stored_data_version(user) if supabase else None
+        if memo is not None:
+            memo[user] = stored
+    with _data_versions_lock:
+        return (stored, _data_versions.get(user, 0))
+
+def bump_data_version(user):
+    with _data_versions_lock:
+        _data_versions[user] = _data_versions.get(user, 0) + 1
+        return _data_versions[user]
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def singleflight(op):
+    """
+    Method decorator: concurrent calls with the same arguments (first one being the
+    user) share one in-flight call and its result instead of each hitting the
+    database. The key includes the user's data version, so a read that started
+    before a write is never handed to callers arriving after it. Shared results
+    must be treated as read-only.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(self, user, *args, **kwargs):
+            # Bind so get_expenses(u, "2025-01") and get_expenses(u, year_month="2025-01") share a key
+            bound = signature.bind(self, user, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(bound.arguments.items())[2:]
+            key = (op, id(self.supabase), user, params, get_data_version(user))
+            with _inflight_lock:
+                call = _inflight.get(key)
+                leader = call is None
+                if leader:
+                    call = _inflight[key] = _Call()
+            if not leader:
+                SINGLEFLIGHT_SHARED.inc(op=op)
+                call.done.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            try:
+                call.result = fn(self, user, *args, **kwargs)
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with _inflight_lock:
+                    del _inflight[key]
+                call.done.set()
+            return call.result
+        return wrapper
+    return decorator
+
+MONTH_INDEX_TTL_SECONDS = 300
+BULK_INSERT_CHUNK = 500  # Rows per insert request on import paths
+BATCH_USERS_PER_QUERY = 200  # Keeps the in.(...) filter well under URL length limits
+SEARCH_PAGE_SIZE = 25
+ROLLUP_PAGE_SIZE = 1000  # PostgREST's default max rows per response
+ANALYTICS_COLUMNS = "category, amount_paise, date"
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Per-user {"YYYY-MM": expense count}, stamped with the data version it was built at
+_month_index = {}
+_month_index_lock = threading.Lock()
+
+# Per-user CategoryIndex, same stamping
+_category_index = {}
+_category_index_lock = threading.Lock()
+
+class CategoryIndex:
+    """
+    Inverted index from lower-cased words of a user's category names to the names,
+    kept sorted so a prefix lookup is two bisects. "sub" finds "Subscriptions",
+    "bill" finds "Phone Bills".
+    """
+    def __init__(self, categories):
+        self.categories = sorted(set(categories))
+        self._terms = sorted({(term, cat) for cat in self.categories
+                              for term in [cat.lower()] + cat.lower().split()})
+        self._keys = [term for term, _ in self._terms]
+
+    def match(self, prefix):
+        """Category names with a word starting with prefix (case-insensitive), sorted"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return list(self.categories)
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\uffff")
+        return sorted({cat for _, cat in self._terms[lo:hi]})
+
+def _as_date(value):
+    """date from a date, datetime or 'YYYY-MM-DD...' string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def period_range(period, anchor=None):
+    """
+    First and last day (inclusive) of the week (Monday-Sunday), month, quarter
+    or year containing anchor, which defaults to today.
+    """
+    day = _as_date(anchor or date.today())
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == "month":
+        start, months = day.replace(day=1), 1
+    elif period == "quarter":
+        start, months = date(day.year, 3 * ((day.month - 1) // 3) + 1, 1), 3
+    elif period == "year":
+        start, months = date(day.year, 1, 1), 12
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    month = start.month - 1 + months
+    return start, date(start.year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+
 def _get_month_date_range(year_month_str):
     """
     Helper function to get the correct start and end date for a month string (e.g., "2025-09").
     """
-    year, month = map(int, year_month_str.split('-'))
-    _, num_days = calendar.monthrange(year, month)
-    start_date = f"{year_month_str}-01"
-    end_date = f"{year_month_str}-{num_days}"
-    return start_date, end_date
+    start, end = period_range("month", f"{year_month_str}-01")
+    return start.isoformat(), end.isoformat()
 
+def _insert_rows(client, table, data):
+    """
+    Insert rows BULK_INSERT_CHUNK at a time. A chunk the database refuses is
+    retried row by row so only the offending rows are skipped; losing the
+    connection stops the import. Returns (written, skipped, first error).
+    """
+    written, skipped, error = 0, 0, None
+    for start in range(0, len(data), BULK_INSERT_CHUNK):
+        chunk = data[start:start + BULK_INSERT_CHUNK]
+        try:
+            execute_query(client.table(table).insert(chunk), table, "insert")
+            written += len(chunk)
+            continue
+        except Exception as e:
+            if is_unreachable(e):
+                raise
+        for row in chunk:
+            try:
+                execute_query(client.table(table).insert(row), table, "insert")
+                written += 1
+            except Exception as e:
+                if is_unreachable(e):
+                    raise
+                skipped += 1
+                error = error or e
+    return written, skipped, error
+
+def _date_filter(query, start_date=None, end_date=None):
+    """Inclusive date bounds as ISO dates, which the date column and its (user_email, date) index compare natively"""
+    if start_date:
+        query = query.gte("date", _as_date(start_date).isoformat())
+    if end_date:
+        query = query.lte("date", _as_date(end_date).isoformat())
+    return query
+
+@trace_methods
 class ExpenseManager:
     def __init__(self):
         self.supabase = supabase
 
-    def add_expense(self, user, cat, amt, dt_str):
-        if not self.supabase or not cat or amt <= 0: return False
+    def add_expense(self, user, cat, amount_paise, dt_str, description=None):
+        if not self.supabase or not cat or amount_paise <= 0: return False
         try:
-            data = {"user_email": user, "category": cat, "amount": float(amt), "date": dt_str}
-            self.supabase.table("expenses").insert(data).execute()
+            data = {"user_email": user, "category": cat, "amount_paise": int(amount_paise), "date": dt_str}
+            if description:
+                data["description"] = description
+            execute_query(self.supabase.table("expenses").insert(data), "expenses", "insert")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error adding expense: {str(e)}")
             return False
 
+    @singleflight("get_expenses")
     def get_expenses(self, user, year_month=None):
         if not self.supabase: return []
         try:
             query = self.supabase.table("expenses").select("*").eq("user_email", user)
             if year_month:
-                start_date, end_date = _get_month_date_range(year_month)
-                query = query.gte("date", start_date).lte("date", end_date)
-            result = query.order("date", desc=True).execute()
-            return [(row['user_email'], row['category'], row['amount'], row['date']) for row in result.data]
+                query = _date_filter(query, *_get_month_date_range(year_month))
+            result = execute_query(query.order("date", desc=True), "expenses", "select")
+            return [(row['user_email'], row['category'], row['amount_paise'], row['date']) for row in result.data]
+        except Exception as e:
+            st.error(f"Error fetching expenses: {str(e)}")
+            return []
+
+    @singleflight("get_expenses_between")
+    def get_expenses_between(self, user, start_date=None, end_date=None):
+        """Full expense rows (with ids) dated start_date..end_date inclusive, newest first; either bound may be open"""
+        if not self.supabase: return []
+        try:
+            query = _date_filter(self.supabase.table("expenses").select("*").eq("user_email", user), start_date, end_date)
+            return execute_query(query.order("date", desc=True), "expenses", "select").data
         except Exception as e:
             st.error(f"Error fetching expenses: {str(e)}")
             return []
 
+    def get_expenses_for_period(self, user, period, anchor=None):
+        """Expenses in the week/month/quarter/year containing anchor (default today)"""
+        return self.get_expenses_between(user, *period_range(period, anchor))
+
+    def add_expenses_bulk(self, user, rows):
+        """Insert (category, amount_paise, date[, description]) rows in chunks; returns how many were written"""
+        if not self.supabase: return 0
+        data = [
+            {"user_email": user, "category": cat, "amount_paise": int(paise), "date": dt_str, **({"description": rest[0]} if rest else {})}
+            for cat, paise, dt_str, *rest in rows if cat and paise > 0
+        ]
+        written = 0
+        try:
+            written, skipped, error = _insert_rows(self.supabase, "expenses", data)
+            if skipped:
+                st.warning(f"Skipped {skipped} expense row{'s' if skipped != 1 else ''} the database rejected: {error}")
+        except Exception as e:
+            st.error(f"Error importing expenses: {str(e)}")
+        if written:
+            bump_data_version(user)
+        return written
+
+    def get_category_index(self, user):
+        """CategoryIndex of the user's categories, rebuilt when their data changes"""
+        version = get_data_version(user)
+        with _category_index_lock:
+            entry = _category_index.get(user)
+        if entry and entry[0] == version and entry[1] > time.time():
+            return entry[2]
+        try:
+            result = execute_query(
+                self.supabase.table("monthly_summaries").select("category_totals").eq("user_email", user).eq("kind", "expense"),
+                "monthly_summaries", "select")
+            categories = {cat for row in result.data for cat in (row['category_totals'] or {})}
+        except Exception:
+            # monthly_summaries migration not applied yet
+            result = execute_query(self.supabase.table("expenses").select("category").eq("user_email", user), "expenses", "select")
+            categories = {row['category'] for row in result.data if row['category']}
+        index = CategoryIndex(categories)
+        with _category_index_lock:
+            _category_index[user] = (version, time.time() + MONTH_INDEX_TTL_SECONDS, index)
+        return index
+
+    def search_expenses(self, user, category=None, min_paise=None, max_paise=None,
+                        start_date=None, end_date=None, page=0, page_size=SEARCH_PAGE_SIZE):
+        """
+        One page of the user's expenses matching every given filter, newest first:
+        category is a prefix of any word in the category name, amounts and dates are
+        inclusive bounds. Returns (rows, total matches).
+        """
+        if not self.supabase: return [], 0
+        try:
+            query = self.supabase.table("expenses").select("*", count="exact").eq("user_email", user)
+            if category:
+                # Resolve the prefix to exact names so the (user_email, category, date) index applies
+                names = self.get_category_index(user).match(category)
+                if not names:
+                    return [], 0
+                query = query.in_("category", names)
+            if min_paise is not None:
+                query = query.gte("amount_paise", int(min_paise))
+            if max_paise is not None:
+                query = query.lte("amount_paise", int(max_paise))
+            query = _date_filter(query, start_date, end_date)
+            start = page * page_size
+            result = execute_query(query.order("date", desc=True).order("id", desc=True).range(start, start + page_size - 1),
+                                   "expenses", "select")
+            return result.data, result.count if result.count is not None else len(result.data)
+        except Exception as e:
+            st.error(f"Error searching expenses: {str(e)}")
+            return [], 0
+
+    def get_flagged_expenses(self, user, limit=50):
+        """
+        Newest expenses flagged as unusual when they were written (migrations/005),
+        read through the partial index on flagged rows. None if the migration
+        isn't applied, so callers can fall back to the batch check.
+        """
+        if not self.supabase: return None
+        try:
+            query = (self.supabase.table("expenses").select("category, amount_paise, date, anomaly_z, anomaly_severity")
+                     .eq("user_email", user).in_("anomaly_severity", ["medium", "high"])
+                     .order("date", desc=True).limit(limit))
+            result = execute_query(query, "expenses", "select")
+        except Exception:
+            return None
+        return [{'date': str(row['date'])[:10], 'category': row['category'], 'amount_paise': row['amount_paise'],
+                 'severity': row['anomaly_severity'], 'z_score': row['anomaly_z']} for row in result.data]
+
+    def get_month_index(self, user):
+        """
+        Return {"YYYY-MM": expense count} for the user, newest month first. Read from
+        monthly_summaries (falling back to a date-only select) and reused until the
+        user's data changes or the TTL runs out.
+        """
+        if not self.supabase: return {}
+        version = get_data_version(user)
+        with _month_index_lock:
+            entry = _month_index.get(user)
+        if entry and entry[0] == version and entry[1] > time.time():
+            return entry[2]
+        try:
+            try:
+                result = execute_query(
+                    self.supabase.table("monthly_summaries").select("month, txn_count").eq("user_email", user).eq("kind", "expense"),
+                    "monthly_summaries", "select")
+                counts = {row['month']: row['txn_count'] for row in result.data}
+            except Exception:
+                # monthly_summaries migration not applied yet
+                result = execute_query(self.supabase.table("expenses").select("date").eq("user_email", user), "expenses", "select")
+                counts = {}
+                for row in result.data:
+                    if row['date']:
+                        month = str(row['date'])[:7]
+                        counts[month] = counts.get(month, 0) + 1
+            index = dict(sorted(counts.items(), reverse=True))
+            with _month_index_lock:
+                _month_index[user] = (version, time.time() + MONTH_INDEX_TTL_SECONDS, index)
+            return index
+        except Exception as e:
+            st.error(f"Error fetching months: {str(e)}")
+            return {}
+
     def delete_expense(self, user, expense_id):
         if not self.supabase: return False
         try:
-            self.supabase.table("expenses").delete().eq("id", expense_id).eq("user_email", user).execute()
+            execute_query(self.supabase.table("expenses").delete().eq("id", expense_id).eq("user_email", user), "expenses", "delete")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error deleting expense: {str(e)}")
@@ -68,53 +420,99 @@ class ExpenseManager:
         if not self.supabase: return False
         current_month_str = datetime.now().strftime("%Y-%m")
         try:
-            start_date, end_date = _get_month_date_range(current_month_str)
-            self.supabase.table("expenses").delete().eq("user_email", user).gte("date", start_date).lte("date", end_date).execute()
+            query = _date_filter(self.supabase.table("expenses").delete().eq("user_email", user), *_get_month_date_range(current_month_str))
+            execute_query(query, "expenses", "delete")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error resetting current month: {str(e)}")
             return False
 
+    def delete_month(self, user, year_month):
+        if not self.supabase: return False
+        try:
+            query = _date_filter(self.supabase.table("expenses").delete().eq("user_email", user), *_get_month_date_range(year_month))
+            execute_query(query, "expenses", "delete")
+            bump_data_version(user)
+            return True
+        except Exception as e:
+            st.error(f"Error deleting expenses for {year_month}: {str(e)}")
+            return False
+
     def delete_all_user_data(self, user):
         if not self.supabase: return False
         try:
-            self.supabase.table("expenses").delete().eq("user_email", user).execute()
+            execute_query(self.supabase.table("expenses").delete().eq("user_email", user), "expenses", "delete")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error deleting all expenses: {str(e)}")
             return False
 
+@trace_methods
 class IncomeManager:
     def __init__(self):
         self.supabase = supabase
 
-    def add_income(self, user, amt, dt_str):
-        if not self.supabase or amt <= 0: return False
+    def add_income(self, user, amount_paise, dt_str):
+        if not self.supabase or amount_paise <= 0: return False
         try:
-            data = {"user_email": user, "amount": float(amt), "date": dt_str}
-            self.supabase.table("income").insert(data).execute()
+            data = {"user_email": user, "amount_paise": int(amount_paise), "date": dt_str}
+            execute_query(self.supabase.table("income").insert(data), "income", "insert")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error adding income: {str(e)}")
             return False
 
+    def add_income_bulk(self, user, rows):
+        """Insert (amount_paise, date) rows in chunks; returns how many were written"""
+        if not self.supabase: return 0
+        data = [{"user_email": user, "amount_paise": int(paise), "date": dt_str} for paise, dt_str in rows if paise > 0]
+        written = 0
+        try:
+            written, skipped, error = _insert_rows(self.supabase, "income", data)
+            if skipped:
+                st.warning(f"Skipped {skipped} income row{'s' if skipped != 1 else ''} the database rejected: {error}")
+        except Exception as e:
+            st.error(f"Error importing income: {str(e)}")
+        if written:
+            bump_data_version(user)
+        return written
+
+    @singleflight("get_income")
     def get_income(self, user, year_month=None):
         if not self.supabase: return []
         try:
             query = self.supabase.table("income").select("*").eq("user_email", user)
             if year_month:
-                start_date, end_date = _get_month_date_range(year_month)
-                query = query.gte("date", start_date).lte("date", end_date)
-            result = query.order("date", desc=True).execute()
-            return [(row['user_email'], row['amount'], row['date']) for row in result.data]
+                query = _date_filter(query, *_get_month_date_range(year_month))
+            result = execute_query(query.order("date", desc=True), "income", "select")
+            return [(row['user_email'], row['amount_paise'], row['date']) for row in result.data]
+        except Exception as e:
+            st.error(f"Error fetching income: {str(e)}")
+            return []
+
+    @singleflight("get_income_between")
+    def get_income_between(self, user, start_date=None, end_date=None):
+        """Full income rows (with ids) dated start_date..end_date inclusive, newest first; either bound may be open"""
+        if not self.supabase: return []
+        try:
+            query = _date_filter(self.supabase.table("income").select("*").eq("user_email", user), start_date, end_date)
+            return execute_query(query.order("date", desc=True), "income", "select").data
         except Exception as e:
             st.error(f"Error fetching income: {str(e)}")
             return []
 
+    def get_income_for_period(self, user, period, anchor=None):
+        """Income in the week/month/quarter/year containing anchor (default today)"""
+        return self.get_income_between(user, *period_range(period, anchor))
+
     def delete_income(self, user, income_id):
         if not self.supabase: return False
         try:
-            self.supabase.table("income").delete().eq("id", income_id).eq("user_email", user).execute()
+            execute_query(self.supabase.table("income").delete().eq("id", income_id).eq("user_email", user), "income", "delete")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error deleting income: {str(e)}")
@@ -124,71 +522,349 @@ class IncomeManager:
         if not self.supabase: return False
         current_month_str = datetime.now().strftime("%Y-%m")
         try:
-            start_date, end_date = _get_month_date_range(current_month_str)
-            self.supabase.table("income").delete().eq("user_email", user).gte("date", start_date).lte("date", end_date).execute()
+            query = _date_filter(self.supabase.table("income").delete().eq("user_email", user), *_get_month_date_range(current_month_str))
+            execute_query(query, "income", "delete")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error resetting current month income: {str(e)}")
             return False
 
+    def delete_month(self, user, year_month):
+        if not self.supabase: return False
+        try:
+            query = _date_filter(self.supabase.table("income").delete().eq("user_email", user), *_get_month_date_range(year_month))
+            execute_query(query, "income", "delete")
+            bump_data_version(user)
+            return True
+        except Exception as e:
+            st.error(f"Error deleting income for {year_month}: {str(e)}")
+            return False
+
     def delete_all_user_data(self, user):
         if not self.supabase: return False
         try:
-            self.supabase.table("income").delete().eq("user_email", user).execute()
+            execute_query(self.supabase.table("income").delete().eq("user_email", user), "income", "delete")
+            bump_data_version(user)
             return True
         except Exception as e:
             st.error(f"Error deleting all income: {str(e)}")
             return False
 
+def _empty_summary():
+    """Money values are int paise"""
+    return {'total': 0, 'count': 0, 'min': None, 'max': None, 'categories': {}}
+
+def _merge_summary(into, row):
+    """Fold one monthly_summaries row into a running summary dict"""
+    into['total'] += int(row['total_paise'] or 0)
+    into['count'] += row['txn_count'] or 0
+    if row.get('min_paise') is not None:
+        into['min'] = int(row['min_paise']) if into['min'] is None else min(into['min'], int(row['min_paise']))
+    if row.get('max_paise') is not None:
+        into['max'] = int(row['max_paise']) if into['max'] is None else max(into['max'], int(row['max_paise']))
+    for cat, paise in (row.get('category_totals') or {}).items():
+        into['categories'][cat] = into['categories'].get(cat, 0) + int(paise)
+    return into
+
+@trace_methods
+class MonthlySummaryManager:
+    """
+    Reads the per-user, per-month totals maintained by the monthly_summaries triggers
+    (migrations/001_monthly_summaries.sql), so headline numbers never sum raw rows.
+    Until that migration is applied the same totals are aggregated from the rows.
+    """
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    def _fetch(self, user, year_month=None):
+        """monthly_summaries rows, or the same rows aggregated from expenses/income if the migration isn't applied"""
+        query = self.supabase.table("monthly_summaries").select("*").eq("user_email", user)
+        if year_month:
+            query = query.eq("month", year_month)
+        try:
+            return execute_query(query, "monthly_summaries", "select").data
+        except Exception as e:
+            if is_unreachable(e):
+                raise
+        return self._aggregate(user, year_month)
+
+    def _aggregate(self, user, year_month=None):
+        bounds = _get_month_date_range(year_month) if year_month else (None, None)
+        rows = {}
+        for kind, table, columns in (("expense", "expenses", "category, amount_paise, date"), ("income", "income", "amount_paise, date")):
+            query = _date_filter(self.supabase.table(table).select(columns).eq("user_email", user), *bounds)
+            for tx in execute_query(query, table, "select").data:
+                if not tx['date']:
+                    continue
+                month = str(tx['date'])[:7]
+                row = rows.setdefault((kind, month), {'kind': kind, 'month': month, 'total_paise': 0, 'txn_count': 0,
+                                                      'min_paise': None, 'max_paise': None, 'category_totals': {}})
+                paise = int(tx['amount_paise'])
+                row['total_paise'] += paise
+                row['txn_count'] += 1
+                row['min_paise'] = paise if row['min_paise'] is None else min(row['min_paise'], paise)
+                row['max_paise'] = paise if row['max_paise'] is None else max(row['max_paise'], paise)
+                if kind == 'expense':
+                    row['category_totals'][tx['category']] = row['category_totals'].get(tx['category'], 0) + paise
+        return list(rows.values())
+
+    def get_month_summary(self, user, year_month):
+        """{'expense': {...}, 'income': {...}} for one month"""
+        summary = {'expense': _empty_summary(), 'income': _empty_summary()}
+        if not self.supabase: return summary
+        try:
+            for row in self._fetch(user, year_month):
+                _merge_summary(summary[row['kind']], row)
+        except Exception as e:
+            st.error(f"Error fetching monthly summary: {str(e)}")
+        return summary
+
+    def get_all_time_summary(self, user):
+        """Same shape as get_month_summary, combined across every month"""
+        summary = {'expense': _empty_summary(), 'income': _empty_summary()}
+        if not self.supabase: return summary
+        try:
+            for row in self._fetch(user):
+                _merge_summary(summary[row['kind']], row)
+        except Exception as e:
+            st.error(f"Error fetching summary: {str(e)}")
+        return summary
+
+    def get_category_months(self, user):
+        """{'YYYY-MM': {category: paise}} of expenses for every month with any"""
+        if not self.supabase: return {}
+        try:
+            return {row['month']: {cat: int(paise) for cat, paise in (row.get('category_totals') or {}).items()}
+                    for row in self._fetch(user) if row['kind'] == 'expense'}
+        except Exception as e:
+            st.error(f"Error fetching monthly summary: {str(e)}")
+            return {}
+
+    def rebuild(self, user=None):
+        """Recompute summaries from the raw tables to repair drift; returns rows written"""
+        result = execute_query(self.supabase.rpc("rebuild_monthly_summaries", {"p_user": user}), "monthly_summaries", "rpc")
+        for affected in ([user] if user else list(_data_versions)):
+            bump_data_version(affected)
+        return result.data
+
+@trace_methods
+class DailySummaryManager:
+    """
+    Per-user, per-day expense totals maintained by the daily_summaries triggers
+    (migrations/009_daily_summaries.sql), for views that plot every day.
+    """
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    def get_daily_totals(self, user, start_date=None, end_date=None):
+        """
+        {date: paise} for days with spending in [start_date, end_date], or None if
+        the migration isn't applied. Ask for a year at a time: that's at most 366
+        rows, well under PostgREST's per-response limit.
+        """
+        if not self.supabase: return {}
+        try:
+            query = self.supabase.table("daily_summaries").select("day, total_paise").eq("user_email", user)
+            if start_date:
+                query = query.gte("day", _as_date(start_date).isoformat())
+            if end_date:
+                query = query.lte("day", _as_date(end_date).isoformat())
+            rows = execute_query(query, "daily_summaries", "select").data
+        except Exception:
+            return None
+        return {_as_date(row['day']): int(row['total_paise']) for row in rows}
+
+    def get_daily_frame(self, users):
+        """
+        Every day's total for users, as a frame with user_email, date (datetime64) and
+        amount_paise like analytics_frame's, read page by page; None if the migration
+        isn't applied.
+        """
+        import pandas as pd
+        if not self.supabase: return None
+        rows = []
+        try:
+            for i in range(0, len(users), BATCH_USERS_PER_QUERY):
+                chunk, offset = users[i:i + BATCH_USERS_PER_QUERY], 0
+                while True:
+                    query = (self.supabase.table("daily_summaries").select("user_email, day, total_paise")
+                             .in_("user_email", chunk).order("user_email").order("day"))
+                    page = execute_query(query.range(offset, offset + ROLLUP_PAGE_SIZE - 1), "daily_summaries", "select").data
+                    rows.extend(page)
+                    offset += len(page)
+                    if len(page) < ROLLUP_PAGE_SIZE:
+                        break
+        except Exception:
+            return None
+        df = pd.DataFrame(rows, columns=["user_email", "day", "total_paise"])
+        return pd.DataFrame({'user_email': df['user_email'], 'date': pd.to_datetime(df['day']),
+                             'amount_paise': df['total_paise'].astype('int64')})
+
+    def rebuild(self, user=None):
+        """Recompute daily totals from expenses to repair drift; returns rows written"""
+        result = execute_query(self.supabase.rpc("rebuild_daily_summaries", {"p_user": user}), "daily_summaries", "rpc")
+        for affected in ([user] if user else list(_data_versions)):
+            bump_data_version(affected)
+        return result.data
+
+def analytics_frame(rows):
+    """
+    Compact frame for analytics from rows selected with ANALYTICS_COLUMNS (plus
+    user_email for cross-user batches): category and user_email as categoricals,
+    amount_paise int64, date datetime64, weekday int8 (Monday = 0) and month
+    int32 (YYYYMM). Group categoricals with observed=True.
+    """
+    import pandas as pd
+    df = pd.DataFrame(rows)
+    for col in ('user_email', 'category'):
+        if col in df:
+            df[col] = df[col].astype('category')
+    df['amount_paise'] = df['amount_paise'].astype('int64')
+    df['date'] = pd.to_datetime(df['date'])
+    df['weekday'] = df['date'].dt.weekday.astype('int8')
+    df['month'] = (df['date'].dt.year * 100 + df['date'].dt.month).astype('int32')
+    return df
+
+@trace_methods
 class SpendingAnalyzer:
     def __init__(self, supabase_client):
         self.supabase = supabase_client
         
+    @singleflight("detect_spending_patterns")
     def detect_spending_patterns(self, user):
         if not self.supabase: return self._empty_patterns()
         try:
-            result = self.supabase.table("expenses").select("*").eq("user_email", user).execute()
+            result = execute_query(self.supabase.table("expenses").select(ANALYTICS_COLUMNS).eq("user_email", user),
+                                   "expenses", "select")
             if not result.data: return self._empty_patterns()
             
-            df = pd.DataFrame(result.data)
-            df['date'] = pd.to_datetime(df['date'])
-            df['day_of_week'] = df['date'].dt.day_name()
-            
+            df = analytics_frame(result.data)
+            trend, windows = self._calculate_trend(df, user)
             return {
-                'peak_spending_day': df.groupby('day_of_week')['amount'].sum().idxmax(),
-                'avg_daily_spend': df.groupby(df['date'].dt.date)['amount'].sum().mean(),
-                'top_category': df.groupby('category')['amount'].sum().idxmax(),
-                'spending_trend': self._calculate_trend(df),
-                'unusual_expenses': self._detect_anomalies(df)
+                'peak_spending_day': WEEKDAY_NAMES[df.groupby('weekday')['amount_paise'].sum().idxmax()],
+                'avg_daily_spend': df.groupby('date')['amount_paise'].sum().mean(),
+                'top_category': df.groupby('category', observed=True)['amount_paise'].sum().idxmax(),
+                'spending_trend': trend,
+                'trend_windows': windows,
+                'unusual_expenses': self._detect_anomalies(df),
+                'recurring': self._detect_recurring(df)
             }
         except Exception as e:
             st.error(f"Error analyzing spending patterns: {str(e)}")
             return self._empty_patterns()
     
+    def detect_spending_patterns_batch(self, users):
+        """detect_spending_patterns for many users at once: {user: patterns}.
+
+        Loads everyone's expenses in a few in.(...) scans and computes every
+        statistic with grouped operations keyed by user_email.
+        """
+        users = list(dict.fromkeys(users))
+        patterns = {user: self._empty_patterns() for user in users}
+        if not self.supabase or not users: return patterns
+        try:
+            from trends import to_payload
+            rows = []
+            for i in range(0, len(users), BATCH_USERS_PER_QUERY):
+                chunk = users[i:i + BATCH_USERS_PER_QUERY]
+                query = self.supabase.table("expenses").select("user_email, " + ANALYTICS_COLUMNS).in_("user_email", chunk)
+                rows.extend(execute_query(query, "expenses", "select").data)
+            if not rows: return patterns
+
+            df = analytics_frame(rows)
+            # Stable sort keeps each user's rows in query order, which the anomaly ordering relies on
+            df = df.sort_values('user_email', kind='stable').reset_index(drop=True)
+            by_user = df.groupby('user_email', sort=False, observed=True)
+
+            peak_day = df.groupby(['user_email', 'weekday'], observed=True)['amount_paise'].sum() \
+                .groupby(level=0, observed=True).idxmax()
+            top_category = df.groupby(['user_email', 'category'], observed=True)['amount_paise'].sum() \
+                .groupby(level=0, observed=True).idxmax()
+            avg_daily = df.groupby(['user_email', 'date'], observed=True)['amount_paise'].sum() \
+                .groupby(level=0, observed=True).mean()
+            trends = self._calculate_trend_batch(df)
+            anomalies = self._detect_anomalies_batch(df, by_user)
+            recurring = self._detect_recurring_batch(df)
+
+            for user in by_user.groups:
+                trend, windows = to_payload(trends.loc[user])
+                patterns[user] = {
+                    'peak_spending_day': WEEKDAY_NAMES[peak_day[user][1]],
+                    'avg_daily_spend': avg_daily[user],
+                    'top_category': top_category[user][1],
+                    'spending_trend': trend,
+                    'trend_windows': windows,
+                    'unusual_expenses': anomalies.get(user, []),
+                    'recurring': recurring.get(user, [])
+                }
+        except Exception as e:
+            st.error(f"Error analyzing spending patterns: {str(e)}")
+        return patterns
+
+    def _calculate_trend_batch(self, df):
+        import pandas as pd
+        from trends import spending_trends
+        daily = DailySummaryManager(self.supabase).get_daily_frame(list(df['user_email'].unique()))
+        if daily is None:
+            return spending_trends(df, by='user_email')
+        # Users the rollup has no days for yet keep their raw rows
+        missing = df.loc[~df['user_email'].isin(daily['user_email'].unique()), ['user_email', 'date', 'amount_paise']]
+        return spending_trends(pd.concat([daily, missing.astype({'user_email': object})], ignore_index=True), by='user_email')
+
+    def _detect_anomalies_batch(self, df, by_user):
+        eligible = by_user['amount_paise'].transform('size') >= 3
+        by_cat = df.groupby(['user_email', 'category'], observed=True)['amount_paise']
+        z = (df['amount_paise'] - by_cat.transform('mean')) / by_cat.transform('std')
+        flagged = df[eligible & (by_cat.transform('std') > 0) & (z.abs() > 2)].assign(z=z.abs())
+        # Same ordering as _detect_anomalies: by category, then row order
+        flagged = flagged.sort_values(['user_email', 'category'], kind='stable')
+        anomalies = {}
+        for user, cat, day, paise, score in zip(flagged['user_email'], flagged['category'],
+                                                 flagged['date'].dt.strftime('%Y-%m-%d'), flagged['amount_paise'], flagged['z']):
+            anomalies.setdefault(user, []).append({
+                'date': day,
+                'category': cat,
+                'amount_paise': int(paise),
+                'severity': 'high' if score > 3 else 'medium'
+            })
+        return anomalies
+
+    def _detect_recurring(self, data):
+        from recurring import detect_recurring, to_records
+        return to_records(detect_recurring(data))
+
+    def _detect_recurring_batch(self, df):
+        from recurring import detect_recurring, to_records
+        found = detect_recurring(df, by=['user_email'])
+        return {user: to_records(group.drop(columns='user_email')) for user, group in found.groupby('user_email', observed=True)}
+
     def _empty_patterns(self):
-        return {'peak_spending_day': 'N/A', 'avg_daily_spend': 0, 'top_category': 'N/A', 'spending_trend': 1, 'unusual_expenses': []}
+        return {'peak_spending_day': 'N/A', 'avg_daily_spend': 0, 'top_category': 'N/A', 'spending_trend': 1,
+                'trend_windows': {}, 'unusual_expenses': [], 'recurring': []}
     
-    def _calculate_trend(self, data):
-        if len(data) < 2: return 1
-        half = len(data) // 2
-        recent = data.tail(half)['amount'].mean()
-        older = data.head(half)['amount'].mean()
-        return recent / older if older > 0 else 1
+    def _calculate_trend(self, data, user=None):
+        """(headline ratio, {window: ratio}) over daily totals, from daily_summaries when it has them; see trends.py"""
+        from trends import spending_trends, to_payload
+        daily = DailySummaryManager(self.supabase).get_daily_frame([user]) if user else None
+        if daily is not None and not daily.empty:
+            data = daily
+        return to_payload(spending_trends(data).iloc[0])
     
     def _detect_anomalies(self, data):
         if len(data) < 3: return []
         anomalies = []
-        for cat, group in data.groupby('category'):
-            mean = group['amount'].mean()
-            std = group['amount'].std()
+        for cat, group in data.groupby('category', observed=True):
+            mean = group['amount_paise'].mean()
+            std = group['amount_paise'].std()
             if std > 0:
                 for _, row in group.iterrows():
-                    z_score = (row['amount'] - mean) / std
+                    z_score = (row['amount_paise'] - mean) / std
                     if abs(z_score) > 2:
                         anomalies.append({
                             'date': row['date'].strftime('%Y-%m-%d'),
                             'category': cat,
-                            'amount': row['amount'],
+                            'amount_paise': int(row['amount_paise']),
                             'severity': 'high' if abs(z_score) > 3 else 'medium'
                         })
         return anomalies
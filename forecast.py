@@ -0,0 +1,177 @@
+import calendar
+import threading
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from database import get_data_version
+from tracing import trace_methods
+from metrics import record_cache
+
+MIN_HISTORY_DAYS = 14  # Below this, fall back to a simple run-rate projection
+Z_80, Z_95 = 1.2816, 1.96
+
+class _SeasonalModel:
+    """
+    Per-category, per-weekday daily spend model.
+
+    Only sufficient statistics are kept (sum and sum of squares of daily totals for
+    each category/weekday, plus how many of each weekday the history covers), so new
+    days can be folded in without touching the rows that were already fitted. An
+    order-independent hash of the fitted rows tells whether that history has changed.
+    """
+    def __init__(self):
+        self.first_day = None
+        self.fitted_through = None
+        self.rows_seen = 0
+        self.fingerprint = 0
+        self.weekday_days = np.zeros(7)
+        self.sums = pd.DataFrame(columns=['total', 'sq'])
+        self.data_version = None
+
+    def fit(self, df, through):
+        self.__init__()
+        self.first_day = df['date'].min().date()
+        self._fold(df, self.first_day, through)
+
+    def update(self, df, through):
+        self._fold(df, self.fitted_through + timedelta(days=1), through)
+
+    def is_prefix_of(self, df):
+        """True when df still contains exactly the rows this model was fitted on"""
+        old = df[df['date'].dt.date <= self.fitted_through]
+        return len(old) == self.rows_seen and _fingerprint(old) == self.fingerprint
+
+    def _fold(self, df, start, through):
+        if through < start:
+            return
+        window = df[(df['date'].dt.date >= start) & (df['date'].dt.date <= through)]
+        if not window.empty:
+            daily = window.groupby(['category', window['date'].dt.normalize()])['amount_paise'].sum()
+            stats = pd.DataFrame({
+                'category': daily.index.get_level_values(0),
+                'dow': daily.index.get_level_values(1).dayofweek,
+                'total': daily.values,
+                'sq': daily.values.astype(float) ** 2,  # int64 paise squared can overflow
+            }).groupby(['category', 'dow'])[['total', 'sq']].sum()
+            self.sums = stats if self.sums.empty else self.sums.add(stats, fill_value=0)
+        self.weekday_days += np.bincount(pd.date_range(start, through).dayofweek, minlength=7)
+        self.rows_seen += len(window)
+        self.fingerprint = (self.fingerprint + _fingerprint(window)) % 2 ** 64
+        self.fitted_through = through
+
+    def daily_moments(self):
+        """Mean and variance of daily spend as (categories x 7 weekdays) frames"""
+        days = np.maximum(self.weekday_days, 1)
+        totals = self.sums['total'].unstack(fill_value=0).reindex(columns=range(7), fill_value=0)
+        squares = self.sums['sq'].unstack(fill_value=0).reindex(columns=range(7), fill_value=0)
+        mean = totals / days
+        var = (squares / days - mean ** 2).clip(lower=0)
+        return mean, var
+
+def _fingerprint(rows):
+    """Sum of per-row hashes of (category, day, amount); adding rows adds their hashes"""
+    if rows.empty:
+        return 0
+    keys = pd.DataFrame({'category': rows['category'].astype(str), 'day': rows['date'].dt.normalize(),
+                         'amount_paise': rows['amount_paise'].astype('int64')})
+    return int(pd.util.hash_pandas_object(keys, index=False).to_numpy().sum(dtype=np.uint64))
+
+@trace_methods
+class SpendingForecaster:
+    """Month-end spending projection with weekday and category seasonality, cached per user"""
+    def __init__(self):
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _user_lock(self, user):
+        with self._lock:
+            return self._locks.setdefault(user, threading.Lock())
+
+    def _model_for(self, user, df, through):
+        version = get_data_version(user)
+        # Per user, so one user's refit doesn't hold up everyone else's forecast
+        with self._user_lock(user):
+            model = self._models.get(user)
+            fresh = model is not None and model.data_version == version and model.fitted_through == through
+            record_cache("forecast_model", fresh)
+            if model is None:
+                model = _SeasonalModel()
+                model.fit(df, through)
+            elif not fresh:
+                # Fold in only the new days when the already-fitted history is unchanged
+                if model.fitted_through <= through and model.is_prefix_of(df):
+                    model.update(df, through)
+                else:
+                    model.fit(df, through)
+            model.data_version = version
+            self._models[user] = model
+            return model
+
+    def forecast(self, user, df, today=None):
+        """
+        df needs 'date' (datetime64), 'category' and 'amount_paise' columns covering the
+        user's full history. Returns month-to-date spend, the projected month total
+        and 80%/95% intervals around it, all in paise.
+        """
+        today = today or date.today()
+        days_in_month = calendar.monthrange(today.year, today.month)[1]
+        month_start = today.replace(day=1)
+        dates = df['date'].dt.date
+        this_month = df[(dates >= month_start) & (dates <= today)]
+        month_to_date = int(this_month['amount_paise'].sum())
+
+        result = {
+            'month_to_date': month_to_date,
+            'day_of_month': today.day,
+            'days_in_month': days_in_month,
+            'daily_average': month_to_date / today.day,
+        }
+
+        history = df[dates < today]
+        if history.empty or (today - history['date'].min().date()).days < MIN_HISTORY_DAYS:
+            projected = result['daily_average'] * days_in_month
+            result.update({
+                'method': 'run_rate',
+                'projected_total': projected,
+                'interval_80': (month_to_date, projected),
+                'interval_95': (month_to_date, projected),
+                'by_category': {},
+            })
+            return result
+
+        model = self._model_for(user, history, today - timedelta(days=1))
+        mean, var = model.daily_moments()
+
+        # Today is only partly over: expect whatever is left of a typical day
+        remaining = pd.date_range(today + timedelta(days=1), today.replace(day=days_in_month))
+        weekday_counts = np.bincount(remaining.dayofweek, minlength=7)
+        today_dow = today.weekday()
+        spent_today_by_cat = (
+            this_month[this_month['date'].dt.date == today].groupby('category')['amount_paise'].sum()
+            .reindex(mean.index, fill_value=0)
+        )
+        month_to_date_by_cat = this_month.groupby('category')['amount_paise'].sum().reindex(mean.index, fill_value=0)
+        remaining_by_cat = mean.values @ weekday_counts + np.maximum(mean[today_dow] - spent_today_by_cat, 0).values
+        # Lumpy categories (rent, EMIs) shouldn't be spread over the rest of the month
+        # once this month's usual amount has already been paid
+        typical_month = model.sums['total'].groupby(level=0).sum().reindex(mean.index) / model.weekday_days.sum() * days_in_month
+        remaining_by_cat = np.minimum(remaining_by_cat, np.maximum(typical_month - month_to_date_by_cat, 0).values)
+        remaining_mean = float(remaining_by_cat.sum())
+        remaining_sd = float(np.sqrt((var.values @ weekday_counts).sum() + var[today_dow].sum()))
+        by_category = month_to_date_by_cat.add(pd.Series(remaining_by_cat, index=mean.index), fill_value=0)
+
+        projected = month_to_date + remaining_mean
+        result.update({
+            'method': 'seasonal',
+            'projected_total': projected,
+            'interval_80': (max(month_to_date, projected - Z_80 * remaining_sd), projected + Z_80 * remaining_sd),
+            'interval_95': (max(month_to_date, projected - Z_95 * remaining_sd), projected + Z_95 * remaining_sd),
+            'by_category': by_category.sort_values(ascending=False).to_dict(),
+        })
+        return result
+
+_forecaster = SpendingForecaster()
+
+def get_forecaster():
+    return _forecaster
@@ -0,0 +1,43 @@
+import time
+from datetime import datetime
+import streamlit as st
+from metrics import execute_query
+
+HEALTH_TTL_SECONDS = 30
+
+def _pool_state(client):
+    """Open/idle connection counts of the PostgREST HTTP pool, if they can be read"""
+    try:
+        connections = client.postgrest.session._transport._pool.connections
+        return {
+            "open": len(connections),
+            "idle": sum(1 for conn in connections if conn.is_idle()),
+        }
+    except Exception:
+        return None
+
+@st.cache_data(ttl=HEALTH_TTL_SECONDS, show_spinner=False)
+def check_health(_client):
+    """
+    Ping the backend with a one-row, one-column select and report latency and pool
+    state. Results are cached for HEALTH_TTL_SECONDS so repeated clicks are free.
+    """
+    status = {
+        "ok": False,
+        "latency_ms": None,
+        "pool": None,
+        "checked_at": datetime.now().isoformat(timespec="seconds"),
+        "error": None,
+    }
+    if not _client:
+        status["error"] = "Supabase client not initialized"
+        return status
+    start = time.perf_counter()
+    try:
+        execute_query(_client.table("auth_users").select("email").limit(1), "auth_users", "ping")
+        status["ok"] = True
+    except Exception as e:
+        status["error"] = str(e)
+    status["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    status["pool"] = _pool_state(_client)
+    return status
@@ -0,0 +1,630 @@
+"""
+Offline-first local replica of expenses and income.
+
+LocalReplicaClient stands in for the Supabase client everywhere the managers
+and pages use it. Queries on the replicated tables are answered from a local
+SQLite file, and so are monthly_summaries (computed by a view over the local
+rows). Writes land locally first and are appended to a journal. Every other
+table, and rpc(), goes straight to Supabase.
+
+A background thread pushes the journal in order and in batches (upsert on
+row_id / delete by row_id), then pulls each known user's remote changes:
+rows and tombstones (migrations/011_deleted_rows.sql) newer than the user's
+watermark. Conflicts resolve last-write-wins on updated_at, on both sides:
+the replica skips remote rows older than its own copy or with unpushed local
+edits, and the server skips stale upserts (migrations/003_row_ids.sql). A
+pushed row that comes back with a newer server_updated_at replaces the local
+copy, which is how server-set columns (anomaly flags) reach the replica.
+Deletes always win. Push and pull never overlap.
+
+A change the server keeps refusing (bad data, a failed constraint) is retried
+MAX_PUSH_ATTEMPTS times, then parked so the rest of the journal can move on;
+the sidebar lists parked changes for retry or discard. Network errors never
+count as attempts.
+
+When Supabase can't be reached, reads and writes keep working against the
+replica and the journal drains once the connection comes back.
+"""
+import itertools
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from metrics import execute_query, is_unreachable
+
+DEFAULT_REPLICA_PATH = "neurobux_local.db"
+PUSH_BATCH_SIZE = 500
+PULL_PAGE_SIZE = 1000  # PostgREST's default max rows per response
+PULL_OVERLAP = timedelta(minutes=1)  # Re-read a little before the watermark for late commits
+PULL_INTERVAL_SECONDS = 30
+MAX_BACKOFF_SECONDS = 120
+MAX_PUSH_ATTEMPTS = 5
+
+REPLICATED_TABLES = ("expenses", "income")
+# Stored as real columns; everything else lives in the JSON `data` column
+INDEXED_COLUMNS = ("id", "user_email", "date", "updated_at")
+# Replica bookkeeping that never goes back to the server
+LOCAL_ONLY_COLUMNS = ("id", "remote_id", "created_at", "server_updated_at")
+
+_SCHEMA = [
+    *(f"""create table if not exists {t} (
+        id         text primary key,  -- remote row_id
+        user_email text not null,
+        date       text,
+        updated_at text not null,
+        data       text not null
+    )""" for t in REPLICATED_TABLES),
+    *(f"create index if not exists {t}_user_date_idx on {t} (user_email, date)" for t in REPLICATED_TABLES),
+    """create table if not exists journal (
+        seq        integer primary key autoincrement,
+        tbl        text    not null,
+        op         text    not null,  -- 'upsert' | 'delete'
+        row_id     text    not null,
+        data       text,
+        synced     integer not null default 0
+    )""",
+    "create index if not exists journal_unsynced_idx on journal (synced, seq)",
+    """create table if not exists sync_state (
+        user_email text primary key,
+        watermark  text  -- newest server_updated_at / deleted_at pulled
+    )""",
+    # Same shape as the remote monthly_summaries table
+    "drop view if exists monthly_summaries",
+    """create view monthly_summaries as
+        select user_email, 'expense' as kind, month, sum(cat_total) as total_paise, sum(cat_count) as txn_count,
+               min(cat_min) as min_paise, max(cat_max) as max_paise,
+               json_group_object(category, cat_total) as category_totals
+          from (select user_email, substr(date, 1, 7) as month, json_extract(data, '$.category') as category,
+                       sum(json_extract(data, '$.amount_paise')) as cat_total, count(*) as cat_count,
+                       min(json_extract(data, '$.amount_paise')) as cat_min, max(json_extract(data, '$.amount_paise')) as cat_max
+                  from expenses group by 1, 2, 3)
+         group by user_email, month
+        union all
+        select user_email, 'income', substr(date, 1, 7), sum(json_extract(data, '$.amount_paise')), count(*),
+               min(json_extract(data, '$.amount_paise')), max(json_extract(data, '$.amount_paise')), '{}'
+          from income group by 1, 3""",
+    # Same shape as the remote daily_summaries table
+    "drop view if exists daily_summaries",
+    """create view daily_summaries as
+        select user_email, date as day, sum(json_extract(data, '$.amount_paise')) as total_paise, count(*) as txn_count
+          from expenses where date is not null group by 1, 2""",
+]
+
+# Rows replicated or journaled before amounts moved to paise (migrations/008)
+_UPGRADES = [
+    *(f"""update {t} set data = json_set(json_remove(data, '$.amount'), '$.amount_paise',
+                                      cast(round(json_extract(data, '$.amount') * 100) as integer))
+         where json_type(data, '$.amount') is not null""" for t in (*REPLICATED_TABLES, "journal")),
+]
+
+# Journal columns added after the first release: (name, declaration)
+_JOURNAL_COLUMNS = [
+    ("user_email", "text"),
+    ("attempts", "integer not null default 0"),
+    ("last_error", "text"),
+    ("parked", "integer not null default 0"),  # 1 once the server has refused it MAX_PUSH_ATTEMPTS times
+]
+
+LOCAL_VIEWS = {"monthly_summaries": {"json_columns": ("category_totals",)},
+               "daily_summaries": {"json_columns": ()}}
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _ts(value):
+    """Normalize a timestamp string so local and Postgres values compare correctly"""
+    if not value:
+        return ""
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+class APIResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class _OfflineQuery:
+    """Query on a remote-only table while there is no Supabase client"""
+    def __init__(self, table):
+        self._table = table
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        raise ConnectionError(f"Supabase is unavailable; '{self._table}' is not stored locally")
+
+class _LocalQuery:
+    """The PostgREST builder subset NeuroBux uses, translated to SQLite"""
+    def __init__(self, replica, table):
+        self._replica = replica
+        self._table = table
+        self._is_view = table in LOCAL_VIEWS
+        self._action = "select"
+        self._columns = None
+        self._count = None
+        self._payload = None
+        self._where = []
+        self._params = []
+        self._user = None
+        self._order = []
+        self._limit = None
+        self._offset = 0
+
+    def _col(self, column):
+        if self._is_view or column in INDEXED_COLUMNS:
+            return column
+        return f"json_extract(data, '$.{column}')"
+
+    # --- actions ---
+    def select(self, columns="*", count=None):
+        cols = [c.strip() for c in columns.split(",")]
+        self._action = "select"
+        self._columns = None if "*" in cols else cols
+        self._count = count
+        return self
+
+    def insert(self, data):
+        self._action = "insert"
+        self._payload = data if isinstance(data, list) else [data]
+        return self
+
+    def upsert(self, data, on_conflict="id"):
+        self._action = "upsert"
+        self._payload = data if isinstance(data, list) else [data]
+        return self
+
+    def update(self, data):
+        self._action = "update"
+        self._payload = data
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    # --- filters ---
+    def _filter(self, column, op, value):
+        self._where.append(f"{self._col(column)} {op} ?")
+        self._params.append(value)
+        return self
+
+    def eq(self, column, value):
+        if column == "user_email":
+            self._user = value
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column, values):
+        values = list(values)
+        if column == "user_email":
+            self._replica.ensure_users(values)
+        self._where.append(f"{self._col(column)} in ({','.join('?' * len(values))})" if values else "0")
+        self._params.extend(values)
+        return self
+
+    def is_(self, column, value):
+        self._where.append(f"{self._col(column)} is {'null' if value in (None, 'null') else 'not null'}")
+        return self
+
+    def like(self, column, pattern):
+        glob = "".join("[" + ch + "]" if ch in "[]*?" else ch for ch in pattern).replace("%", "*").replace("_", "?")
+        return self._filter(column, "glob", glob)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, "like", pattern)
+
+    # --- modifiers ---
+    def order(self, column, desc=False):
+        self._order.append(f"{self._col(column)} {'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, size):
+        self._limit = size
+        return self
+
+    def range(self, start, end):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def _sql_where(self):
+        return (" where " + " and ".join(self._where)) if self._where else ""
+
+    def _decode(self, row):
+        if self._is_view:
+            out = dict(row)
+            for col in LOCAL_VIEWS[self._table]["json_columns"]:
+                out[col] = json.loads(out[col]) if out.get(col) else {}
+            return out
+        return dict(json.loads(row["data"]), id=row["id"], user_email=row["user_email"],
+                    date=row["date"], updated_at=row["updated_at"])
+
+    def execute(self):
+        if self._user:
+            self._replica.ensure_users([self._user])
+        if self._action == "select":
+            return self._select()
+        if self._is_view:
+            raise ValueError(f"'{self._table}' is read-only in the local replica")
+        return self._replica._write(self)
+
+    def _select(self):
+        sql = f"select * from {self._table}{self._sql_where()}"
+        if self._order:
+            sql += " order by " + ", ".join(self._order)
+        if self._limit is not None or self._offset:
+            sql += f" limit {-1 if self._limit is None else int(self._limit)} offset {int(self._offset)}"
+        with self._replica._db() as conn:
+            rows = [self._decode(r) for r in conn.execute(sql, self._params)]
+            count = None
+            if self._count:
+                count = conn.execute(f"select count(*) from {self._table}{self._sql_where()}", self._params).fetchone()[0]
+        if self._columns is not None:
+            rows = [{c: r.get(c) for c in self._columns} for r in rows]
+        return APIResponse(rows, count)
+
+class LocalReplicaClient:
+    def __init__(self, remote, path=DEFAULT_REPLICA_PATH):
+        self.remote = remote
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.RLock()  # Held across a whole push or pull; taken before _write_lock
+        self._wake = threading.Event()
+        self._thread = None
+        self._wanted = set()  # Users to replicate
+        self._pulled = set()  # ...of which the initial pull has finished this process
+        self.status = {'online': remote is not None, 'last_sync': None, 'error': None}
+        with self._db() as conn:
+            conn.execute("pragma journal_mode=wal")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            existing = {r["name"] for r in conn.execute("pragma table_info(journal)")}
+            for name, decl in _JOURNAL_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"alter table journal add column {name} {decl}")
+            for stmt in _UPGRADES:
+                conn.execute(stmt)
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- client surface ---
+    def table(self, name):
+        self.start_sync()
+        if name in REPLICATED_TABLES or name in LOCAL_VIEWS:
+            return _LocalQuery(self, name)
+        if self.remote is None:
+            return _OfflineQuery(name)
+        return self.remote.table(name)
+
+    def rpc(self, fn, params=None):
+        if self.remote is None:
+            return _OfflineQuery(fn)
+        return self.remote.rpc(fn, params)
+
+    def __getattr__(self, name):
+        # auth, storage, postgrest... belong to the remote client
+        if name == "remote" or self.__dict__.get("remote") is None:
+            raise AttributeError(name)
+        return getattr(self.remote, name)
+
+    # --- local writes ---
+    def _write(self, query):
+        table = query._table
+        stamp = _now()
+        with self._write_lock, self._db() as conn:
+            if query._action in ("insert", "upsert"):
+                rows = []
+                for row in query._payload:
+                    row = dict(row)
+                    # A caller-assigned row_id (writequeue.py) is the row's id here
+                    row_id = row.pop("row_id", None)
+                    row.update(id=str(row.get("id") or row_id or uuid.uuid4()), updated_at=stamp)
+                    row.setdefault("created_at", stamp)
+                    rows.append(row)
+                self._store(conn, table, rows)
+                self._journal(conn, table, "upsert", rows)
+                written = rows
+            else:
+                matched = [query._decode(r) for r in conn.execute(f"select * from {table}{query._sql_where()}", query._params)]
+                if query._action == "update":
+                    written = [dict(row, **query._payload, updated_at=stamp) for row in matched]
+                    self._store(conn, table, written)
+                    self._journal(conn, table, "upsert", written)
+                else:
+                    written = matched
+                    conn.executemany(f"delete from {table} where id = ?", [(row["id"],) for row in matched])
+                    self._journal(conn, table, "delete", matched)
+        if written:
+            self._wake.set()
+        return APIResponse(written)
+
+    def _store(self, conn, table, rows):
+        conn.executemany(
+            f"insert or replace into {table} (id, user_email, date, updated_at, data) values (?, ?, ?, ?, ?)",
+            [(r["id"], r["user_email"], r.get("date"), r["updated_at"],
+              json.dumps({k: v for k, v in r.items() if k not in INDEXED_COLUMNS})) for r in rows])
+
+    def _journal(self, conn, table, op, rows):
+        conn.executemany(
+            "insert into journal (tbl, op, row_id, user_email, data) values (?, ?, ?, ?, ?)",
+            [(table, op, r["id"], r["user_email"], json.dumps(r) if op == "upsert" else None) for r in rows])
+
+    # --- sync ---
+    def pending_count(self):
+        with self._db() as conn:
+            return conn.execute("select count(*) from journal where synced = 0 and parked = 0").fetchone()[0]
+
+    def parked(self):
+        """Changes the server kept refusing, oldest first"""
+        with self._db() as conn:
+            rows = conn.execute("select * from journal where parked = 1 order by seq").fetchall()
+        return [dict(r, data=json.loads(r["data"]) if r["data"] else None) for r in rows]
+
+    def retry_parked(self, seq=None):
+        """Put one parked change (or all of them) back in line"""
+        with self._db() as conn:
+            conn.execute("update journal set parked = 0, attempts = 0 where parked = 1 and (? is null or seq = ?)", (seq, seq))
+        self._wake.set()
+
+    def discard_parked(self, seq):
+        """Drop a parked change; the server's copy of the row comes back on the next pull"""
+        with self._sync_lock, self._write_lock, self._db() as conn:
+            entry = conn.execute("select * from journal where seq = ? and parked = 1", (seq,)).fetchone()
+            if entry is None:
+                return
+            conn.execute("delete from journal where seq = ?", (seq,))
+            if not conn.execute("select 1 from journal where row_id = ? and synced = 0", (entry["row_id"],)).fetchone():
+                conn.execute(f"delete from {entry['tbl']} where id = ?", (entry["row_id"],))
+            # Re-read the user's rows from scratch
+            conn.execute("update sync_state set watermark = null where ? is null or user_email = ?",
+                         (entry["user_email"], entry["user_email"]))
+
+    def _send(self, table, op, run):
+        if op == "upsert":
+            latest = {}  # Several edits to one row in a run collapse to the newest
+            for e in run:
+                row = json.loads(e["data"])
+                latest[e["row_id"]] = dict({k: v for k, v in row.items() if k not in LOCAL_ONLY_COLUMNS}, row_id=row["id"])
+            execute_query(self.remote.table(table).upsert(list(latest.values()), on_conflict="row_id"), table, "upsert")
+        else:
+            execute_query(self.remote.table(table).delete().in_("row_id", [e["row_id"] for e in run]), table, "delete")
+
+    def _sent(self, run):
+        seqs = [e["seq"] for e in run]
+        marks = ",".join("?" * len(seqs))
+        with self._db() as conn:
+            conn.execute(f"delete from journal where seq in ({marks})", seqs)
+            # A later change that went through supersedes anything parked for the same row
+            conn.execute(f"delete from journal where parked = 1 and tbl = ? and row_id in ({marks})",
+                         [run[0]["tbl"]] + [e["row_id"] for e in run])
+
+    def _refused(self, run, error):
+        """
+        Count a refused push against its entries. Returns None while they have
+        attempts left (the caller backs off and retries), otherwise sends them
+        one at a time, parks those the server still refuses, and returns how
+        many went through.
+        """
+        seqs = [e["seq"] for e in run]
+        marks = ",".join("?" * len(seqs))
+        with self._db() as conn:
+            conn.execute(f"update journal set attempts = attempts + 1, last_error = ? where seq in ({marks})",
+                         [str(error)] + seqs)
+        if max(e["attempts"] for e in run) + 1 < MAX_PUSH_ATTEMPTS:
+            return None
+        sent = 0
+        for entry in run:
+            try:
+                if len(run) == 1:
+                    raise error
+                self._send(entry["tbl"], entry["op"], [entry])
+            except Exception as e:
+                if is_unreachable(e):
+                    raise
+                with self._db() as conn:
+                    conn.execute("update journal set parked = 1, last_error = ? where seq = ?", (str(e), entry["seq"]))
+                continue
+            self._sent([entry])
+            sent += 1
+        return sent
+
+    def push(self):
+        """Send unsynced journal entries in order; returns how many were sent"""
+        sent = 0
+        with self._sync_lock:
+            while self.remote is not None:
+                with self._db() as conn:
+                    entries = conn.execute("select * from journal where synced = 0 and parked = 0 order by seq limit ?",
+                                           (PUSH_BATCH_SIZE,)).fetchall()
+                if not entries:
+                    break
+                # One request per leading run of the same table and operation keeps remote order intact
+                table, op = entries[0]["tbl"], entries[0]["op"]
+                run = list(itertools.takewhile(lambda e: (e["tbl"], e["op"]) == (table, op), entries))
+                try:
+                    self._send(table, op, run)
+                except Exception as e:
+                    if is_unreachable(e):
+                        raise
+                    isolated = self._refused(run, e)
+                    if isolated is None:
+                        raise
+                    sent += isolated
+                    continue
+                self._sent(run)
+                sent += len(run)
+        return sent
+
+    def _fetch_all(self, table, columns, user, since=None, stamp="server_updated_at", order="row_id", **filters):
+        rows = []
+        while True:
+            query = self.remote.table(table).select(columns).eq("user_email", user)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            if since:
+                query = query.gte(stamp, since)
+            page = execute_query(query.order(order).range(len(rows), len(rows) + PULL_PAGE_SIZE - 1), table, "select").data
+            rows.extend(page)
+            if len(page) < PULL_PAGE_SIZE:
+                return rows
+
+    def _tombstones(self, table, user, since):
+        """Remote deletes since the watermark, or None if the server has no deleted_rows table yet"""
+        try:
+            return self._fetch_all("deleted_rows", "row_id, deleted_at", user, since, stamp="deleted_at", table_name=table)
+        except Exception as e:
+            if is_unreachable(e):
+                raise
+            return None
+
+    def pull(self, user):
+        """Bring the replica up to date with the remote for one user; returns rows changed"""
+        if self.remote is None:
+            return 0
+        with self._sync_lock:
+            with self._db() as conn:
+                state = conn.execute("select watermark from sync_state where user_email = ?", (user,)).fetchone()
+            since = None
+            if state and state["watermark"]:
+                since = (datetime.fromisoformat(state["watermark"]) - PULL_OVERLAP).isoformat()
+            watermark = state["watermark"] if state else None
+            changed = 0
+            for table in REPLICATED_TABLES:
+                remote_rows = self._fetch_all(table, "*", user, since)
+                # Deletes since the watermark; the first pull (or an older server) compares full row_id lists instead
+                tombstones = self._tombstones(table, user, since) if since else None
+                remote_ids = None
+                if tombstones is None:
+                    remote_ids = {str(r["row_id"]) for r in self._fetch_all(table, "row_id", user)}
+                with self._write_lock, self._db() as conn:
+                    dirty = {r[0] for r in conn.execute("select row_id from journal where synced = 0 and tbl = ?", (table,))}
+                    local = {r["id"]: (r["updated_at"], _ts(r["server_updated_at"])) for r in conn.execute(
+                        f"select id, updated_at, json_extract(data, '$.server_updated_at') as server_updated_at"
+                        f" from {table} where user_email = ?", (user,))}
+                    fetched = {}
+                    incoming = []
+                    for r in remote_rows:
+                        row_id = str(r["row_id"])
+                        if r.get("server_updated_at"):
+                            fetched[row_id] = _ts(r["server_updated_at"])
+                            watermark = max(watermark or "", fetched[row_id])
+                        # Last write wins; unpushed local edits are newer by definition. Our own pushed write
+                        # comes back with the same updated_at but server-set columns (remote id, anomaly_*
+                        # from migrations/005) and a new server_updated_at, so that copy replaces ours.
+                        if row_id in dirty:
+                            continue
+                        if row_id in local:
+                            updated_at, server_updated_at = local[row_id]
+                            remote_updated_at = _ts(r.get("updated_at"))
+                            if remote_updated_at < updated_at or (
+                                    remote_updated_at == updated_at and fetched.get(row_id, "") <= server_updated_at):
+                                continue
+                        row = {k: v for k, v in r.items() if k not in ("row_id", "id")}
+                        row.update(id=row_id, remote_id=r.get("id"), updated_at=_ts(r.get("updated_at")))
+                        incoming.append(row)
+                    self._store(conn, table, incoming)
+                    # Rows deleted remotely and not touched here since
+                    if tombstones is None:
+                        gone = [i for i in local if i not in remote_ids and i not in dirty]
+                    else:
+                        gone = []
+                        for t in tombstones:
+                            row_id, deleted_at = str(t["row_id"]), _ts(t["deleted_at"])
+                            watermark = max(watermark or "", deleted_at)
+                            # A row written again after its delete comes back in remote_rows with a newer stamp
+                            if row_id in local and row_id not in dirty and fetched.get(row_id, "") <= deleted_at:
+                                gone.append(row_id)
+                    conn.executemany(f"delete from {table} where id = ?", [(i,) for i in gone])
+                    changed += len(incoming) + len(gone)
+            with self._db() as conn:
+                conn.execute("insert or replace into sync_state (user_email, watermark) values (?, ?)", (user, watermark))
+        if changed:
+            from database import bump_data_version
+            bump_data_version(user)
+        return changed
+
+    def ensure_users(self, users):
+        """Have the sync thread pull users this process hasn't pulled yet, so a new device gets their data"""
+        new = set(users) - self._wanted
+        if new:
+            self._wanted.update(new)
+            self._wake.set()
+
+    def is_loading(self, user):
+        """True until the first pull of this user's data has finished"""
+        return self.remote is not None and user not in self._pulled
+
+    def _cycle(self, users):
+        """Push, then pull `users`. A refused push doesn't hold the pulls back; the first error is raised after."""
+        refused = None
+        with self._sync_lock:
+            try:
+                self.push()
+            except Exception as e:
+                if is_unreachable(e):
+                    raise
+                refused = e
+            for user in users:
+                self.pull(user)
+                self._pulled.add(user)
+        if refused is not None:
+            raise refused
+
+    def sync_user(self, user):
+        self._wanted.add(user)
+        self._cycle([user])
+        self._mark()
+
+    def _mark(self, error=None):
+        self.status = {'online': error is None and self.remote is not None,
+                       'last_sync': datetime.now() if error is None else self.status['last_sync'],
+                       'error': None if error is None else str(error)}
+
+    def _run(self):
+        delay = PULL_INTERVAL_SECONDS
+        while True:
+            woke = self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                # A wake-up (local write, new user) pushes and does initial pulls; the timer also pulls everyone
+                fresh = self._wanted - self._pulled
+                self._cycle(sorted(fresh if woke else fresh | self._pulled))
+                self._mark()
+                delay = PULL_INTERVAL_SECONDS
+            except Exception as e:
+                self._mark(error=e)
+                delay = min(delay * 2, MAX_BACKOFF_SECONDS)
+
+    def start_sync(self):
+        with self._write_lock:
+            if self.remote is not None and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+                self._thread.start()
+        return self
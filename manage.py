@@ -0,0 +1,65 @@
+"""
+Maintenance commands for NeuroBux.
+
+    python manage.py rebuild-summaries              # all users
+    python manage.py rebuild-summaries --user a@b.com
+    python manage.py precompute                     # refresh stale analytics once
+    python manage.py precompute --loop --interval 600 --workers 4
+"""
+import argparse
+import sys
+
+
+def rebuild_summaries(args):
+    from database import init_supabase, MonthlySummaryManager, DailySummaryManager
+    client = init_supabase()
+    if not client:
+        print("Supabase client not initialized; check .streamlit/secrets.toml")
+        return 1
+    rows = MonthlySummaryManager(client).rebuild(args.user)
+    print(f"Rebuilt monthly summaries for {args.user or 'all users'}: {rows} rows")
+    rows = DailySummaryManager(client).rebuild(args.user)
+    print(f"Rebuilt daily summaries for {args.user or 'all users'}: {rows} rows")
+    return 0
+
+
+def precompute(args):
+    from database import init_supabase
+    from precompute import PrecomputeScheduler
+    client = init_supabase()
+    if not client:
+        print("Supabase client not initialized; check .streamlit/secrets.toml")
+        return 1
+    scheduler = PrecomputeScheduler(client, workers=args.workers)
+    if args.loop:
+        print(f"Precomputing analytics every {args.interval}s with {scheduler.workers} workers (Ctrl+C to stop)")
+        try:
+            scheduler.run_forever(args.interval)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    refreshed = scheduler.run_once()
+    print(f"Precomputed analytics for {refreshed} users")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NeuroBux maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-summaries", help="Recompute monthly_summaries and daily_summaries from raw rows")
+    rebuild.add_argument("--user", help="Only rebuild this user's summaries")
+    rebuild.set_defaults(func=rebuild_summaries)
+
+    pre = commands.add_parser("precompute", help="Refresh precomputed analytics for recently active users")
+    pre.add_argument("--loop", action="store_true", help="Keep running, one pass every --interval seconds")
+    pre.add_argument("--interval", type=int, default=600, help="Seconds between passes with --loop")
+    pre.add_argument("--workers", type=int, help="Worker processes (default: CPU count - 1)")
+    pre.set_defaults(func=precompute)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_str(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(n, "") for n in self.label_names), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.label_names, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(n, "") for n in self.label_names))
+        return series[-1] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _label_str(self.label_names, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _label_str(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.label_names, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.label_names, key)} {series[-1]}")
+        return lines
+
+class Registry:
+    """Process-wide collection of metrics, rendered in Prometheus text format"""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+DB_LATENCY = REGISTRY.histogram(
+    "neurobux_db_request_seconds", "Supabase request latency", ("table", "operation"))
+DB_ERRORS = REGISTRY.counter(
+    "neurobux_db_errors_total", "Supabase requests that raised", ("table", "operation"))
+DB_ROWS = REGISTRY.counter(
+    "neurobux_db_rows_fetched_total", "Rows returned by Supabase selects", ("table",))
+LLM_FIRST_TOKEN = REGISTRY.histogram(
+    "neurobux_llm_time_to_first_token_seconds", "Time from request to first streamed token", ("model",))
+LLM_TOTAL = REGISTRY.histogram(
+    "neurobux_llm_request_seconds", "Total LLM request time", ("model", "status"))
+PRICE_LOOKUPS = REGISTRY.histogram(
+    "neurobux_price_lookup_seconds", "yfinance live price lookups", ("status",))
+CACHE_REQUESTS = REGISTRY.counter(
+    "neurobux_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+SINGLEFLIGHT_SHARED = REGISTRY.counter(
+    "neurobux_singleflight_shared_total", "Calls served by joining an identical in-flight call", ("op",))
+
+def execute_query(query, table, operation):
+    """Run a Supabase query, recording its latency, errors and rows fetched"""
+    start = time.perf_counter()
+    try:
+        result = query.execute()
+    except Exception:
+        DB_ERRORS.inc(table=table, operation=operation)
+        raise
+    finally:
+        DB_LATENCY.observe(time.perf_counter() - start, table=table, operation=operation)
+    if operation == "select":
+        DB_ROWS.inc(len(result.data or []), table=table)
+    return result
+
+def is_unreachable(error):
+    """The database couldn't be reached, as opposed to answering with an error"""
+    return isinstance(error, (OSError, httpx.TransportError))
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def dump(path, registry=REGISTRY):
+    """Write the current metrics to a file (e.g. for node_exporter's textfile collector)"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(registry.render())
+    os.replace(tmp, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would otherwise flood the Streamlit log
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread and return the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_file_dumper(path, interval=15):
+    """Periodically dump metrics to path on a daemon thread"""
+    def loop():
+        while True:
+            try:
+                dump(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+    thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
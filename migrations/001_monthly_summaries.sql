@@ -0,0 +1,168 @@
+-- Materialized per-user, per-month summaries of expenses and income.
+--
+-- Statement-level triggers keep monthly_summaries in step with every insert,
+-- update and delete on expenses/income, inside the same transaction as the
+-- write. Inserts are folded in incrementally; deletes and updates recompute
+-- only the (user, month) rows they touched, so min/max stay exact.
+--
+-- Repair drift with:  select rebuild_monthly_summaries();          -- everyone
+--                     select rebuild_monthly_summaries('a@b.com'); -- one user
+
+create table if not exists monthly_summaries (
+    user_email      text        not null,
+    kind            text        not null check (kind in ('expense', 'income')),
+    month           text        not null,  -- 'YYYY-MM'
+    total           numeric     not null default 0,
+    txn_count       integer     not null default 0,
+    min_amount      numeric,
+    max_amount      numeric,
+    category_totals jsonb       not null default '{}'::jsonb,
+    updated_at      timestamptz not null default now(),
+    primary key (user_email, kind, month)
+);
+
+-- First day of the month after 'YYYY-MM', as 'YYYY-MM-DD'
+create or replace function month_end_exclusive(p_month text)
+returns text language sql immutable as $$
+    select to_char((p_month || '-01')::date + interval '1 month', 'YYYY-MM-DD')
+$$;
+
+create or replace function refresh_monthly_summary(p_user text, p_kind text, p_month text)
+returns void language plpgsql as $$
+begin
+    delete from monthly_summaries
+     where user_email = p_user and kind = p_kind and month = p_month;
+
+    if p_kind = 'expense' then
+        insert into monthly_summaries (user_email, kind, month, total, txn_count, min_amount, max_amount, category_totals)
+        select p_user, 'expense', p_month, sum(cat_total), sum(cat_count), min(cat_min), max(cat_max),
+               jsonb_object_agg(category, cat_total)
+          from (select category, sum(amount) as cat_total, count(*) as cat_count,
+                       min(amount) as cat_min, max(amount) as cat_max
+                  from expenses
+                 where user_email = p_user
+                   and date >= p_month || '-01' and date < month_end_exclusive(p_month)
+                 group by category) c
+        having count(*) > 0;
+    else
+        insert into monthly_summaries (user_email, kind, month, total, txn_count, min_amount, max_amount)
+        select p_user, 'income', p_month, sum(amount), count(*), min(amount), max(amount)
+          from income
+         where user_email = p_user
+           and date >= p_month || '-01' and date < month_end_exclusive(p_month)
+        having count(*) > 0;
+    end if;
+end $$;
+
+create or replace function merge_category_totals(a jsonb, b jsonb)
+returns jsonb language sql immutable as $$
+    select coalesce(jsonb_object_agg(key, total), '{}'::jsonb)
+      from (select key, sum(value::numeric) as total
+              from (select * from jsonb_each_text(a) union all select * from jsonb_each_text(b)) kv
+             group by key) merged
+$$;
+
+create or replace function monthly_summaries_after_insert()
+returns trigger language plpgsql as $$
+begin
+    if tg_table_name = 'expenses' then
+        insert into monthly_summaries as s (user_email, kind, month, total, txn_count, min_amount, max_amount, category_totals)
+        select user_email, 'expense', month, sum(cat_total), sum(cat_count), min(cat_min), max(cat_max),
+               jsonb_object_agg(category, cat_total)
+          from (select user_email, left(date::text, 7) as month, category,
+                       sum(amount) as cat_total, count(*) as cat_count,
+                       min(amount) as cat_min, max(amount) as cat_max
+                  from new_rows
+                 group by 1, 2, 3) g
+         group by user_email, month
+        on conflict (user_email, kind, month) do update set
+            total           = s.total + excluded.total,
+            txn_count       = s.txn_count + excluded.txn_count,
+            min_amount      = least(s.min_amount, excluded.min_amount),
+            max_amount      = greatest(s.max_amount, excluded.max_amount),
+            category_totals = merge_category_totals(s.category_totals, excluded.category_totals),
+            updated_at      = now();
+    else
+        insert into monthly_summaries as s (user_email, kind, month, total, txn_count, min_amount, max_amount)
+        select user_email, 'income', left(date::text, 7), sum(amount), count(*), min(amount), max(amount)
+          from new_rows
+         group by 1, 3
+        on conflict (user_email, kind, month) do update set
+            total      = s.total + excluded.total,
+            txn_count  = s.txn_count + excluded.txn_count,
+            min_amount = least(s.min_amount, excluded.min_amount),
+            max_amount = greatest(s.max_amount, excluded.max_amount),
+            updated_at = now();
+    end if;
+    return null;
+end $$;
+
+create or replace function monthly_summaries_after_change()
+returns trigger language plpgsql as $$
+declare
+    v_kind text := case when tg_table_name = 'expenses' then 'expense' else 'income' end;
+    r record;
+begin
+    if tg_op = 'UPDATE' then
+        for r in select distinct user_email, left(date::text, 7) as month from old_rows
+                 union
+                 select distinct user_email, left(date::text, 7) from new_rows loop
+            perform refresh_monthly_summary(r.user_email, v_kind, r.month);
+        end loop;
+    else
+        for r in select distinct user_email, left(date::text, 7) as month from old_rows loop
+            perform refresh_monthly_summary(r.user_email, v_kind, r.month);
+        end loop;
+    end if;
+    return null;
+end $$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['expenses', 'income'] loop
+        execute format('drop trigger if exists %1$s_summary_insert on %1$s', t);
+        execute format('drop trigger if exists %1$s_summary_delete on %1$s', t);
+        execute format('drop trigger if exists %1$s_summary_update on %1$s', t);
+        execute format('create trigger %1$s_summary_insert after insert on %1$s
+                        referencing new table as new_rows
+                        for each statement execute function monthly_summaries_after_insert()', t);
+        execute format('create trigger %1$s_summary_delete after delete on %1$s
+                        referencing old table as old_rows
+                        for each statement execute function monthly_summaries_after_change()', t);
+        execute format('create trigger %1$s_summary_update after update on %1$s
+                        referencing old table as old_rows new table as new_rows
+                        for each statement execute function monthly_summaries_after_change()', t);
+    end loop;
+end $$;
+
+create or replace function rebuild_monthly_summaries(p_user text default null)
+returns integer language plpgsql as $$
+declare
+    v_rows integer;
+begin
+    delete from monthly_summaries where p_user is null or user_email = p_user;
+
+    insert into monthly_summaries (user_email, kind, month, total, txn_count, min_amount, max_amount, category_totals)
+    select user_email, 'expense', month, sum(cat_total), sum(cat_count), min(cat_min), max(cat_max),
+           jsonb_object_agg(category, cat_total)
+      from (select user_email, left(date::text, 7) as month, category,
+                   sum(amount) as cat_total, count(*) as cat_count,
+                   min(amount) as cat_min, max(amount) as cat_max
+              from expenses
+             where p_user is null or user_email = p_user
+             group by 1, 2, 3) g
+     group by user_email, month;
+
+    insert into monthly_summaries (user_email, kind, month, total, txn_count, min_amount, max_amount)
+    select user_email, 'income', left(date::text, 7), sum(amount), count(*), min(amount), max(amount)
+      from income
+     where p_user is null or user_email = p_user
+     group by 1, 3;
+
+    select count(*) into v_rows from monthly_summaries where p_user is null or user_email = p_user;
+    return v_rows;
+end $$;
+
+select rebuild_monthly_summaries();
@@ -0,0 +1,57 @@
+-- Precomputed analytics with a data-version stamp.
+--
+-- user_data_versions.version is bumped by every write to a user's expenses or
+-- income, so any process can tell whether a cached result is still current.
+-- analytics_cache holds the precompute worker's output (see precompute.py).
+
+create table if not exists user_data_versions (
+    user_email text        primary key,
+    version    bigint      not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function bump_user_data_version()
+returns trigger language plpgsql as $$
+begin
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into user_data_versions as v (user_email, version)
+        select distinct user_email, 1 from new_rows
+        on conflict (user_email) do update set version = v.version + 1, updated_at = now();
+    end if;
+    if tg_op in ('DELETE', 'UPDATE') then
+        insert into user_data_versions as v (user_email, version)
+        select distinct user_email, 1 from old_rows
+        on conflict (user_email) do update set version = v.version + 1, updated_at = now();
+    end if;
+    return null;
+end $$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['expenses', 'income'] loop
+        execute format('drop trigger if exists %1$s_version_insert on %1$s', t);
+        execute format('drop trigger if exists %1$s_version_delete on %1$s', t);
+        execute format('drop trigger if exists %1$s_version_update on %1$s', t);
+        execute format('create trigger %1$s_version_insert after insert on %1$s
+                        referencing new table as new_rows
+                        for each statement execute function bump_user_data_version()', t);
+        execute format('create trigger %1$s_version_delete after delete on %1$s
+                        referencing old table as old_rows
+                        for each statement execute function bump_user_data_version()', t);
+        execute format('create trigger %1$s_version_update after update on %1$s
+                        referencing old table as old_rows new table as new_rows
+                        for each statement execute function bump_user_data_version()', t);
+    end loop;
+end $$;
+
+create table if not exists analytics_cache (
+    user_email   text        primary key,
+    data_version bigint      not null,
+    computed_for date        not null,  -- results depend on "today" (forecast, current month)
+    computed_at  timestamptz not null default now(),
+    payload      jsonb       not null
+);
+
+create index if not exists auth_users_last_login_idx on auth_users (last_login);
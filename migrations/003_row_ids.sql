@@ -0,0 +1,46 @@
+-- Client-generated row IDs and write timestamps for the offline replica.
+--
+-- row_id is assigned by the app (localstore.py) when a row is first written,
+-- so the same row can be pushed repeatedly without duplicating it: sync
+-- upserts on row_id. updated_at is the client's write time and decides
+-- last-write-wins; server_updated_at is stamped here on every write and is
+-- what replicas use as their pull watermark (client clocks can't be trusted
+-- to be monotonic across devices).
+
+create extension if not exists pgcrypto;  -- gen_random_uuid() before PG 13
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['expenses', 'income'] loop
+        execute format('alter table %1$s
+                            add column if not exists row_id            uuid        not null default gen_random_uuid(),
+                            add column if not exists updated_at        timestamptz not null default now(),
+                            add column if not exists server_updated_at timestamptz not null default now()', t);
+        execute format('create unique index if not exists %1$s_row_id_key on %1$s (row_id)', t);
+        execute format('create index if not exists %1$s_user_server_updated_idx on %1$s (user_email, server_updated_at)', t);
+    end loop;
+end $$;
+
+-- Skip updates that carry an older client timestamp than the stored row
+create or replace function keep_newest_write()
+returns trigger language plpgsql as $$
+begin
+    if tg_op = 'UPDATE' and new.updated_at < old.updated_at then
+        return null;
+    end if;
+    new.server_updated_at := now();
+    return new;
+end $$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['expenses', 'income'] loop
+        execute format('drop trigger if exists %1$s_keep_newest on %1$s', t);
+        execute format('create trigger %1$s_keep_newest before insert or update on %1$s
+                        for each row execute function keep_newest_write()', t);
+    end loop;
+end $$;
@@ -0,0 +1,17 @@
+-- Bank descriptions on imported expenses, and per-user auto-categorization
+-- rules (see categorizer.py). Lower priority values are tried first; user
+-- rules always run before the built-in defaults.
+
+alter table expenses add column if not exists description text;
+
+create table if not exists category_rules (
+    id         bigint generated always as identity primary key,
+    user_email text    not null,
+    pattern    text    not null,
+    category   text    not null,
+    is_regex   boolean not null default false,
+    priority   integer not null default 100,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists category_rules_user_idx on category_rules (user_email, priority);
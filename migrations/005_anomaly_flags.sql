@@ -0,0 +1,199 @@
+-- Streaming anomaly flags on expenses.
+--
+-- category_stats keeps a running count, mean and sum of squared deviations
+-- (Welford's m2) of amount per (user, category). Each expense is scored as it
+-- is written, in O(1), against the statistics of everything written before
+-- it: |z| > 2 is 'medium', |z| > 3 is 'high', the same thresholds as the
+-- batch check in SpendingAnalyzer._detect_anomalies. The score is stored on
+-- the row, so the analytics page reads flagged rows through a partial index
+-- instead of rescanning history.
+--
+-- Scoring happens in a BEFORE row trigger; the statistics are folded in by
+-- statement-level AFTER triggers (Welford's update generalised to a batch,
+-- so an upsert that turns into an update is never counted twice). Rows in
+-- one bulk insert are therefore scored against the statistics as they stood
+-- before that statement. Deletes take their rows back out of the statistics
+-- but don't rescore rows that were already flagged.
+--
+-- Repair drift with:  select rebuild_category_stats();          -- everyone
+--                     select rebuild_category_stats('a@b.com'); -- one user
+
+alter table expenses
+    add column if not exists anomaly_z        double precision,
+    add column if not exists anomaly_severity text check (anomaly_severity in ('medium', 'high'));
+
+create index if not exists expenses_flagged_idx
+    on expenses (user_email, date desc) where anomaly_severity is not null;
+
+create table if not exists category_stats (
+    user_email text             not null,
+    category   text             not null,
+    n          bigint           not null default 0,
+    mean       double precision not null default 0,
+    m2         double precision not null default 0,
+    updated_at timestamptz      not null default now(),
+    primary key (user_email, category)
+);
+
+-- Fold (or, with p_sign = -1, take back out) a batch of rows into category_stats.
+-- Batches are combined with the parallel form of Welford's update:
+--   n = na + nb,  delta = mean_b - mean_a,
+--   mean = mean_a + delta * nb / n,  m2 = m2_a + m2_b + delta^2 * na * nb / n
+create or replace function merge_category_stats(p_user text, p_category text, p_n bigint,
+                                                p_mean double precision, p_m2 double precision,
+                                                p_sign integer default 1)
+returns void language plpgsql as $$
+declare
+    s category_stats%rowtype;
+    v_n bigint;
+    v_delta double precision;
+begin
+    insert into category_stats (user_email, category) values (p_user, p_category)
+    on conflict (user_email, category) do nothing;
+    select * into s from category_stats where user_email = p_user and category = p_category for update;
+
+    if p_sign > 0 then
+        v_n := s.n + p_n;
+        v_delta := p_mean - s.mean;
+        update category_stats
+           set n = v_n,
+               mean = s.mean + v_delta * p_n / v_n,
+               m2 = s.m2 + p_m2 + v_delta * v_delta * s.n * p_n / v_n,
+               updated_at = now()
+         where user_email = p_user and category = p_category;
+    else
+        v_n := s.n - p_n;
+        if v_n <= 0 then
+            delete from category_stats where user_email = p_user and category = p_category;
+            return;
+        end if;
+        -- Mean of what remains, then undo the combine step
+        v_delta := p_mean - (s.n * s.mean - p_n * p_mean) / v_n;
+        update category_stats
+           set n = v_n,
+               mean = (s.n * s.mean - p_n * p_mean) / v_n,
+               m2 = greatest(s.m2 - p_m2 - v_delta * v_delta * v_n * p_n / s.n, 0),
+               updated_at = now()
+         where user_email = p_user and category = p_category;
+    end if;
+end $$;
+
+create or replace function score_expense_anomaly()
+returns trigger language plpgsql as $$
+declare
+    s category_stats%rowtype;
+    v_z double precision;
+begin
+    if tg_op = 'UPDATE' and new.amount = old.amount and new.category = old.category
+       and new.user_email = old.user_email then
+        new.anomaly_z := old.anomaly_z;
+        new.anomaly_severity := old.anomaly_severity;
+        return new;
+    end if;
+
+    new.anomaly_z := null;
+    new.anomaly_severity := null;
+    select * into s from category_stats where user_email = new.user_email and category = new.category;
+    if found and s.n >= 5 and s.m2 > 0 then
+        v_z := (new.amount - s.mean) / sqrt(s.m2 / (s.n - 1));
+        new.anomaly_z := v_z;
+        new.anomaly_severity := case when abs(v_z) > 3 then 'high' when abs(v_z) > 2 then 'medium' end;
+    end if;
+    return new;
+end $$;
+
+-- Transition tables only exist for the trigger's own event, so each branch
+-- reads just the one(s) it has; updates only move rows whose amount,
+-- category or owner changed.
+create or replace function category_stats_after_write()
+returns trigger language plpgsql as $$
+declare
+    r record;
+begin
+    if tg_op = 'INSERT' then
+        for r in select user_email, category, count(*) as n, avg(amount::double precision) as mean,
+                        var_pop(amount::double precision) * count(*) as m2
+                   from new_rows group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2);
+        end loop;
+    elsif tg_op = 'DELETE' then
+        for r in select user_email, category, count(*) as n, avg(amount::double precision) as mean,
+                        var_pop(amount::double precision) * count(*) as m2
+                   from old_rows group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2, -1);
+        end loop;
+    else
+        for r in select o.user_email, o.category, count(*) as n, avg(o.amount::double precision) as mean,
+                        var_pop(o.amount::double precision) * count(*) as m2
+                   from old_rows o join new_rows n on n.id = o.id
+                  where (n.amount, n.category, n.user_email) is distinct from (o.amount, o.category, o.user_email)
+                  group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2, -1);
+        end loop;
+        for r in select n.user_email, n.category, count(*) as n, avg(n.amount::double precision) as mean,
+                        var_pop(n.amount::double precision) * count(*) as m2
+                   from new_rows n join old_rows o on o.id = n.id
+                  where (n.amount, n.category, n.user_email) is distinct from (o.amount, o.category, o.user_email)
+                  group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2);
+        end loop;
+    end if;
+    return null;
+end $$;
+
+create or replace function rebuild_category_stats(p_user text default null)
+returns integer language plpgsql as $$
+declare
+    v_rows integer;
+begin
+    delete from category_stats where p_user is null or user_email = p_user;
+
+    insert into category_stats (user_email, category, n, mean, m2)
+    select user_email, category, count(*), avg(amount::double precision),
+           var_pop(amount::double precision) * count(*)
+      from expenses
+     where p_user is null or user_email = p_user
+     group by 1, 2;
+
+    select count(*) into v_rows from category_stats where p_user is null or user_email = p_user;
+    return v_rows;
+end $$;
+
+select rebuild_category_stats();
+
+-- Score existing history the way it would have been scored as it streamed in:
+-- each row against the rows before it in its category. Amounts don't change,
+-- so the monthly summary refresh is skipped for this one pass.
+alter table expenses disable trigger expenses_summary_update;
+
+with scored as (
+    select id, count(*) over w as n,
+           (amount - avg(amount::double precision) over w) / nullif(stddev_samp(amount::double precision) over w, 0) as z
+      from expenses
+    window w as (partition by user_email, category order by id rows between unbounded preceding and 1 preceding)
+)
+update expenses e
+   set anomaly_z = s.z,
+       anomaly_severity = case when abs(s.z) > 3 then 'high' when abs(s.z) > 2 then 'medium' end
+  from scored s
+ where e.id = s.id and s.n >= 5 and s.z is not null;
+
+alter table expenses enable trigger expenses_summary_update;
+
+-- Named to fire after expenses_keep_newest (migrations/003), which may skip stale updates
+drop trigger if exists expenses_score_anomaly on expenses;
+create trigger expenses_score_anomaly before insert or update on expenses
+    for each row execute function score_expense_anomaly();
+
+drop trigger if exists expenses_stats_insert on expenses;
+drop trigger if exists expenses_stats_delete on expenses;
+drop trigger if exists expenses_stats_update on expenses;
+create trigger expenses_stats_insert after insert on expenses
+    referencing new table as new_rows
+    for each statement execute function category_stats_after_write();
+create trigger expenses_stats_delete after delete on expenses
+    referencing old table as old_rows
+    for each statement execute function category_stats_after_write();
+create trigger expenses_stats_update after update on expenses
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function category_stats_after_write();
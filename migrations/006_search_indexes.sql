@@ -0,0 +1,11 @@
+-- Indexes behind ExpenseManager.search_expenses (View Expenses search).
+--
+-- Category prefixes are resolved to exact category names in the app (an
+-- in-memory index per user), so a category search is an equality/IN lookup
+-- on (user_email, category) and reads the newest rows straight off the index.
+-- Searches without a category use the date index; amount-only searches
+-- (e.g. "everything over 5000") use the amount index.
+
+create index if not exists expenses_user_category_date_idx on expenses (user_email, category, date desc);
+create index if not exists expenses_user_date_idx          on expenses (user_email, date desc);
+create index if not exists expenses_user_amount_idx        on expenses (user_email, amount);
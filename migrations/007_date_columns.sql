@@ -0,0 +1,96 @@
+-- Real date columns for expenses/income, with a composite (user_email, date) index.
+--
+-- date used to be text, so every month/week/custom window was a string
+-- comparison and a malformed value ('2025-02-31') was silently accepted.
+-- As a date column, ExpenseManager/IncomeManager range reads
+-- (get_*_between, get_*_for_period, and the month paths built on them) are
+-- seeks on (user_email, date). The index includes the columns the range
+-- readers aggregate, so summing a window can be answered from the index alone.
+--
+-- PostgREST still returns dates as 'YYYY-MM-DD', so the app reads them as before.
+--
+-- Legacy values that aren't an ISO date or don't exist ('2025-02-31',
+-- '15/01/2025') would abort the type change, so they are quarantined first:
+-- each such row is copied whole into date_quarantine and its date set to
+-- null. Review and repair them afterwards with  select * from date_quarantine;
+
+create table if not exists date_quarantine (
+    table_name     text        not null,
+    row_id         uuid,
+    user_email     text,
+    raw_date       text,
+    row_data       jsonb       not null,
+    quarantined_at timestamptz not null default now()
+);
+
+create or replace function pg_temp.is_iso_date(p_value text)
+returns boolean language plpgsql as $$
+begin
+    if p_value !~ '^\d{4}-\d{1,2}-\d{1,2}$' then
+        return false;
+    end if;
+    perform p_value::date;
+    return true;
+exception when others then
+    return false;
+end $$;
+
+do $$
+declare
+    t text;
+    n integer;
+begin
+    foreach t in array array['expenses', 'income'] loop
+        if (select data_type from information_schema.columns
+             where table_schema = 'public' and table_name = t and column_name = 'date') <> 'date' then
+            execute format('insert into date_quarantine (table_name, row_id, user_email, raw_date, row_data)
+                            select %1$L, row_id, user_email, date, to_jsonb(r) from %1$s r
+                             where nullif(trim(date), %2$L) is not null and not pg_temp.is_iso_date(trim(date))', t, '');
+            get diagnostics n = row_count;
+            if n > 0 then
+                raise notice '%: % rows with an invalid date moved to date_quarantine (date set to null)', t, n;
+                execute format('alter table %1$s alter column date drop not null', t);
+                execute format('update %1$s set date = null
+                                 where nullif(trim(date), %2$L) is not null and not pg_temp.is_iso_date(trim(date))', t, '');
+            end if;
+            execute format('alter table %1$s alter column date type date using nullif(trim(date), %2$L)::date', t, '');
+        end if;
+    end loop;
+end $$;
+
+-- Replaces the (user_email, date desc) index from migrations/006; a btree is
+-- scanned backwards just as cheaply for newest-first reads
+drop index if exists expenses_user_date_idx;
+drop index if exists income_user_date_idx;
+create index expenses_user_date_idx on expenses (user_email, date) include (category, amount);
+create index income_user_date_idx   on income   (user_email, date) include (amount);
+
+-- refresh_monthly_summary (migrations/001) compared date with text bounds;
+-- same function with date bounds
+create or replace function refresh_monthly_summary(p_user text, p_kind text, p_month text)
+returns void language plpgsql as $$
+declare
+    v_start date := (p_month || '-01')::date;
+    v_end   date := ((p_month || '-01')::date + interval '1 month')::date;
+begin
+    delete from monthly_summaries
+     where user_email = p_user and kind = p_kind and month = p_month;
+
+    if p_kind = 'expense' then
+        insert into monthly_summaries (user_email, kind, month, total, txn_count, min_amount, max_amount, category_totals)
+        select p_user, 'expense', p_month, sum(cat_total), sum(cat_count), min(cat_min), max(cat_max),
+               jsonb_object_agg(category, cat_total)
+          from (select category, sum(amount) as cat_total, count(*) as cat_count,
+                       min(amount) as cat_min, max(amount) as cat_max
+                  from expenses
+                 where user_email = p_user and date >= v_start and date < v_end
+                 group by category) c
+        having count(*) > 0;
+    else
+        insert into monthly_summaries (user_email, kind, month, total, txn_count, min_amount, max_amount)
+        select p_user, 'income', p_month, sum(amount), count(*), min(amount), max(amount)
+          from income
+         where user_email = p_user and date >= v_start and date < v_end
+        having count(*) > 0;
+    end if;
+end $$;
@@ -0,0 +1,239 @@
+-- Amounts as bigint paise (₹1 = 100 paise) instead of floating rupees.
+--
+-- expenses.amount / income.amount become amount_paise, and the monthly
+-- summaries and category statistics are rebuilt from it, so every stored
+-- total is an exact integer sum. The app converts to rupees only for display
+-- (money.py). Deploy together with the app version that writes amount_paise:
+-- the old amount column is dropped.
+
+-- 1. New column, backfilled from the old one. Amounts don't change, so the
+--    summary, scoring and statistics triggers are skipped for this pass
+--    (keep_newest still stamps server_updated_at, so replicas re-pull the rows).
+alter table expenses disable trigger expenses_summary_update;
+alter table expenses disable trigger expenses_score_anomaly;
+alter table expenses disable trigger expenses_stats_update;
+alter table income disable trigger income_summary_update;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['expenses', 'income'] loop
+        execute format('alter table %1$s add column if not exists amount_paise bigint', t);
+        if exists (select 1 from information_schema.columns
+                    where table_schema = 'public' and table_name = t and column_name = 'amount') then
+            execute format('update %1$s set amount_paise = round(amount::numeric * 100) where amount_paise is null', t);
+        end if;
+        execute format('alter table %1$s alter column amount_paise set not null', t);
+        execute format('alter table %1$s drop constraint if exists %1$s_amount_paise_positive', t);
+        execute format('alter table %1$s add constraint %1$s_amount_paise_positive check (amount_paise > 0)', t);
+    end loop;
+end $$;
+
+alter table expenses enable trigger expenses_summary_update;
+alter table expenses enable trigger expenses_score_anomaly;
+alter table expenses enable trigger expenses_stats_update;
+alter table income enable trigger income_summary_update;
+
+-- 2. Indexes from migrations/006 and 007 move to the new column
+drop index if exists expenses_user_amount_idx;
+drop index if exists expenses_user_date_idx;
+drop index if exists income_user_date_idx;
+create index expenses_user_amount_idx on expenses (user_email, amount_paise);
+create index expenses_user_date_idx   on expenses (user_email, date) include (category, amount_paise);
+create index income_user_date_idx     on income   (user_email, date) include (amount_paise);
+
+alter table expenses drop column if exists amount;
+alter table income drop column if exists amount;
+
+-- 3. monthly_summaries (migrations/001) in paise; category_totals values are paise too
+alter table monthly_summaries
+    drop column if exists total,
+    drop column if exists min_amount,
+    drop column if exists max_amount,
+    add column if not exists total_paise bigint not null default 0,
+    add column if not exists min_paise   bigint,
+    add column if not exists max_paise   bigint;
+
+create or replace function refresh_monthly_summary(p_user text, p_kind text, p_month text)
+returns void language plpgsql as $$
+declare
+    v_start date := (p_month || '-01')::date;
+    v_end   date := ((p_month || '-01')::date + interval '1 month')::date;
+begin
+    delete from monthly_summaries
+     where user_email = p_user and kind = p_kind and month = p_month;
+
+    if p_kind = 'expense' then
+        insert into monthly_summaries (user_email, kind, month, total_paise, txn_count, min_paise, max_paise, category_totals)
+        select p_user, 'expense', p_month, sum(cat_total), sum(cat_count), min(cat_min), max(cat_max),
+               jsonb_object_agg(category, cat_total)
+          from (select category, sum(amount_paise) as cat_total, count(*) as cat_count,
+                       min(amount_paise) as cat_min, max(amount_paise) as cat_max
+                  from expenses
+                 where user_email = p_user and date >= v_start and date < v_end
+                 group by category) c
+        having count(*) > 0;
+    else
+        insert into monthly_summaries (user_email, kind, month, total_paise, txn_count, min_paise, max_paise)
+        select p_user, 'income', p_month, sum(amount_paise), count(*), min(amount_paise), max(amount_paise)
+          from income
+         where user_email = p_user and date >= v_start and date < v_end
+        having count(*) > 0;
+    end if;
+end $$;
+
+create or replace function merge_category_totals(a jsonb, b jsonb)
+returns jsonb language sql immutable as $$
+    select coalesce(jsonb_object_agg(key, total), '{}'::jsonb)
+      from (select key, sum(value::bigint) as total
+              from (select * from jsonb_each_text(a) union all select * from jsonb_each_text(b)) kv
+             group by key) merged
+$$;
+
+create or replace function monthly_summaries_after_insert()
+returns trigger language plpgsql as $$
+begin
+    if tg_table_name = 'expenses' then
+        insert into monthly_summaries as s (user_email, kind, month, total_paise, txn_count, min_paise, max_paise, category_totals)
+        select user_email, 'expense', month, sum(cat_total), sum(cat_count), min(cat_min), max(cat_max),
+               jsonb_object_agg(category, cat_total)
+          from (select user_email, left(date::text, 7) as month, category,
+                       sum(amount_paise) as cat_total, count(*) as cat_count,
+                       min(amount_paise) as cat_min, max(amount_paise) as cat_max
+                  from new_rows
+                 group by 1, 2, 3) g
+         group by user_email, month
+        on conflict (user_email, kind, month) do update set
+            total_paise     = s.total_paise + excluded.total_paise,
+            txn_count       = s.txn_count + excluded.txn_count,
+            min_paise       = least(s.min_paise, excluded.min_paise),
+            max_paise       = greatest(s.max_paise, excluded.max_paise),
+            category_totals = merge_category_totals(s.category_totals, excluded.category_totals),
+            updated_at      = now();
+    else
+        insert into monthly_summaries as s (user_email, kind, month, total_paise, txn_count, min_paise, max_paise)
+        select user_email, 'income', left(date::text, 7), sum(amount_paise), count(*), min(amount_paise), max(amount_paise)
+          from new_rows
+         group by 1, 3
+        on conflict (user_email, kind, month) do update set
+            total_paise = s.total_paise + excluded.total_paise,
+            txn_count   = s.txn_count + excluded.txn_count,
+            min_paise   = least(s.min_paise, excluded.min_paise),
+            max_paise   = greatest(s.max_paise, excluded.max_paise),
+            updated_at  = now();
+    end if;
+    return null;
+end $$;
+
+create or replace function rebuild_monthly_summaries(p_user text default null)
+returns integer language plpgsql as $$
+declare
+    v_rows integer;
+begin
+    delete from monthly_summaries where p_user is null or user_email = p_user;
+
+    insert into monthly_summaries (user_email, kind, month, total_paise, txn_count, min_paise, max_paise, category_totals)
+    select user_email, 'expense', month, sum(cat_total), sum(cat_count), min(cat_min), max(cat_max),
+           jsonb_object_agg(category, cat_total)
+      from (select user_email, left(date::text, 7) as month, category,
+                   sum(amount_paise) as cat_total, count(*) as cat_count,
+                   min(amount_paise) as cat_min, max(amount_paise) as cat_max
+              from expenses
+             where p_user is null or user_email = p_user
+             group by 1, 2, 3) g
+     group by user_email, month;
+
+    insert into monthly_summaries (user_email, kind, month, total_paise, txn_count, min_paise, max_paise)
+    select user_email, 'income', left(date::text, 7), sum(amount_paise), count(*), min(amount_paise), max(amount_paise)
+      from income
+     where p_user is null or user_email = p_user
+     group by 1, 3;
+
+    select count(*) into v_rows from monthly_summaries where p_user is null or user_email = p_user;
+    return v_rows;
+end $$;
+
+select rebuild_monthly_summaries();
+
+-- 4. Anomaly scoring and category_stats (migrations/005) on paise. z-scores
+--    don't depend on the unit, so existing flags stay valid.
+create or replace function score_expense_anomaly()
+returns trigger language plpgsql as $$
+declare
+    s category_stats%rowtype;
+    v_z double precision;
+begin
+    if tg_op = 'UPDATE' and new.amount_paise = old.amount_paise and new.category = old.category
+       and new.user_email = old.user_email then
+        new.anomaly_z := old.anomaly_z;
+        new.anomaly_severity := old.anomaly_severity;
+        return new;
+    end if;
+
+    new.anomaly_z := null;
+    new.anomaly_severity := null;
+    select * into s from category_stats where user_email = new.user_email and category = new.category;
+    if found and s.n >= 5 and s.m2 > 0 then
+        v_z := (new.amount_paise - s.mean) / sqrt(s.m2 / (s.n - 1));
+        new.anomaly_z := v_z;
+        new.anomaly_severity := case when abs(v_z) > 3 then 'high' when abs(v_z) > 2 then 'medium' end;
+    end if;
+    return new;
+end $$;
+
+create or replace function category_stats_after_write()
+returns trigger language plpgsql as $$
+declare
+    r record;
+begin
+    if tg_op = 'INSERT' then
+        for r in select user_email, category, count(*) as n, avg(amount_paise::double precision) as mean,
+                        var_pop(amount_paise::double precision) * count(*) as m2
+                   from new_rows group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2);
+        end loop;
+    elsif tg_op = 'DELETE' then
+        for r in select user_email, category, count(*) as n, avg(amount_paise::double precision) as mean,
+                        var_pop(amount_paise::double precision) * count(*) as m2
+                   from old_rows group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2, -1);
+        end loop;
+    else
+        for r in select o.user_email, o.category, count(*) as n, avg(o.amount_paise::double precision) as mean,
+                        var_pop(o.amount_paise::double precision) * count(*) as m2
+                   from old_rows o join new_rows n on n.id = o.id
+                  where (n.amount_paise, n.category, n.user_email) is distinct from (o.amount_paise, o.category, o.user_email)
+                  group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2, -1);
+        end loop;
+        for r in select n.user_email, n.category, count(*) as n, avg(n.amount_paise::double precision) as mean,
+                        var_pop(n.amount_paise::double precision) * count(*) as m2
+                   from new_rows n join old_rows o on o.id = n.id
+                  where (n.amount_paise, n.category, n.user_email) is distinct from (o.amount_paise, o.category, o.user_email)
+                  group by 1, 2 loop
+            perform merge_category_stats(r.user_email, r.category, r.n, r.mean, r.m2);
+        end loop;
+    end if;
+    return null;
+end $$;
+
+create or replace function rebuild_category_stats(p_user text default null)
+returns integer language plpgsql as $$
+declare
+    v_rows integer;
+begin
+    delete from category_stats where p_user is null or user_email = p_user;
+
+    insert into category_stats (user_email, category, n, mean, m2)
+    select user_email, category, count(*), avg(amount_paise::double precision),
+           var_pop(amount_paise::double precision) * count(*)
+      from expenses
+     where p_user is null or user_email = p_user
+     group by 1, 2;
+
+    select count(*) into v_rows from category_stats where p_user is null or user_email = p_user;
+    return v_rows;
+end $$;
+
+select rebuild_category_stats();
@@ -0,0 +1,99 @@
+-- Per-user, per-day expense totals for the Smart Analytics calendar heatmap.
+--
+-- Same idea as monthly_summaries (migrations/001), one level down: statement-
+-- level triggers keep daily_summaries in step with every write to expenses,
+-- in the same transaction. Totals and counts are plain sums, so inserts add,
+-- deletes subtract and updates do both; no day is ever recomputed from rows.
+-- A year of history is at most 366 rows however many expenses it holds.
+--
+-- Repair drift with:  select rebuild_daily_summaries();          -- everyone
+--                     select rebuild_daily_summaries('a@b.com'); -- one user
+
+create table if not exists daily_summaries (
+    user_email  text        not null,
+    day         date        not null,
+    total_paise bigint      not null default 0,
+    txn_count   integer     not null default 0,
+    updated_at  timestamptz not null default now(),
+    primary key (user_email, day)
+);
+
+-- Add per-day deltas (user_email, day, total_paise, txn_count) to daily_summaries
+create or replace function merge_daily_summaries(p_deltas jsonb)
+returns void language sql as $$
+    insert into daily_summaries as s (user_email, day, total_paise, txn_count)
+    select user_email, day, total_paise, txn_count
+      from jsonb_to_recordset(p_deltas) as d(user_email text, day date, total_paise bigint, txn_count integer)
+    on conflict (user_email, day) do update set
+        total_paise = s.total_paise + excluded.total_paise,
+        txn_count   = s.txn_count + excluded.txn_count,
+        updated_at  = now()
+$$;
+
+-- Transition tables only exist for the trigger's own event, so each branch
+-- reads just the one(s) it has. Rows without a date aren't on the calendar.
+create or replace function daily_summaries_after_write()
+returns trigger language plpgsql as $$
+declare
+    v_deltas jsonb;
+begin
+    if tg_op = 'INSERT' then
+        select jsonb_agg(d) into v_deltas
+          from (select user_email, date as day, sum(amount_paise) as total_paise, count(*) as txn_count
+                  from new_rows where date is not null group by 1, 2) d;
+    elsif tg_op = 'DELETE' then
+        select jsonb_agg(d) into v_deltas
+          from (select user_email, date as day, -sum(amount_paise) as total_paise, -count(*) as txn_count
+                  from old_rows where date is not null group by 1, 2) d;
+    else
+        select jsonb_agg(d) into v_deltas
+          from (select user_email, day, sum(paise) as total_paise, sum(n) as txn_count
+                  from (select user_email, date as day, amount_paise as paise, 1 as n from new_rows
+                        union all
+                        select user_email, date, -amount_paise, -1 from old_rows) c
+                 where day is not null
+                 group by 1, 2
+                having sum(paise) <> 0 or sum(n) <> 0) d;
+    end if;
+    if v_deltas is null then
+        return null;
+    end if;
+
+    perform merge_daily_summaries(v_deltas);
+    delete from daily_summaries s
+     using jsonb_to_recordset(v_deltas) as d(user_email text, day date)
+     where s.user_email = d.user_email and s.day = d.day and s.txn_count <= 0;
+    return null;
+end $$;
+
+drop trigger if exists expenses_daily_insert on expenses;
+drop trigger if exists expenses_daily_delete on expenses;
+drop trigger if exists expenses_daily_update on expenses;
+create trigger expenses_daily_insert after insert on expenses
+    referencing new table as new_rows
+    for each statement execute function daily_summaries_after_write();
+create trigger expenses_daily_delete after delete on expenses
+    referencing old table as old_rows
+    for each statement execute function daily_summaries_after_write();
+create trigger expenses_daily_update after update on expenses
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function daily_summaries_after_write();
+
+create or replace function rebuild_daily_summaries(p_user text default null)
+returns integer language plpgsql as $$
+declare
+    v_rows integer;
+begin
+    delete from daily_summaries where p_user is null or user_email = p_user;
+
+    insert into daily_summaries (user_email, day, total_paise, txn_count)
+    select user_email, date, sum(amount_paise), count(*)
+      from expenses
+     where (p_user is null or user_email = p_user) and date is not null
+     group by 1, 2;
+
+    select count(*) into v_rows from daily_summaries where p_user is null or user_email = p_user;
+    return v_rows;
+end $$;
+
+select rebuild_daily_summaries();
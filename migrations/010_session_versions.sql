@@ -0,0 +1,14 @@
+-- Revocable session tokens.
+--
+-- Session tokens (auth.py) carry the user's session_version when they were
+-- issued and are only accepted while it still matches. Logging out and
+-- changing the password bump it, which revokes every token issued before.
+
+alter table auth_users add column if not exists session_version integer not null default 0;
+
+create or replace function bump_session_version(p_email text)
+returns integer language sql as $$
+    update auth_users set session_version = session_version + 1
+     where email = p_email
+    returning session_version
+$$;
@@ -0,0 +1,37 @@
+-- Tombstones for rows deleted from expenses and income.
+--
+-- Replicas (localstore.py) pull changes since their server_updated_at
+-- watermark, but a deleted row leaves nothing behind to pull. Every delete
+-- now leaves a row here, stamped by the same server clock, so a replica reads
+-- the deletes since its watermark instead of listing a user's every row_id.
+
+create table if not exists deleted_rows (
+    table_name text        not null,
+    row_id     uuid        not null,
+    user_email text        not null,
+    deleted_at timestamptz not null default now(),
+    primary key (table_name, row_id)
+);
+
+create index if not exists deleted_rows_user_deleted_idx on deleted_rows (user_email, table_name, deleted_at);
+
+create or replace function record_deleted_rows()
+returns trigger language plpgsql as $$
+begin
+    insert into deleted_rows as d (table_name, row_id, user_email)
+    select tg_table_name, row_id, user_email from old_rows
+    on conflict (table_name, row_id) do update set deleted_at = now(), user_email = excluded.user_email;
+    return null;
+end $$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['expenses', 'income'] loop
+        execute format('drop trigger if exists %1$s_record_deleted on %1$s', t);
+        execute format('create trigger %1$s_record_deleted after delete on %1$s
+                        referencing old table as old_rows
+                        for each statement execute function record_deleted_rows()', t);
+    end loop;
+end $$;
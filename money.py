@@ -0,0 +1,42 @@
+"""
+Money as whole paise (₹1 = 100 paise) in int64.
+
+Amounts are stored (amount_paise bigint, migrations/008), held in memory
+(int64 columns) and summed as integers, so totals are exact however many rows
+go into them. Rupees only exist at the edges: to_paise()/to_paise_series()
+when an amount is typed or imported, rupees()/format_inr() when one is shown
+or exported. Values named *_paise are paise; so are the totals in summary and
+analytics dicts.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+PAISE_PER_RUPEE = 100
+
+def to_paise(amount):
+    """Rupees (float, int, str or Decimal) -> int paise, rounded half up"""
+    return int((Decimal(str(amount)) * PAISE_PER_RUPEE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def to_paise_series(amounts):
+    """Vectorized to_paise for a numeric pandas Series of rupees; missing values stay missing"""
+    import numpy as np  # Deferred: the login screen imports this module too
+    # Rounding to 6 places first absorbs float noise (1.005 * 100 = 100.49999...)
+    # so halves round up like to_paise does
+    paise = np.floor(np.round(amounts.astype(float) * PAISE_PER_RUPEE, 6) + 0.5)
+    return paise.astype("Int64")
+
+def rupees(paise):
+    """Paise (scalar, array or Series) -> rupees as float, for display"""
+    return paise / PAISE_PER_RUPEE
+
+def format_inr(paise, decimals=2):
+    """'₹1,234.56' from paise"""
+    return f"₹{paise / PAISE_PER_RUPEE:,.{decimals}f}"
+
+def rupee_text(paise):
+    """Exact '1234.56' for exports, with no float rounding on the way"""
+    whole, frac = divmod(abs(int(paise)), PAISE_PER_RUPEE)
+    return f"{'-' if paise < 0 else ''}{whole}.{frac:02d}"
+
+def display_frame(df, column="Paise"):
+    """Copy of df for export with the paise column replaced by exact rupee text under 'Amount'"""
+    return df.assign(**{column: df[column].map(rupee_text)}).rename(columns={column: "Amount"})
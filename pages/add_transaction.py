@@ -1,14 +1,19 @@
+import re
 import streamlit as st
 import pandas as pd
 from datetime import date, datetime
 from io import StringIO
+from utils import import_transactions_csv
+from categorizer import CategoryRuleManager
+from category_model import get_predictor
+from writequeue import get_write_queue
+from money import format_inr, rupees, to_paise
 
 def add_transaction_page(exp_mgr, inc_mgr):
     st.header(" Add Transaction")
 
     # Month Selector
-    all_expenses = exp_mgr.get_expenses(st.session_state.user_email)
-    months = sorted({e[3][:7] for e in all_expenses if e[3]}, reverse=True)
+    months = list(exp_mgr.get_month_index(st.session_state.user_email))
     if not months:
         months = [datetime.now().strftime("%Y-%m")]
 
@@ -28,76 +33,142 @@ def add_transaction_page(exp_mgr, inc_mgr):
     # --- Import CSV Section ---
     st.subheader("📥 Import from CSV")
 
-    uploaded_file = st.file_uploader("Upload CSV file for Import", type=["csv"], help="CSV for expenses should have columns: Category, Amount, Date. For income: Amount, Date")
+    rule_mgr = CategoryRuleManager(exp_mgr.supabase)
+    uploaded_file = st.file_uploader("Upload CSV file for Import", type=["csv"], help="CSV for expenses should have columns: Category, Amount, Date. Bank exports with Description, Amount, Date are auto-categorized. For income: Amount, Date")
 
     if uploaded_file:
         try:
             file_content = StringIO(uploaded_file.getvalue().decode("utf-8"))
-            df_import = pd.read_csv(file_content)
-            
-            # Determine if import is expense or income by presence of 'Category' column
-            if "Category" in df_import.columns:
-                # Treat as Expenses
-                required_cols = {"Category", "Amount", "Date"}
-                if not required_cols.issubset(set(df_import.columns)):
-                    st.error("Expense import must have columns: Category, Amount, Date")
-                else:
-                    count_added = 0
-                    for _, row in df_import.iterrows():
-                        try:
-                            category = str(row['Category'])
-                            amount = float(row['Amount'])
-                            date_str = str(row['Date'])
-                            exp_mgr.add_expense(st.session_state.user_email, category, amount, date_str)
-                            count_added += 1
-                        except Exception as e:
-                            continue
-                    st.success(f"Imported {count_added} expense records successfully.")
-            elif {"Amount", "Date"}.issubset(set(df_import.columns)):
-                # Treat as Income
-                count_added = 0
-                for _, row in df_import.iterrows():
-                    try:
-                        amount = float(row['Amount'])
-                        date_str = str(row['Date'])
-                        inc_mgr.add_income(st.session_state.user_email, amount, date_str)
-                        count_added += 1
-                    except:
-                        continue
-                st.success(f"Imported {count_added} income records successfully.")
-            else:
-                st.error("CSV format not recognized for import.")
+            categorizer = rule_mgr.get_categorizer(st.session_state.user_email)
+            predictor = lambda descriptions, amounts, dates: get_predictor().predict(
+                exp_mgr.supabase, st.session_state.user_email, descriptions, amounts, dates)
+            kind, count_added, count_skipped = import_transactions_csv(file_content, st.session_state.user_email,
+                                                                       exp_mgr, inc_mgr, categorizer, predictor)
+            st.success(f"Imported {count_added} {kind} records successfully.")
+            if count_skipped:
+                st.warning(f"Skipped {count_skipped} row{'s' if count_skipped != 1 else ''} with a missing or invalid amount, date or category.")
+        except ValueError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"Error processing file: {e}")
 
+    render_category_rules(rule_mgr, st.session_state.user_email)
+
     # --- Add Transaction Form ---
     st.subheader(" Manual Entry")
+    queue = get_write_queue(exp_mgr.supabase)
+    # The local replica saves instantly and syncs in the background itself; the queue is for direct Supabase
+    direct = hasattr(exp_mgr.supabase, "pending_count")
     option = st.radio("Type", ["Expense", "Income"], horizontal=True)
 
-    with st.form("tx_form"):
+    # Not an st.form: the category suggestion has to follow the description/amount/date as they're entered
+    if option == "Expense":
+        description = st.text_input("Description (optional)")
+        amount = st.number_input("Amount", min_value=0.01, step=0.01, format="%.2f")
+    else:
+        description = None
+        amount = st.number_input("Income Amount", min_value=0.01, step=0.01, format="%.2f")
+    tx_date = st.date_input("Date", value=date.today())
+
+    category = suggested = None
+    if option == "Expense":
+        suggested = get_predictor().suggest(exp_mgr.supabase, st.session_state.user_email,
+                                            description, to_paise(amount), tx_date)
+        # Prefill with the suggestion, unless the user has typed a category of their own
+        if st.session_state.get("tx_category", "") in ("", st.session_state.get("tx_suggested") or ""):
+            st.session_state.tx_category = suggested or ""
+        st.session_state.tx_suggested = suggested
+        category = st.text_input("Category", key="tx_category",
+                                 help="Suggested from your history; change it if it's wrong").strip()
+
+    if st.button("Save", key="tx_save"):
         if option == "Expense":
-            category = st.text_input("Category")
-            amount = st.number_input("Amount", min_value=0.01, step=0.01, format="%.2f")
-        else:
-            category = None
-            amount = st.number_input("Income Amount", min_value=0.01, step=0.01, format="%.2f")
-
-        tx_date = st.date_input("Date", value=date.today())
-        submitted = st.form_submit_button("Save")
-
-        if submitted:
-            if option == "Expense":
-                if not category:
-                    st.error("Please enter a category.")
-                elif amount <= 0:
-                    st.error("Amount must be greater than zero.")
+            if not category:
+                st.error("Please enter a category.")
+            elif amount <= 0:
+                st.error("Amount must be greater than zero.")
+            else:
+                payload = {"category": category, "amount_paise": to_paise(amount), "date": str(tx_date)}
+                if description:
+                    payload["description"] = description
+                if direct:
+                    saved = exp_mgr.add_expense(st.session_state.user_email, payload["category"], payload["amount_paise"],
+                                                payload["date"], description)
                 else:
-                    exp_mgr.add_expense(st.session_state.user_email, category, amount, str(tx_date))
-                    st.success("Expense saved!")
+                    saved = queue.enqueue(st.session_state.user_email, "expense", payload)
+                if saved:
+                    st.success(f"Expense saved under **{category}**!")
+        else:
+            if amount <= 0:
+                st.error("Income amount must be greater than zero.")
             else:
-                if amount <= 0:
-                    st.error("Income amount must be greater than zero.")
+                if direct:
+                    saved = inc_mgr.add_income(st.session_state.user_email, to_paise(amount), str(tx_date))
                 else:
-                    inc_mgr.add_income(st.session_state.user_email, amount, str(tx_date))
+                    saved = queue.enqueue(st.session_state.user_email, "income", {"amount_paise": to_paise(amount), "date": str(tx_date)})
+                if saved:
                     st.success("Income saved!")
 
+    render_sync_status(queue, st.session_state.user_email)
+
+def render_category_rules(rule_mgr, user):
+    """Keyword -> category rules tried before the built-in ones when importing bank descriptions"""
+    with st.expander("🏷️ Auto-categorization rules"):
+        st.caption("Descriptions containing a keyword get its category. Your rules are tried first, then the built-in ones.")
+        for rule in rule_mgr.get_rules(user):
+            col1, col2 = st.columns([5, 1])
+            col1.write(f"`{rule['pattern']}` → **{rule['category']}**{' (regex)' if rule['is_regex'] else ''}")
+            if col2.button("🗑️", key=f"delete_rule_{rule['id']}"):
+                rule_mgr.delete_rule(user, rule['id'])
+                st.rerun()
+        with st.form("rule_form", clear_on_submit=True):
+            col1, col2, col3 = st.columns([3, 2, 1])
+            pattern = col1.text_input("Keyword")
+            category = col2.text_input("Category")
+            is_regex = col3.checkbox("Regex")
+            if st.form_submit_button("Add rule"):
+                if not pattern or not category:
+                    st.error("Enter both a keyword and a category.")
+                else:
+                    try:
+                        rule_mgr.add_rule(user, pattern, category, is_regex)
+                        st.rerun()
+                    except re.error as e:
+                        st.error(f"Invalid regex: {e}")
+                    except Exception as e:
+                        st.error(f"Error saving rule: {e}")
+
+def render_sync_status(queue, user):
+    """Entries still waiting to reach the database, plus any that failed to"""
+    pending = queue.pending(user)
+    failed = queue.failures(user)
+    last = queue.last_flush
+
+    if pending:
+        st.subheader("⏳ Syncing")
+        st.dataframe(pd.DataFrame([
+            {"Type": row['kind'].title(), "Category": row['payload'].get('category', ''),
+             "Amount": rupees(row['payload']['amount_paise']), "Date": row['payload']['date']}
+            for row in pending
+        ]), hide_index=True)
+        if last and 'error' in last:
+            st.caption(f"Last sync attempt failed at {last['at']:%H:%M:%S}: {last['error']} — retrying automatically")
+        else:
+            st.caption(f"{len(pending)} entr{'y' if len(pending) == 1 else 'ies'} waiting to sync")
+    elif last and 'sent' in last:
+        st.caption(f"✅ All entries synced (last sync {last['at']:%H:%M:%S})")
+
+    if failed:
+        st.subheader("⚠️ Failed to sync")
+        for row in failed:
+            payload = row['payload']
+            col1, col2, col3 = st.columns([4, 1, 1])
+            col1.error(f"{row['kind'].title()} {format_inr(payload['amount_paise'])} on {payload['date']}"
+                       f"{' (' + payload['category'] + ')' if payload.get('category') else ''}: {row['last_error']}")
+            if col2.button("Retry", key=f"retry_write_{row['seq']}"):
+                queue.retry(row['seq'])
+                st.rerun()
+            if col3.button("Discard", key=f"discard_write_{row['seq']}"):
+                queue.discard(row['seq'])
+                st.rerun()
+
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from database import SpendingAnalyzer
+from database import SpendingAnalyzer, MonthlySummaryManager
+from money import format_inr
 
 def ai_coach_page(exp_mgr, inc_mgr, synbot):
     st.header(" NeuroBot ")
@@ -10,40 +11,42 @@ def ai_coach_page(exp_mgr, inc_mgr, synbot):
     exp_data = exp_mgr.get_expenses(st.session_state.user_email)
     inc_data = inc_mgr.get_income(st.session_state.user_email)
 
-    df_exp = pd.DataFrame(exp_data, columns=["User", "Category", "Amount", "Date"])
-    df_inc = pd.DataFrame(inc_data, columns=["User", "Amount", "Date"])
+    df_exp = pd.DataFrame(exp_data, columns=["User", "Category", "Paise", "Date"])
+    df_inc = pd.DataFrame(inc_data, columns=["User", "Paise", "Date"])
 
     if df_exp.empty:
-        df_exp = pd.DataFrame(columns=["User", "Category", "Amount", "Date"])
+        df_exp = pd.DataFrame(columns=["User", "Category", "Paise", "Date"])
     if df_inc.empty:
-        df_inc = pd.DataFrame(columns=["User", "Amount", "Date"])
+        df_inc = pd.DataFrame(columns=["User", "Paise", "Date"])
 
     # Get analytics data for enhanced context
     analytics_data = None
     if not df_exp.empty:
         try:
-            analyzer = SpendingAnalyzer(exp_mgr.conn)
+            analyzer = SpendingAnalyzer(exp_mgr.supabase)
             patterns = analyzer.detect_spending_patterns(st.session_state.user_email)
             analytics_data = {
-                'peak_day': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'][patterns.get('peak_spending_day', 0)],
+                'peak_day': patterns.get('peak_spending_day', 'N/A'),
                 'trend': patterns.get('spending_trend', 1),
                 'top_category': patterns.get('top_category', 'miscellaneous')
             }
         except Exception:
             analytics_data = None
 
+    summary = MonthlySummaryManager(exp_mgr.supabase).get_all_time_summary(st.session_state.user_email)
+
     # Financial summary display
     if not df_exp.empty or not df_inc.empty:
         st.subheader("📊 Your Financial Summary")
         col1, col2, col3 = st.columns(3)
         
-        total_spent = df_exp["Amount"].sum() if not df_exp.empty else 0
-        total_income = df_inc["Amount"].sum() if not df_inc.empty else 0
+        total_spent = summary['expense']['total']
+        total_income = summary['income']['total']
         net_balance = total_income - total_spent
         
-        col1.metric("💸 Total Expenses", f"₹{total_spent:,.2f}")
-        col2.metric("💰 Total Income", f"₹{total_income:,.2f}")
-        col3.metric("📈 Net Balance", f"₹{net_balance:,.2f}", 
+        col1.metric("💸 Total Expenses", format_inr(total_spent))
+        col2.metric("💰 Total Income", format_inr(total_income))
+        col3.metric("📈 Net Balance", format_inr(net_balance), 
                    delta=f"{'Surplus' if net_balance >= 0 else 'Deficit'}")
         
         st.markdown("---")
@@ -112,7 +115,7 @@ What would you like to know about your finances today?"""
         # Generate AI response with enhanced context
         with st.chat_message("assistant"):
             with st.spinner("NeuroBot is analyzing your financial data..."):
-                answer = synbot.answer(prompt, df_exp, df_inc, analytics_data)
+                answer = synbot.answer(prompt, df_exp, df_inc, analytics_data, summary)
                 st.markdown(answer)
                 
         # Add assistant response to chat history
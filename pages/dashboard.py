@@ -3,12 +3,14 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime
 from utils import export_df_to_csv, export_df_to_pdf
+from charts import GRANULARITIES, cached_figure, rollup
+from database import MonthlySummaryManager
+from money import display_frame, format_inr, rupees
 
 def dashboard_page(exp_mgr, inc_mgr):
     st.header("Dashboard")
 
-    all_expenses = exp_mgr.get_expenses(st.session_state.user_email)
-    months = sorted({e[3][:7] for e in all_expenses if e[3]}, reverse=True)
+    months = list(exp_mgr.get_month_index(st.session_state.user_email))
     if not months:
         months = [datetime.now().strftime("%Y-%m")]
 
@@ -26,38 +28,51 @@ def dashboard_page(exp_mgr, inc_mgr):
     exp_data = exp_mgr.get_expenses(st.session_state.user_email, year_month=selected_month)
     inc_data = inc_mgr.get_income(st.session_state.user_email, year_month=selected_month)
 
-    df_exp = pd.DataFrame(exp_data, columns=["User", "Category", "Amount", "Date"])
-    df_inc = pd.DataFrame(inc_data, columns=["User", "Amount", "Date"])
+    # Paise stay int64 through the rollups; rupees only for axes, metrics and exports
+    df_exp = pd.DataFrame(exp_data, columns=["User", "Category", "Paise", "Date"])
+    df_inc = pd.DataFrame(inc_data, columns=["User", "Paise", "Date"])
 
     if df_exp.empty:
-        df_exp = pd.DataFrame(columns=["User", "Category", "Amount", "Date"])
+        df_exp = pd.DataFrame(columns=["User", "Category", "Paise", "Date"])
     if df_inc.empty:
-        df_inc = pd.DataFrame(columns=["User", "Amount", "Date"])
+        df_inc = pd.DataFrame(columns=["User", "Paise", "Date"])
 
-    total_spent = df_exp["Amount"].sum()
-    total_income = df_inc["Amount"].sum()
+    summary = MonthlySummaryManager(exp_mgr.supabase).get_month_summary(st.session_state.user_email, selected_month)
+    total_spent = summary['expense']['total']
+    total_income = summary['income']['total']
     net = total_income - total_spent
 
     col1, col2, col3 = st.columns(3)
-    col1.metric("💸 Total Spent", f"₹{total_spent:,.2f}")
-    col2.metric("💵 Total Income", f"₹{total_income:,.2f}")
-    col3.metric("💰 Net", f"₹{net:,.2f}")
+    col1.metric("💸 Total Spent", format_inr(total_spent))
+    col2.metric("💵 Total Income", format_inr(total_income))
+    col3.metric("💰 Net", format_inr(net))
+
+    user = st.session_state.user_email
+
+    if not df_exp.empty or not df_inc.empty:
+        granularity = st.radio("Chart granularity", list(GRANULARITIES), horizontal=True, key="dashboard_granularity")
 
     if not df_exp.empty:
         df_exp["Date"] = pd.to_datetime(df_exp["Date"], errors='coerce')
-        fig = px.bar(df_exp, x="Date", y="Amount", color="Category", template="plotly_dark")
+        fig = cached_figure(user, f"dashboard_expenses_by_category:{granularity}", selected_month, lambda: px.bar(
+            rollup(df_exp, "Category", granularity).assign(Amount=lambda d: rupees(d["Paise"])),
+            x="Date", y="Amount", color="Category", template="plotly_dark"
+        ))
         st.plotly_chart(fig, use_container_width=True)
 
     if not df_exp.empty or not df_inc.empty:
-        df_exp_plot = df_exp[["Date", "Amount"]].copy()
-        df_exp_plot["Type"] = "Expense"
-        df_inc_plot = df_inc[["Date", "Amount"]].copy()
-        df_inc_plot["Type"] = "Income"
-        df_combined = pd.concat([df_exp_plot, df_inc_plot], ignore_index=True)
-        if not df_combined.empty:
-            df_combined["Date"] = pd.to_datetime(df_combined["Date"], errors='coerce')
-            fig2 = px.bar(df_combined, x="Date", y="Amount", color="Type", template="plotly_dark")
-            st.plotly_chart(fig2, use_container_width=True)
+        def build_income_vs_expense():
+            # Roll each side up first so only the small per-period frames get concatenated
+            df_exp_plot = df_exp[["Date", "Paise"]].assign(Type="Expense")
+            df_inc_plot = df_inc[["Date", "Paise"]].assign(Type="Income")
+            df_combined = pd.concat(
+                [rollup(d, "Type", granularity) for d in (df_exp_plot, df_inc_plot) if not d.empty],
+                ignore_index=True
+            ).assign(Amount=lambda d: rupees(d["Paise"]))
+            return px.bar(df_combined, x="Date", y="Amount", color="Type", template="plotly_dark")
+
+        fig2 = cached_figure(user, f"dashboard_income_vs_expense:{granularity}", selected_month, build_income_vs_expense)
+        st.plotly_chart(fig2, use_container_width=True)
 
     # --- EXPORT Buttons ---
     st.markdown("---")
@@ -69,7 +84,7 @@ def dashboard_page(exp_mgr, inc_mgr):
         if not df_exp.empty and len(df_exp) > 0:
             try:
                 # Remove User column if it exists and ensure data is clean
-                export_df_exp = df_exp.drop(columns=["User"], errors='ignore')
+                export_df_exp = display_frame(df_exp.drop(columns=["User"], errors='ignore'))
                 
                 csv_bytes_exp = export_df_to_csv(export_df_exp)
                 pdf_bytes_exp = export_df_to_pdf(export_df_exp, title=f"Expenses for {selected_month}")
@@ -96,7 +111,7 @@ def dashboard_page(exp_mgr, inc_mgr):
         if not df_inc.empty and len(df_inc) > 0:
             try:
                 # Remove User column if it exists and ensure data is clean
-                export_df_inc = df_inc.drop(columns=["User"], errors='ignore')
+                export_df_inc = display_frame(df_inc.drop(columns=["User"], errors='ignore'))
                 
                 csv_bytes_inc = export_df_to_csv(export_df_inc)
                 pdf_bytes_inc = export_df_to_pdf(export_df_inc, title=f"Incomes for {selected_month}")
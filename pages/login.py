@@ -41,6 +41,9 @@ def login_page(auth):
                         st.session_state.logged_in = True
                         st.session_state.user_email = email.lower().strip()
                         st.session_state.page = "Dashboard"
+                        token = auth.create_session_token(email)
+                        if token:
+                            st.session_state.session_token = token
                         st.balloons()
                         
                         # Add welcome message
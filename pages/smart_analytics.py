@@ -1,333 +1,473 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from database import SpendingAnalyzer
-from synbot import SmartBudgetAdvisor
-
-def smart_analytics_page(exp_mgr, inc_mgr):
-    st.header("Smart Budget Analytics")
-    
-    # Initialize analyzer with Supabase client (updated from SQLite conn)
-    analyzer = SpendingAnalyzer(exp_mgr.supabase)  # ✅ Changed from exp_mgr.conn
-    advisor = SmartBudgetAdvisor(analyzer)
-    
-    # Get user data
-    user = st.session_state.user_email
-    patterns = analyzer.detect_spending_patterns(user)
-    insights = advisor.generate_budget_insights(None, patterns)
-    
-    # Connection status check
-    if not exp_mgr.supabase:
-        st.error("❌ Database connection unavailable. Please check your Supabase configuration.")
-        return
-    
-    # Display insights cards
-    st.subheader("💡 Personalized Insights")
-    
-    if insights:
-        for insight in insights:
-            if insight['type'] == 'warning':
-                st.warning(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
-            elif insight['type'] == 'alert':
-                st.error(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
-            elif insight['type'] == 'positive':
-                st.success(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
-            else:
-                st.info(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
-    else:
-        st.info("🔍 Add more expenses to generate personalized insights!")
-    
-    # Spending Pattern Visualization
-    st.subheader("📊 Spending Pattern Analysis")
-    
-    # Get expense data directly from Supabase
-    try:
-        expense_result = exp_mgr.supabase.table("expenses").select("*").eq("user_email", user).execute()
-        exp_data = expense_result.data
-        
-        if exp_data:
-            df = pd.DataFrame(exp_data)
-            df['date'] = pd.to_datetime(df['date'])
-            df['amount'] = df['amount'].astype(float)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Peak spending day chart
-                days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                df['day_name'] = df['date'].dt.day_name()
-                
-                daily_spending = df.groupby('day_name')['amount'].sum().reindex(days, fill_value=0)
-                
-                fig = px.bar(
-                    x=daily_spending.index, 
-                    y=daily_spending.values,
-                    title="💳 Spending by Day of Week",
-                    color=daily_spending.values,
-                    color_continuous_scale="viridis",
-                    labels={'x': 'Day', 'y': 'Amount (₹)'}
-                )
-                fig.update_layout(
-                    template="plotly_dark",
-                    height=400,
-                    showlegend=False
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                # Category spending pie chart
-                category_spending = df.groupby('category')['amount'].sum().sort_values(ascending=False)
-                
-                fig = px.pie(
-                    values=category_spending.values,
-                    names=category_spending.index,
-                    title="🏷️ Spending Distribution by Category"
-                )
-                fig.update_layout(
-                    template="plotly_dark",
-                    height=400
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Monthly spending trend
-            st.subheader("📈 Monthly Spending Trends")
-            df['month_year'] = df['date'].dt.to_period('M').astype(str)
-            monthly_spending = df.groupby('month_year')['amount'].sum().sort_index()
-            
-            if len(monthly_spending) > 1:
-                fig = px.line(
-                    x=monthly_spending.index,
-                    y=monthly_spending.values,
-                    title="📊 Monthly Spending Trend",
-                    markers=True
-                )
-                fig.update_layout(
-                    template="plotly_dark",
-                    height=400,
-                    xaxis_title="Month",
-                    yaxis_title="Amount (₹)"
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("📅 Add expenses from multiple months to see spending trends")
-            
-            # Top spending categories
-            st.subheader("🔝 Top Spending Categories")
-            top_categories = df.groupby('category')['amount'].sum().sort_values(ascending=False).head(10)
-            
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                fig = px.bar(
-                    x=top_categories.values,
-                    y=top_categories.index,
-                    orientation='h',
-                    title="💰 Top 10 Categories by Spending",
-                    color=top_categories.values,
-                    color_continuous_scale="reds"
-                )
-                fig.update_layout(
-                    template="plotly_dark",
-                    height=400,
-                    xaxis_title="Amount (₹)",
-                    yaxis_title="Category"
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                st.markdown("### 📋 Category Summary")
-                for idx, (category, amount) in enumerate(top_categories.head(5).items(), 1):
-                    percentage = (amount / top_categories.sum()) * 100
-                    st.metric(
-                        f"{idx}. {category}",
-                        f"₹{amount:,.2f}",
-                        f"{percentage:.1f}% of total"
-                    )
-        
-        else:
-            st.info("📝 No expense data available for analysis. Start by adding some expenses!")
-            
-    except Exception as e:
-        st.error(f"Error loading expense data: {str(e)}")
-    
-    # Anomaly Detection Section
-    if patterns['unusual_expenses']:
-        st.subheader("🔍 Unusual Expenses Detected")
-        
-        anomaly_df = pd.DataFrame(patterns['unusual_expenses'])
-        
-        # Display anomalies in a nice format
-        for _, anomaly in anomaly_df.iterrows():
-            severity_color = "🔴" if anomaly['severity'] == 'high' else "🟡"
-            st.warning(f"""
-            {severity_color} **Unusual Expense Alert**
-            - **Date:** {anomaly['date']}
-            - **Category:** {anomaly['category']}
-            - **Amount:** ₹{anomaly['amount']:,.2f}
-            - **Severity:** {anomaly['severity'].upper()}
-            """)
-        
-        st.info("💡 These expenses are significantly different from your usual spending in these categories. Review them to ensure accuracy.")
-    
-    # Predictive Budget Forecast
-    st.subheader("🔮 Monthly Budget Forecast")
-    
-    try:
-        # Get current month expenses from Supabase
-        current_month = datetime.now().strftime("%Y-%m")
-        current_day = datetime.now().day
-        days_in_month = 30  # Simplified
-        
-        current_month_result = exp_mgr.supabase.table("expenses").select("amount").eq("user_email", user).gte("date", f"{current_month}-01").lte("date", f"{current_month}-31").execute()
-        current_month_expenses = current_month_result.data
-        
-        if current_month_expenses:
-            current_spending = sum(expense['amount'] for expense in current_month_expenses)
-            
-            if current_day > 0:
-                predicted_monthly = (current_spending / current_day) * days_in_month
-                daily_average = current_spending / current_day
-            else:
-                predicted_monthly = 0
-                daily_average = 0
-            
-            col1, col2, col3 = st.columns(3)
-            col1.metric("📊 Current Month Spend", f"₹{current_spending:,.2f}")
-            col2.metric("🎯 Predicted Month Total", f"₹{predicted_monthly:,.2f}")
-            col3.metric("📅 Daily Average", f"₹{daily_average:,.2f}")
-            
-            # Progress bar for month
-            progress = min(current_spending / predicted_monthly, 1.0) if predicted_monthly > 0 else 0
-            st.progress(progress)
-            st.caption(f"Month Progress: {current_day}/{days_in_month} days ({(current_day/days_in_month)*100:.1f}%)")
-            
-            # Budget recommendations
-            if predicted_monthly > 0:
-                st.subheader("💡 Budget Recommendations")
-                
-                # Calculate recommended daily budget for rest of month
-                remaining_days = days_in_month - current_day
-                if remaining_days > 0:
-                    recommended_daily = predicted_monthly / days_in_month
-                    st.info(f"""
-                    **Recommended Actions:**
-                    - 📈 **Predicted monthly spending:** ₹{predicted_monthly:,.2f}
-                    - 💰 **Recommended daily budget:** ₹{recommended_daily:,.2f}
-                    - 📆 **Days remaining:** {remaining_days}
-                    - 🎯 **Suggested daily limit:** ₹{(predicted_monthly - current_spending) / max(remaining_days, 1):,.2f}
-                    """)
-        else:
-            st.info("📝 No expenses recorded for the current month yet.")
-            
-    except Exception as e:
-        st.error(f"Error generating forecast: {str(e)}")
-    
-    # Savings Goal Tracker
-    st.subheader("🎯 Savings Goal Tracker")
-    
-    try:
-        # Get income data from Supabase
-        income_result = inc_mgr.supabase.table("income").select("amount").eq("user_email", user).execute()
-        income_data = income_result.data
-        
-        total_income = sum(income['amount'] for income in income_data) if income_data else 0
-        total_expenses = sum(expense['amount'] for expense in exp_data) if exp_data else 0
-        
-        if total_income > 0:
-            savings_rate = ((total_income - total_expenses) / total_income) * 100
-            col1, col2, col3 = st.columns(3)
-            
-            col1.metric("💰 Total Income", f"₹{total_income:,.2f}")
-            col2.metric("💸 Total Expenses", f"₹{total_expenses:,.2f}")
-            col3.metric("📈 Savings Rate", f"{savings_rate:.1f}%")
-            
-            # Savings rate visualization
-            fig = go.Figure(go.Indicator(
-                mode = "gauge+number+delta",
-                value = savings_rate,
-                domain = {'x': [0, 1], 'y': [0, 1]},
-                title = {'text': "Savings Rate (%)"},
-                delta = {'reference': 20},  # Recommended 20% savings rate
-                gauge = {
-                    'axis': {'range': [None, 50]},
-                    'bar': {'color': "darkgreen"},
-                    'steps': [
-                        {'range': [0, 10], 'color': "lightgray"},
-                        {'range': [10, 20], 'color': "yellow"},
-                        {'range': [20, 50], 'color': "green"}
-                    ],
-                    'threshold': {
-                        'line': {'color': "red", 'width': 4},
-                        'thickness': 0.75,
-                        'value': 20
-                    }
-                }
-            ))
-            fig.update_layout(
-                template="plotly_dark",
-                height=300
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Savings recommendations
-            if savings_rate < 10:
-                st.error("🚨 **Low Savings Rate!** Try to save at least 10% of your income.")
-            elif savings_rate < 20:
-                st.warning("⚠️ **Good but can improve!** Aim for 20% savings rate.")
-            else:
-                st.success("🎉 **Excellent savings rate!** You're on track for financial success.")
-        else:
-            st.info("💡 Add income data to track your savings rate.")
-            
-    except Exception as e:
-        st.error(f"Error calculating savings: {str(e)}")
-    
-    # Quick Stats Summary
-    st.markdown("---")
-    st.subheader("📋 Quick Statistics")
-    
-    if exp_data:
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            avg_transaction = df['amount'].mean()
-            st.metric("💳 Avg Transaction", f"₹{avg_transaction:.2f}")
-        
-        with col2:
-            total_transactions = len(df)
-            st.metric("📊 Total Transactions", f"{total_transactions:,}")
-        
-        with col3:
-            max_expense = df['amount'].max()
-            st.metric("📈 Largest Expense", f"₹{max_expense:,.2f}")
-        
-        with col4:
-            unique_categories = df['category'].nunique()
-            st.metric("🏷️ Categories Used", f"{unique_categories}")
-    
-    # Export Analytics Data
-    st.markdown("---")
-    if st.button("📊 Export Analytics Report", type="primary"):
-        if exp_data:
-            analytics_report = {
-                "user_email": user,
-                "generated_at": datetime.now().isoformat(),
-                "spending_patterns": patterns,
-                "total_expenses": sum(expense['amount'] for expense in exp_data),
-                "total_income": sum(income['amount'] for income in income_data) if income_data else 0,
-                "insights": insights
-            }
-            
-            report_json = pd.Series(analytics_report).to_json(indent=2)
-            st.download_button(
-                "💾 Download Analytics Report (JSON)",
-                data=report_json.encode('utf-8'),
-                file_name=f"neurobux_analytics_{user}_{datetime.now().strftime('%Y%m%d')}.json",
-                mime="application/json"
-            )
-            st.success("📈 Analytics report ready for download!")
-        else:
-            st.info("📝 No data available to export.")
-
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from datetime import datetime, timedelta
+from database import MonthlySummaryManager, DailySummaryManager, WEEKDAY_NAMES, analytics_frame, period_range
+from charts import cached_figure, calendar_grid, period_comparison
+from precompute import get_user_analytics
+from synbot import SmartBudgetAdvisor
+from money import format_inr, rupees
+from trends import WINDOWS as TREND_WINDOWS
+
+def smart_analytics_page(exp_mgr, inc_mgr):
+    st.header("Smart Budget Analytics")
+    
+    user = st.session_state.user_email
+    
+    # Connection status check
+    if not exp_mgr.supabase:
+        st.error("❌ Database connection unavailable. Please check your Supabase configuration.")
+        return
+    
+    # Patterns, insights and forecast come from the background precompute when
+    # it's current for this user's data; otherwise they're computed here and stored
+    analytics = get_user_analytics(exp_mgr.supabase, user)
+    patterns = analytics['patterns']
+    insights = analytics['insights']
+    
+    # Display insights cards
+    st.subheader("💡 Personalized Insights")
+    
+    if insights:
+        for insight in insights:
+            if insight['type'] == 'warning':
+                st.warning(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
+            elif insight['type'] == 'alert':
+                st.error(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
+            elif insight['type'] == 'positive':
+                st.success(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
+            else:
+                st.info(f"**{insight['message']}**\n\n💡 {insight['suggestion']}")
+    else:
+        st.info("🔍 Add more expenses to generate personalized insights!")
+    
+    # Spending Pattern Visualization
+    st.subheader("📊 Spending Pattern Analysis")
+    
+    # Read from the monthly/daily rollups, not every expense row, on each rerun
+    summaries = MonthlySummaryManager(exp_mgr.supabase)
+    summary = summaries.get_all_time_summary(user)
+    spent = summary['expense']
+    exp_data = spent['count'] > 0
+    try:
+        if exp_data:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                # Peak spending day chart
+                def build_weekday_chart():
+                    daily_spending = rupees(weekday_totals(exp_mgr, user))
+                    daily_spending.index = WEEKDAY_NAMES
+                    fig = px.bar(
+                        x=daily_spending.index, 
+                        y=daily_spending.values,
+                        title="💳 Spending by Day of Week",
+                        color=daily_spending.values,
+                        color_continuous_scale="viridis",
+                        labels={'x': 'Day', 'y': 'Amount (₹)'}
+                    )
+                    fig.update_layout(
+                        template="plotly_dark",
+                        height=400,
+                        showlegend=False
+                    )
+                    return fig
+                st.plotly_chart(cached_figure(user, "analytics_weekday", None, build_weekday_chart), use_container_width=True)
+            
+            with col2:
+                # Category spending pie chart
+                category_spending = rupees(pd.Series(spent['categories'], dtype='int64').sort_values(ascending=False))
+                
+                def build_category_pie():
+                    fig = px.pie(
+                        values=category_spending.values,
+                        names=category_spending.index,
+                        title="🏷️ Spending Distribution by Category"
+                    )
+                    fig.update_layout(
+                        template="plotly_dark",
+                        height=400
+                    )
+                    return fig
+                st.plotly_chart(cached_figure(user, "analytics_category_pie", None, build_category_pie), use_container_width=True)
+            
+            # Monthly spending trend
+            st.subheader("📈 Monthly Spending Trends")
+            category_months = summaries.get_category_months(user)
+            monthly_spending = rupees(pd.Series({month: sum(totals.values()) for month, totals in category_months.items()},
+                                                dtype='int64').sort_index())
+            
+            if len(monthly_spending) > 1:
+                def build_monthly_trend():
+                    fig = px.line(
+                        x=monthly_spending.index,
+                        y=monthly_spending.values,
+                        title="📊 Monthly Spending Trend",
+                        markers=True
+                    )
+                    fig.update_layout(
+                        template="plotly_dark",
+                        height=400,
+                        xaxis_title="Month",
+                        yaxis_title="Amount (₹)"
+                    )
+                    return fig
+                st.plotly_chart(cached_figure(user, "analytics_monthly_trend", None, build_monthly_trend), use_container_width=True)
+            else:
+                st.info("📅 Add expenses from multiple months to see spending trends")
+
+            # Last 7/30/90 days against the same span before it (trends.py)
+            windows = patterns.get('trend_windows') or {}
+            if any(windows.get(f"rolling_{w}") is not None for w in TREND_WINDOWS):
+                for col, w in zip(st.columns(len(TREND_WINDOWS)), TREND_WINDOWS):
+                    ratio, smoothed = windows.get(f"rolling_{w}"), windows.get(f"ewma_{w}")
+                    if ratio is None:
+                        col.metric(f"Last {w} days", "—", help=f"Needs {2 * w} days of history")
+                    else:
+                        col.metric(f"Last {w} days", f"{(ratio - 1) * 100:+.1f}%",
+                                   help=f"vs the {w} days before · smoothed (EWMA): {(smoothed - 1) * 100:+.1f}%")
+            
+            # Top spending categories
+            st.subheader("🔝 Top Spending Categories")
+            top_categories = pd.Series(spent['categories'], dtype='int64').sort_values(ascending=False).head(10)
+            
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                def build_top_categories():
+                    fig = px.bar(
+                        x=rupees(top_categories.values),
+                        y=top_categories.index,
+                        orientation='h',
+                        title="💰 Top 10 Categories by Spending",
+                        color=rupees(top_categories.values),
+                        color_continuous_scale="reds"
+                    )
+                    fig.update_layout(
+                        template="plotly_dark",
+                        height=400,
+                        xaxis_title="Amount (₹)",
+                        yaxis_title="Category"
+                    )
+                    return fig
+                st.plotly_chart(cached_figure(user, "analytics_top_categories", None, build_top_categories), use_container_width=True)
+            
+            with col2:
+                st.markdown("### 📋 Category Summary")
+                for idx, (category, paise) in enumerate(top_categories.head(5).items(), 1):
+                    percentage = (paise / top_categories.sum()) * 100
+                    st.metric(
+                        f"{idx}. {category}",
+                        format_inr(paise),
+                        f"{percentage:.1f}% of total"
+                    )
+        
+        else:
+            st.info("📝 No expense data available for analysis. Start by adding some expenses!")
+            
+    except Exception as e:
+        st.error(f"Error loading expense data: {str(e)}")
+
+    render_spending_calendar(exp_mgr, user)
+    render_period_comparison(exp_mgr, user)
+    
+    # Anomaly Detection Section
+    # Expenses are scored as they're written; the batch check covers databases
+    # without the anomaly columns yet
+    unusual = exp_mgr.get_flagged_expenses(user)
+    if unusual is None:
+        unusual = patterns['unusual_expenses']
+    if unusual:
+        st.subheader("🔍 Unusual Expenses Detected")
+        
+        anomaly_df = pd.DataFrame(unusual)
+        
+        # Display anomalies in a nice format
+        for _, anomaly in anomaly_df.iterrows():
+            severity_color = "🔴" if anomaly['severity'] == 'high' else "🟡"
+            st.warning(f"""
+            {severity_color} **Unusual Expense Alert**
+            - **Date:** {anomaly['date']}
+            - **Category:** {anomaly['category']}
+            - **Amount:** {format_inr(anomaly['amount_paise'])}
+            - **Severity:** {anomaly['severity'].upper()}
+            """)
+        
+        st.info("💡 These expenses are significantly different from your usual spending in these categories. Review them to ensure accuracy.")
+    
+    # Recurring Charges Section
+    fixed = SmartBudgetAdvisor().project_fixed_costs(patterns.get('recurring', []))
+    if fixed['items']:
+        st.subheader("🔁 Recurring Charges")
+        st.metric("Fixed Monthly Costs", format_inr(fixed['monthly_total']),
+                  help="Rent, subscriptions and bills that repeat on a regular schedule")
+        recurring_df = pd.DataFrame(fixed['items'])
+        recurring_df[['amount_paise', 'monthly_cost']] = rupees(recurring_df[['amount_paise', 'monthly_cost']])
+        st.dataframe(
+            recurring_df[['category', 'amount_paise', 'cadence', 'occurrences', 'next_date', 'monthly_cost']].rename(columns={
+                'category': 'Category', 'amount_paise': 'Amount (₹)', 'cadence': 'Every', 'occurrences': 'Times Seen',
+                'next_date': 'Next Expected', 'monthly_cost': 'Per Month (₹)'}),
+            use_container_width=True, hide_index=True)
+    
+    # Predictive Budget Forecast
+    st.subheader("🔮 Monthly Budget Forecast")
+    
+    try:
+        forecast = analytics['forecast']
+        if exp_data and forecast:
+            current_spending = forecast['month_to_date']
+            predicted_monthly = forecast['projected_total']
+            daily_average = forecast['daily_average']
+            current_day = forecast['day_of_month']
+            days_in_month = forecast['days_in_month']
+        else:
+            current_spending = 0
+        
+        if current_spending > 0:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("📊 Current Month Spend", format_inr(current_spending))
+            col2.metric("🎯 Predicted Month Total", format_inr(predicted_monthly))
+            col3.metric("📅 Daily Average", format_inr(daily_average))
+            
+            if forecast['method'] == 'seasonal':
+                low, high = forecast['interval_80']
+                st.caption(f"80% range: {format_inr(low)} – {format_inr(high)} (weekday and category patterns from your history)")
+            else:
+                st.caption("Projected from this month's run rate; forecasts improve once you have two weeks of history.")
+            
+            # Progress bar for month
+            progress = min(current_spending / predicted_monthly, 1.0) if predicted_monthly > 0 else 0
+            st.progress(progress)
+            st.caption(f"Month Progress: {current_day}/{days_in_month} days ({(current_day/days_in_month)*100:.1f}%)")
+            
+            # Budget recommendations
+            if predicted_monthly > 0:
+                st.subheader("💡 Budget Recommendations")
+                
+                # Calculate recommended daily budget for rest of month
+                remaining_days = days_in_month - current_day
+                if remaining_days > 0:
+                    recommended_daily = predicted_monthly / days_in_month
+                    st.info(f"""
+                    **Recommended Actions:**
+                    - 📈 **Predicted monthly spending:** {format_inr(predicted_monthly)}
+                    - 💰 **Recommended daily budget:** {format_inr(recommended_daily)}
+                    - 📆 **Days remaining:** {remaining_days}
+                    - 🎯 **Suggested daily limit:** {format_inr((predicted_monthly - current_spending) / max(remaining_days, 1))}
+                    """)
+        else:
+            st.info("📝 No expenses recorded for the current month yet.")
+            
+    except Exception as e:
+        st.error(f"Error generating forecast: {str(e)}")
+    
+    # Savings Goal Tracker
+    st.subheader("🎯 Savings Goal Tracker")
+    
+    try:
+        total_income = summary['income']['total']
+        total_expenses = summary['expense']['total']
+        
+        if total_income > 0:
+            savings_rate = ((total_income - total_expenses) / total_income) * 100
+            col1, col2, col3 = st.columns(3)
+            
+            col1.metric("💰 Total Income", format_inr(total_income))
+            col2.metric("💸 Total Expenses", format_inr(total_expenses))
+            col3.metric("📈 Savings Rate", f"{savings_rate:.1f}%")
+            
+            # Savings rate visualization
+            def build_savings_gauge():
+                fig = go.Figure(go.Indicator(
+                    mode = "gauge+number+delta",
+                    value = savings_rate,
+                    domain = {'x': [0, 1], 'y': [0, 1]},
+                    title = {'text': "Savings Rate (%)"},
+                    delta = {'reference': 20},  # Recommended 20% savings rate
+                    gauge = {
+                        'axis': {'range': [None, 50]},
+                        'bar': {'color': "darkgreen"},
+                        'steps': [
+                            {'range': [0, 10], 'color': "lightgray"},
+                            {'range': [10, 20], 'color': "yellow"},
+                            {'range': [20, 50], 'color': "green"}
+                        ],
+                        'threshold': {
+                            'line': {'color': "red", 'width': 4},
+                            'thickness': 0.75,
+                            'value': 20
+                        }
+                    }
+                ))
+                fig.update_layout(
+                    template="plotly_dark",
+                    height=300
+                )
+                return fig
+            st.plotly_chart(cached_figure(user, "analytics_savings_gauge", None, build_savings_gauge), use_container_width=True)
+            
+            # Savings recommendations
+            if savings_rate < 10:
+                st.error("🚨 **Low Savings Rate!** Try to save at least 10% of your income.")
+            elif savings_rate < 20:
+                st.warning("⚠️ **Good but can improve!** Aim for 20% savings rate.")
+            else:
+                st.success("🎉 **Excellent savings rate!** You're on track for financial success.")
+        else:
+            st.info("💡 Add income data to track your savings rate.")
+            
+    except Exception as e:
+        st.error(f"Error calculating savings: {str(e)}")
+    
+    # Quick Stats Summary
+    st.markdown("---")
+    st.subheader("📋 Quick Statistics")
+    
+    if exp_data:
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            avg_transaction = spent['total'] / spent['count']
+            st.metric("💳 Avg Transaction", format_inr(avg_transaction))
+        
+        with col2:
+            total_transactions = spent['count']
+            st.metric("📊 Total Transactions", f"{total_transactions:,}")
+        
+        with col3:
+            max_expense = spent['max']
+            st.metric("📈 Largest Expense", format_inr(max_expense))
+        
+        with col4:
+            unique_categories = len(spent['categories'])
+            st.metric("🏷️ Categories Used", f"{unique_categories}")
+    
+    # Export Analytics Data
+    st.markdown("---")
+    if st.button("📊 Export Analytics Report", type="primary"):
+        if exp_data:
+            analytics_report = {
+                "user_email": user,
+                "generated_at": datetime.now().isoformat(),
+                "amounts_in": "paise",
+                "spending_patterns": patterns,
+                "total_expenses_paise": total_expenses,
+                "total_income_paise": total_income,
+                "insights": insights
+            }
+            
+            report_json = pd.Series(analytics_report).to_json(indent=2)
+            st.download_button(
+                "💾 Download Analytics Report (JSON)",
+                data=report_json.encode('utf-8'),
+                file_name=f"neurobux_analytics_{user}_{datetime.now().strftime('%Y%m%d')}.json",
+                mime="application/json"
+            )
+            st.success("📈 Analytics report ready for download!")
+        else:
+            st.info("📝 No data available to export.")
+
+
+def weekday_totals(exp_mgr, user):
+    """Paise spent per weekday (Monday first), from the daily_summaries rollup a year at a time"""
+    days = DailySummaryManager(exp_mgr.supabase)
+    totals = {}
+    for year in {month[:4] for month in exp_mgr.get_month_index(user)}:
+        year_totals = days.get_daily_totals(user, *period_range("year", f"{year}-01-01"))
+        if year_totals is None:  # migrations/009 not applied yet
+            rows = exp_mgr.supabase.table("expenses").select("amount_paise, date").eq("user_email", user).execute().data
+            frame = analytics_frame(rows) if rows else pd.DataFrame(columns=['weekday', 'amount_paise'])
+            return frame.groupby('weekday')['amount_paise'].sum().reindex(range(7), fill_value=0)
+        totals.update(year_totals)
+    daily = pd.Series(totals, dtype='int64')
+    return daily.groupby(pd.to_datetime(daily.index).weekday).sum().reindex(range(7), fill_value=0)
+
+def render_spending_calendar(exp_mgr, user):
+    """Calendar heatmap of one year's daily spend, read from the daily_summaries rollup"""
+    years = sorted({month[:4] for month in exp_mgr.get_month_index(user)}, reverse=True)
+    if not years:
+        return
+    st.subheader("🗓️ Spending Calendar")
+    year = st.selectbox("Year", years, key="calendar_year") if len(years) > 1 else years[0]
+    start, end = period_range("year", f"{year}-01-01")
+
+    def build_calendar():
+        totals = DailySummaryManager(exp_mgr.supabase).get_daily_totals(user, start, end)
+        if totals is None:  # migrations/009 not applied yet
+            totals = {}
+            for row in exp_mgr.get_expenses_between(user, start, end):
+                day = datetime.strptime(str(row['date'])[:10], "%Y-%m-%d").date()
+                totals[day] = totals.get(day, 0) + int(row['amount_paise'])
+        paise, days = calendar_grid(totals, start, end)
+        fig = go.Figure(go.Heatmap(
+            z=rupees(paise.to_numpy(dtype=float)),
+            x=paise.columns,
+            y=[name[:3] for name in WEEKDAY_NAMES],
+            customdata=days.to_numpy(),
+            hovertemplate="%{customdata}<br>₹%{z:,.2f}<extra></extra>",
+            hoverongaps=False,
+            colorscale="YlOrRd",
+            colorbar=dict(title="₹"),
+            xgap=2,
+            ygap=2
+        ))
+        fig.update_layout(
+            template="plotly_dark",
+            height=280,
+            title=f"📆 Daily Spending in {year}",
+            yaxis=dict(autorange="reversed")
+        )
+        return fig
+    st.plotly_chart(cached_figure(user, "analytics_calendar", year, build_calendar), use_container_width=True)
+
+def _change(current, previous):
+    return f"{(current / previous - 1) * 100:+.1f}%" if previous else "—"
+
+def render_period_comparison(exp_mgr, user):
+    """Month-over-month and year-over-year spend per category, from the monthly_summaries rollup"""
+    category_months = MonthlySummaryManager(exp_mgr.supabase).get_category_months(user)
+    if not category_months:
+        return
+    st.subheader("📅 Month-over-Month & Year-over-Year")
+    month = st.selectbox("Month", sorted(category_months, reverse=True), key="comparison_month")
+    comparison = period_comparison(category_months, month)
+    totals = comparison[['this_month', 'last_month', 'last_year']].sum()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric(f"Spent in {month}", format_inr(totals['this_month']))
+    col2.metric("Month over Month", _change(totals['this_month'], totals['last_month']),
+                help=f"Previous month: {format_inr(totals['last_month'])}")
+    col3.metric("Year over Year", _change(totals['this_month'], totals['last_year']),
+                help=f"Same month last year: {format_inr(totals['last_year'])}")
+
+    def build_comparison():
+        top = comparison.head(10)
+        fig = go.Figure([
+            go.Bar(name=label, x=top.index, y=rupees(top[col]))
+            for col, label in (('last_year', 'Same month last year'), ('last_month', 'Previous month'),
+                               ('this_month', month))
+        ])
+        fig.update_layout(
+            template="plotly_dark",
+            height=400,
+            barmode="group",
+            title="🏷️ Category Spend Compared",
+            xaxis_title="Category",
+            yaxis_title="Amount (₹)"
+        )
+        return fig
+    st.plotly_chart(cached_figure(user, "analytics_period_comparison", month, build_comparison), use_container_width=True)
+
+    table = comparison.assign(
+        this_month=rupees(comparison['this_month']),
+        last_month=rupees(comparison['last_month']),
+        last_year=rupees(comparison['last_year']),
+        mom=(comparison['mom'] * 100).round(1),
+        yoy=(comparison['yoy'] * 100).round(1),
+    )
+    st.dataframe(
+        table[['this_month', 'last_month', 'mom', 'last_year', 'yoy']].rename_axis('Category').rename(columns={
+            'this_month': 'This Month (₹)', 'last_month': 'Previous Month (₹)', 'mom': 'MoM %',
+            'last_year': 'Same Month Last Year (₹)', 'yoy': 'YoY %'}),
+        use_container_width=True)
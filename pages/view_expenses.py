@@ -1,11 +1,13 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
+from database import SEARCH_PAGE_SIZE
+from money import format_inr, rupees, to_paise
 
 def view_expenses_page(exp_mgr, inc_mgr):
     st.header("View Expenses")
 
-    all_expenses = exp_mgr.get_expenses(st.session_state.user_email)
-    months = sorted({e[3][:7] for e in all_expenses if e[3]}, reverse=True)
+    months = list(exp_mgr.get_month_index(st.session_state.user_email))
     if not months:
         months = [datetime.now().strftime("%Y-%m")]
 
@@ -39,15 +41,8 @@ def view_expenses_page(exp_mgr, inc_mgr):
     with col2:
         if st.button("🗑️ Delete Selected Month", key="delete_selected_month"):
             if st.session_state.get('confirm_delete_month', False):
-                # Updated for Supabase - use date range deletion
-                start_date = f"{selected_month}-01"
-                end_date = f"{selected_month}-31"
-                
-                # Delete expenses for the month using Supabase
-                exp_mgr.supabase.table("expenses").delete().eq("user_email", st.session_state.user_email).gte("date", start_date).lte("date", end_date).execute()
-                
-                # Delete income for the month using Supabase
-                inc_mgr.supabase.table("income").delete().eq("user_email", st.session_state.user_email).gte("date", start_date).lte("date", end_date).execute()
+                exp_mgr.delete_month(st.session_state.user_email, selected_month)
+                inc_mgr.delete_month(st.session_state.user_email, selected_month)
                 
                 st.success(f"All data for {selected_month} deleted!")
                 st.session_state.confirm_delete_month = False
@@ -77,25 +72,20 @@ def view_expenses_page(exp_mgr, inc_mgr):
 
     st.markdown("---")
 
+    render_expense_search(exp_mgr, st.session_state.user_email)
+
     # --- EXPENSES SECTION WITH SUPABASE ID-BASED DELETION ---
     st.subheader("💸 Expenses")
     
     try:
-        # Get expenses with full database information including IDs from Supabase
-        if selected_month:
-            start_date = f"{selected_month}-01"
-            end_date = f"{selected_month}-31"
-            exp_result = exp_mgr.supabase.table("expenses").select("*").eq("user_email", st.session_state.user_email).gte("date", start_date).lte("date", end_date).order("date", desc=True).execute()
-        else:
-            exp_result = exp_mgr.supabase.table("expenses").select("*").eq("user_email", st.session_state.user_email).order("date", desc=True).execute()
-        
-        exp_full_data = exp_result.data
+        # Full rows including IDs, for the selected month's actual first..last day
+        exp_full_data = exp_mgr.get_expenses_for_period(st.session_state.user_email, "month", f"{selected_month}-01")
         
         if exp_full_data:
             for row in exp_full_data:
                 col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 1, 1])
                 col1.text(row['category'])
-                col2.text(f"₹{row['amount']:.2f}")
+                col2.text(format_inr(row['amount_paise']))
                 col3.text(row['date'])
                 col4.empty()
                 
@@ -118,20 +108,13 @@ def view_expenses_page(exp_mgr, inc_mgr):
     st.subheader("💰 Income")
     
     try:
-        # Get income with full database information including IDs from Supabase
-        if selected_month:
-            start_date = f"{selected_month}-01"
-            end_date = f"{selected_month}-31"
-            inc_result = inc_mgr.supabase.table("income").select("*").eq("user_email", st.session_state.user_email).gte("date", start_date).lte("date", end_date).order("date", desc=True).execute()
-        else:
-            inc_result = inc_mgr.supabase.table("income").select("*").eq("user_email", st.session_state.user_email).order("date", desc=True).execute()
-        
-        inc_full_data = inc_result.data
+        # Full rows including IDs, for the selected month's actual first..last day
+        inc_full_data = inc_mgr.get_income_for_period(st.session_state.user_email, "month", f"{selected_month}-01")
         
         if inc_full_data:
             for row in inc_full_data:
                 col1, col2, col3 = st.columns([3, 2, 1])
-                col1.text(f"₹{row['amount']:.2f}")
+                col1.text(format_inr(row['amount_paise']))
                 col2.text(row['date'])
                 
                 # Use the actual database ID for deletion
@@ -147,3 +130,51 @@ def view_expenses_page(exp_mgr, inc_mgr):
     except Exception as e:
         st.error(f"Error loading income: {str(e)}")
 
+
+def render_expense_search(exp_mgr, user):
+    """Search across all months by category prefix, amount range and date range"""
+    with st.expander("🔎 Search Expenses", expanded=bool(st.session_state.get("expense_search"))):
+        with st.form("expense_search_form"):
+            col1, col2, col3 = st.columns([2, 1, 1])
+            category = col1.text_input("Category", placeholder="e.g. trav, food")
+            min_amount = col2.number_input("Min ₹", min_value=0.0, value=0.0, step=100.0)
+            max_amount = col3.number_input("Max ₹ (0 = no limit)", min_value=0.0, value=0.0, step=100.0)
+            col1, col2 = st.columns(2)
+            start_date = col1.date_input("From", value=None)
+            end_date = col2.date_input("To", value=None)
+            submitted = st.form_submit_button("Search")
+        if submitted:
+            st.session_state.expense_search = {
+                'category': category.strip() or None,
+                'min_paise': to_paise(min_amount) if min_amount else None,
+                'max_paise': to_paise(max_amount) if max_amount else None,
+                'start_date': start_date,
+                'end_date': end_date,
+            }
+            st.session_state.expense_search_page = 0
+
+        filters = st.session_state.get("expense_search")
+        if not filters:
+            return
+        page = st.session_state.get("expense_search_page", 0)
+        rows, total = exp_mgr.search_expenses(user, page=page, **filters)
+        if not total:
+            st.info("No expenses match these filters.")
+            return
+
+        pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+        st.caption(f"{total} matching expenses · {format_inr(sum(r['amount_paise'] for r in rows))} on this page · page {page + 1} of {pages}")
+        results = pd.DataFrame(rows)[['date', 'category', 'amount_paise']]
+        st.dataframe(results.assign(amount_paise=rupees(results['amount_paise'])).rename(
+            columns={'date': 'Date', 'category': 'Category', 'amount_paise': 'Amount (₹)'}), hide_index=True)
+
+        col1, col2, col3 = st.columns([1, 1, 4])
+        if col1.button("◀ Prev", key="search_prev", disabled=page == 0):
+            st.session_state.expense_search_page = page - 1
+            st.rerun()
+        if col2.button("Next ▶", key="search_next", disabled=page + 1 >= pages):
+            st.session_state.expense_search_page = page + 1
+            st.rerun()
+        if col3.button("Clear search", key="search_clear"):
+            st.session_state.expense_search = None
+            st.rerun()
@@ -0,0 +1,219 @@
+"""
+Background precompute of Smart Analytics results.
+
+A scheduler periodically finds recently active users whose data changed since
+their last precompute, recomputes spending patterns, budget insights and the
+month-end forecast in a process pool, and stores the results in analytics_cache
+stamped with the user's data version (migrations/002_analytics_cache.sql).
+Pages read the stored payload and only compute live when it is stale, or when
+this process has changes the stored version doesn't cover yet (local replica
+writes not pushed); those live results are kept in memory for the process.
+
+    python manage.py precompute            # one pass
+    python manage.py precompute --loop     # keep running
+"""
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+import streamlit as st
+from metrics import execute_query, record_cache
+from tracing import trace_methods
+
+ACTIVE_WITHIN_DAYS = 14
+DEFAULT_INTERVAL_SECONDS = 600
+USERS_PER_TASK = 20
+
+# user -> (stored data version, local counter when this process first saw it)
+_baselines = {}
+# user -> (data version, payload) computed here while local changes were unsynced
+_local_payloads = {}
+_local_lock = threading.Lock()
+
+def _jsonable(payload):
+    # numpy scalars and tuples come back from pandas; store plain JSON types
+    return json.loads(json.dumps(payload, default=lambda o: o.item() if hasattr(o, 'item') else str(o)))
+
+def compute_user_analytics(client, user, today=None, patterns=None):
+    """Patterns, insights and forecast for one user, as a JSON-serializable dict.
+    Pass patterns when they've already been computed in a batch."""
+    import pandas as pd
+    from database import SpendingAnalyzer
+    from synbot import SmartBudgetAdvisor
+    from forecast import get_forecaster
+
+    analyzer = SpendingAnalyzer(client)
+    if patterns is None:
+        patterns = analyzer.detect_spending_patterns(user)
+    insights = SmartBudgetAdvisor(analyzer).generate_budget_insights(None, patterns)
+
+    rows = execute_query(client.table("expenses").select("category, amount_paise, date").eq("user_email", user),
+                         "expenses", "select").data
+    forecast = None
+    if rows:
+        df = pd.DataFrame(rows)
+        df['date'] = pd.to_datetime(df['date'])
+        df['amount_paise'] = df['amount_paise'].astype('int64')
+        forecast = get_forecaster().forecast(user, df, today=today)
+
+    return _jsonable({
+        'computed_for': (today or date.today()).isoformat(),
+        'patterns': patterns,
+        'insights': insights,
+        'forecast': forecast,
+    })
+
+@trace_methods
+class AnalyticsCacheStore:
+    def __init__(self, supabase_client):
+        self.supabase = supabase_client
+
+    def current_versions(self, users):
+        """{user: data version} from user_data_versions; users never written to are 0"""
+        result = execute_query(
+            self.supabase.table("user_data_versions").select("user_email, version").in_("user_email", list(users)),
+            "user_data_versions", "select")
+        versions = {user: 0 for user in users}
+        versions.update({row['user_email']: row['version'] for row in result.data})
+        return versions
+
+    def stored_versions(self, users):
+        """{user: (data_version, computed_for)} for users with a cached payload"""
+        result = execute_query(
+            self.supabase.table("analytics_cache").select("user_email, data_version, computed_for")
+            .in_("user_email", list(users)),
+            "analytics_cache", "select")
+        return {row['user_email']: (row['data_version'], row['computed_for']) for row in result.data}
+
+    def get_fresh(self, user, version=None):
+        """The stored payload if it matches the user's current data version (or `version`) and today's date"""
+        try:
+            if version is None:
+                version = self.current_versions([user])[user]
+            result = execute_query(
+                self.supabase.table("analytics_cache").select("data_version, computed_for, payload").eq("user_email", user),
+                "analytics_cache", "select")
+        except Exception:
+            return None  # Migration not applied; callers compute live
+        fresh = bool(result.data) and result.data[0]['data_version'] == version \
+            and result.data[0]['computed_for'] == date.today().isoformat()
+        record_cache("analytics", fresh)
+        return result.data[0]['payload'] if fresh else None
+
+    def put_many(self, rows):
+        """rows: iterable of (user, data_version, payload)"""
+        data = [
+            {"user_email": user, "data_version": version, "computed_for": payload['computed_for'],
+             "payload": payload, "computed_at": datetime.now().isoformat()}
+            for user, version, payload in rows
+        ]
+        if data:
+            execute_query(self.supabase.table("analytics_cache").upsert(data, on_conflict="user_email"),
+                          "analytics_cache", "upsert")
+
+def _has_local_changes(client, user, version):
+    """True when this process holds changes for user that the stored data version doesn't include"""
+    stored, local = version
+    if hasattr(client, "pending_count") and client.pending_count():
+        return True  # Local replica writes still waiting to be pushed
+    with _local_lock:
+        baseline = _baselines.get(user)
+        if baseline is None or baseline[0] != stored:
+            baseline = _baselines[user] = (stored, local)
+    return local != baseline[1]
+
+def get_user_analytics(client, user):
+    """Precomputed analytics when fresh, otherwise computed live and stored for next time"""
+    from database import get_data_version
+    version = get_data_version(user)
+    stored = version[0]
+    if stored is None or _has_local_changes(client, user, version):
+        # The shared cache can't reflect these yet; reuse this process's own result while the version holds
+        with _local_lock:
+            entry = _local_payloads.get(user)
+        fresh = entry is not None and entry[0] == version and entry[1]['computed_for'] == date.today().isoformat()
+        record_cache("analytics", fresh)
+        if fresh:
+            return entry[1]
+        payload = compute_user_analytics(client, user)
+        with _local_lock:
+            _local_payloads[user] = (version, payload)
+        return payload
+    store = AnalyticsCacheStore(client)
+    payload = store.get_fresh(user, stored)
+    if payload is not None:
+        return payload
+    payload = compute_user_analytics(client, user)
+    try:
+        store.put_many([(user, stored, payload)])
+    except Exception:
+        pass  # Caching is best effort; the live result is still good
+    return payload
+
+def _compute_batch(users):
+    """Process-pool entry point: each worker process opens its own client"""
+    from database import begin_request, init_supabase, SpendingAnalyzer
+    begin_request()  # One data-version read per user for the whole batch
+    client = init_supabase()
+    patterns = SpendingAnalyzer(client).detect_spending_patterns_batch(users)
+    return [(user, compute_user_analytics(client, user, patterns=patterns[user])) for user in users]
+
+@trace_methods
+class PrecomputeScheduler:
+    def __init__(self, supabase_client, workers=None, active_within_days=ACTIVE_WITHIN_DAYS):
+        self.supabase = supabase_client
+        self.store = AnalyticsCacheStore(supabase_client)
+        self.workers = workers or max(1, (multiprocessing.cpu_count() or 2) - 1)
+        self.active_within_days = active_within_days
+        self.last_run = None
+
+    def active_users(self):
+        cutoff = (datetime.now() - timedelta(days=self.active_within_days)).isoformat()
+        result = execute_query(self.supabase.table("auth_users").select("email").gte("last_login", cutoff),
+                               "auth_users", "select")
+        return [row['email'] for row in result.data]
+
+    def stale_users(self, users):
+        """(user, current version) for users whose cached payload is missing or out of date"""
+        if not users:
+            return []
+        current = self.store.current_versions(users)
+        stored = self.store.stored_versions(users)
+        today = date.today().isoformat()
+        return [(user, current[user]) for user in users
+                if stored.get(user) != (current[user], today)]
+
+    def run_once(self):
+        """Recompute analytics for every stale active user; returns how many were refreshed"""
+        stale = self.stale_users(self.active_users())
+        if not stale:
+            self.last_run = {'at': datetime.now().isoformat(), 'refreshed': 0}
+            return 0
+        versions = dict(stale)
+        users = list(versions)
+        batches = [users[i:i + USERS_PER_TASK] for i in range(0, len(users), USERS_PER_TASK)]
+        refreshed = 0
+        # spawn, not fork: the parent may be a multi-threaded Streamlit server
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for results in pool.map(_compute_batch, batches):
+                self.store.put_many((user, versions[user], payload) for user, payload in results)
+                refreshed += len(results)
+        self.last_run = {'at': datetime.now().isoformat(), 'refreshed': refreshed}
+        return refreshed
+
+    def run_forever(self, interval=DEFAULT_INTERVAL_SECONDS, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.last_run = {'at': datetime.now().isoformat(), 'error': str(e)}
+            stop_event.wait(interval)
+
+@st.cache_resource
+def start_background_precompute(_client, interval=DEFAULT_INTERVAL_SECONDS):
+    """Run the scheduler on a daemon thread inside the Streamlit process (once per process)"""
+    scheduler = PrecomputeScheduler(_client)
+    threading.Thread(target=scheduler.run_forever, args=(interval,), name="analytics-precompute", daemon=True).start()
+    return scheduler
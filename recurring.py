@@ -0,0 +1,112 @@
+"""
+Recurring charge detection (rent, subscriptions, EMIs, bills).
+
+Charges are bucketed by category and amount (log-scale buckets, so ₹499 and
+₹505 land together but ₹499 and ₹999 don't), sorted once by bucket and date,
+and the gaps between consecutive charges in each bucket are compared with a
+set of known cadences. A second pass also splits buckets by billing day, for
+monthly charges that share a bucket with unrelated spending. Everything is
+grouped/vectorized: no pairwise comparisons, so it runs over a full
+multi-year history in one pass.
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+
+AMOUNT_TOLERANCE = 0.05  # Charges within ~5% of each other count as the same amount
+MIN_OCCURRENCES = 3
+MIN_REGULARITY = 0.75  # Share of gaps that must match the cadence
+DAYS_PER_MONTH = 365.25 / 12
+
+# name -> (period in days, allowed deviation in days)
+CADENCES = {
+    "weekly": (7, 1),
+    "fortnightly": (14, 2),
+    "monthly": (30.44, 3.5),
+    "quarterly": (91.3, 7),
+    "yearly": (365.25, 12),
+}
+
+def detect_recurring(df, today=None, by=()):
+    """
+    Find recurring charges in a frame with category, amount_paise and date (datetime) columns.
+
+    Returns a DataFrame with one row per series: the `by` columns, category,
+    amount_paise (median), cadence, period_days, occurrences, first_date, last_date,
+    next_date, monthly_cost (paise) and active (whether the next charge is still expected).
+    """
+    by = list(by)
+    columns = by + ['category', 'amount_paise', 'cadence', 'period_days', 'occurrences',
+                    'first_date', 'last_date', 'next_date', 'monthly_cost', 'active']
+    data = df[by + ['category', 'amount_paise', 'date']]
+    data = data[data['amount_paise'] > 0]
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+    today = pd.Timestamp(today or date.today())
+
+    data = data.assign(
+        bucket=np.round(np.log(data['amount_paise'].astype(float)) / np.log1p(AMOUNT_TOLERANCE)).astype(np.int64),
+        day=data['date'].dt.normalize(),
+    )
+    data['dom'] = data['day'].dt.day.clip(upper=28)
+    keys = by + ['category', 'bucket']
+    # A bucket can mix a real subscription with unrelated charges of a similar size,
+    # or hold two same-price subscriptions billed on different days; a second pass
+    # split by billing day (day of month) finds those series, each kept separately
+    # unless the whole bucket already matched
+    whole = _series(data, keys)
+    by_day = _series(data, keys + ['dom'])
+    if not whole.empty and not by_day.empty:
+        by_day = by_day[~pd.MultiIndex.from_frame(by_day[keys]).isin(pd.MultiIndex.from_frame(whole[keys]))]
+    found = pd.concat([whole, by_day], ignore_index=True)
+    if found.empty:
+        return pd.DataFrame(columns=columns)
+
+    found['next_date'] = found['last_date'] + pd.to_timedelta(found['period_days'].round(), unit='D')
+    found['monthly_cost'] = found['amount_paise'] * DAYS_PER_MONTH / found['period_days']
+    found['active'] = (today - found['last_date']).dt.days <= found['period_days'] + 2 * found['slack']
+    return found.sort_values(by + ['monthly_cost'], ascending=[True] * len(by) + [False])[columns].reset_index(drop=True)
+
+def _series(data, keys):
+    """Groups of `keys` whose charges repeat on one of the CADENCES"""
+    # Several charges on one day in a group are one occurrence
+    data = data.sort_values(keys + ['day']).drop_duplicates(keys + ['day'])
+    groups = data.groupby(keys, sort=False, observed=True)
+    data['gap'] = groups['day'].diff().dt.days
+
+    stats = groups.agg(occurrences=('day', 'size'), amount_paise=('amount_paise', 'median'),
+                       first_date=('day', 'min'), last_date=('day', 'max'),
+                       median_gap=('gap', 'median'))
+    stats = stats[stats['occurrences'] >= MIN_OCCURRENCES]
+    if stats.empty:
+        return stats.reset_index()
+
+    # Nearest known cadence to each group's median gap
+    names = list(CADENCES)
+    periods = np.array([CADENCES[n][0] for n in names])
+    slack = np.array([CADENCES[n][1] for n in names])
+    nearest = np.abs(stats['median_gap'].to_numpy()[:, None] - periods[None, :]).argmin(axis=1)
+    stats['cadence'] = np.array(names, dtype=object)[nearest]
+    stats['period_days'] = periods[nearest]
+    stats['slack'] = slack[nearest]
+    stats = stats[np.abs(stats['median_gap'] - stats['period_days']) <= stats['slack']]
+    if stats.empty:
+        return stats.reset_index()
+
+    # Regularity: share of the group's gaps that fall within the cadence's slack
+    gaps = data.dropna(subset=['gap']).join(stats[['period_days', 'slack']], on=keys, how='inner')
+    on_beat = (np.abs(gaps['gap'] - gaps['period_days']) <= gaps['slack']).groupby([gaps[k] for k in keys], observed=True).mean()
+    stats['regularity'] = on_beat.reindex(stats.index).fillna(0)
+    return stats[stats['regularity'] >= MIN_REGULARITY].reset_index()
+
+def to_records(frame):
+    """JSON-friendly dicts (dates as YYYY-MM-DD) for patterns payloads"""
+    if frame.empty:
+        return []
+    out = frame.copy()
+    for col in ('first_date', 'last_date', 'next_date'):
+        out[col] = out[col].dt.strftime('%Y-%m-%d')
+    # Whole paise; medians and per-month costs can land between two
+    out['amount_paise'] = out['amount_paise'].round().astype('int64')
+    out['monthly_cost'] = out['monthly_cost'].round().astype('int64')
+    return out.to_dict('records')
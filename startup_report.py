@@ -0,0 +1,95 @@
+"""
+Startup-time report for NeuroBux.
+
+Imports each module in a fresh interpreter with ``python -X importtime`` so every
+number is a cold-start cost, then prints the cumulative import time per module and
+the heaviest transitive imports behind it.
+
+    python startup_report.py
+    python startup_report.py --json startup_report.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# App modules first, then the heavy third-party dependencies they pull in
+MODULES = [
+    "streamlit",
+    "auth",
+    "database",
+    "utils",
+    "pages.login",
+    "pages.dashboard",
+    "pages.add_transaction",
+    "pages.view_expenses",
+    "pages.smart_analytics",
+    "pages.ai_coach",
+    "synbot",
+    "pandas",
+    "plotly.express",
+    "yfinance",
+    "cohere",
+    "fpdf",
+    "supabase",
+]
+
+# Imported by the interpreter itself before the measured module
+INTERPRETER_STARTUP = {"site", "encodings", "_distutils_hack"}
+
+
+def measure_import(module, top=5):
+    """Return cumulative import time (ms) for a module and its heaviest dependencies"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            timings[name.strip()] = int(cumulative) / 1000
+        except ValueError:
+            continue  # Header line
+    total = timings.get(module, 0.0)
+    heaviest = sorted(
+        ((name, ms) for name, ms in timings.items()
+         if name != module and "." not in name and name not in INTERPRETER_STARTUP),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "cumulative_ms": round(total, 1),
+        "heaviest": [{"module": name, "cumulative_ms": round(ms, 1)} for name, ms in heaviest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report cold import cost per module")
+    parser.add_argument("modules", nargs="*", default=MODULES, help="Modules to measure")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = [measure_import(module) for module in args.modules]
+
+    print(f"{'module':<24}{'cold import (ms)':>18}  heaviest dependencies")
+    for entry in report:
+        total = f"{entry['cumulative_ms']:.1f}" if entry["ok"] else "failed"
+        deps = ", ".join(f"{d['module']} {d['cumulative_ms']:.0f}" for d in entry["heaviest"][:3])
+        print(f"{entry['module']:<24}{total:>18}  {deps}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import re
-import yfinance as yf
+import time
 import streamlit as st
-from cohere import ClientV2  # Ensure cohere is installed: pip install cohere
+from tracing import trace_methods
+from metrics import LLM_FIRST_TOKEN, LLM_TOTAL, PRICE_LOOKUPS
+from money import format_inr, rupees
 
+# yfinance and cohere are imported where they are used; both are slow to import
+# and SmartBudgetAdvisor is needed by pages that never touch them.
+
+@trace_methods
 class SynBot:
     def __init__(self, model="command-a-03-2025"):
         """
@@ -14,63 +20,100 @@ class SynBot:
         if not self.api_key:
             raise ValueError("🤖 API Key missing! Please add 'cohere_api_key' to Streamlit secrets.")
 
-    def _format_financial_summary(self, df_exp, df_inc, analytics_data):
+    def _format_financial_summary(self, df_exp, df_inc, analytics_data, summary=None):
+        if summary:
+            return self._format_from_summary(summary, analytics_data)
+
         parts = []
 
         if df_exp is not None and not df_exp.empty:
-            spent = df_exp["Amount"].sum()
-            parts.append(f"Total spent ₹{spent:.2f} across {len(df_exp)} transactions.")
+            spent = df_exp["Paise"].sum()
+            parts.append(f"Total spent {format_inr(spent)} across {len(df_exp)} transactions.")
             try:
-                top_cat = df_exp.groupby("Category")["Amount"].sum().idxmax()
-                avg_exp = df_exp["Amount"].mean()
-                category_split = df_exp.groupby("Category")["Amount"].sum().to_dict()
+                top_cat = df_exp.groupby("Category")["Paise"].sum().idxmax()
+                avg_exp = df_exp["Paise"].mean()
+                category_split = rupees(df_exp.groupby("Category")["Paise"].sum()).to_dict()
                 parts += [
                     f"Top category: {top_cat}",
-                    f"Average expense: ₹{avg_exp:.2f}",
+                    f"Average expense: {format_inr(avg_exp)}",
                     f"Category breakdown: {category_split}"
                 ]
             except Exception:
                 pass
 
         if df_inc is not None and not df_inc.empty:
-            earned = df_inc["Amount"].sum()
-            avg_inc = df_inc["Amount"].mean()
+            earned = df_inc["Paise"].sum()
+            avg_inc = df_inc["Paise"].mean()
             parts += [
-                f"Total income: ₹{earned:.2f} from {len(df_inc)} sources.",
-                f"Average income: ₹{avg_inc:.2f}"
+                f"Total income: {format_inr(earned)} from {len(df_inc)} sources.",
+                f"Average income: {format_inr(avg_inc)}"
             ]
             if df_exp is not None and not df_exp.empty:
-                parts.append(f"Net balance: ₹{earned - df_exp['Amount'].sum():.2f}")
+                parts.append(f"Net balance: {format_inr(earned - df_exp['Paise'].sum())}")
+
+        parts += self._format_patterns(analytics_data)
+        return " ".join(parts)
+
+    def _format_from_summary(self, summary, analytics_data):
+        """Same context as above, built from precomputed monthly summaries instead of raw rows"""
+        parts = []
+        exp, inc = summary["expense"], summary["income"]
 
-        if analytics_data:
-            trend = analytics_data.get("trend", 1)
-            trend_status = "increasing" if trend > 1.1 else "stable" if trend > 0.9 else "decreasing"
-            parts.append(
-                f"Spending patterns: peak on {analytics_data.get('peak_day', 'weekdays')}, "
-                f"trend: {trend_status}, top category: {analytics_data.get('top_category', 'miscellaneous')}."
-            )
+        if exp["count"]:
+            parts.append(f"Total spent {format_inr(exp['total'])} across {exp['count']} transactions.")
+            if exp["categories"]:
+                category_split = {cat: rupees(paise) for cat, paise in exp["categories"].items()}
+                parts += [
+                    f"Top category: {max(category_split, key=category_split.get)}",
+                    f"Average expense: {format_inr(exp['total'] / exp['count'])}",
+                    f"Category breakdown: {category_split}"
+                ]
 
+        if inc["count"]:
+            parts += [
+                f"Total income: {format_inr(inc['total'])} from {inc['count']} sources.",
+                f"Average income: {format_inr(inc['total'] / inc['count'])}"
+            ]
+            if exp["count"]:
+                parts.append(f"Net balance: {format_inr(inc['total'] - exp['total'])}")
+
+        parts += self._format_patterns(analytics_data)
         return " ".join(parts)
 
+    def _format_patterns(self, analytics_data):
+        if not analytics_data:
+            return []
+        trend = analytics_data.get("trend", 1)
+        trend_status = "increasing" if trend > 1.1 else "stable" if trend > 0.9 else "decreasing"
+        return [
+            f"Spending patterns: peak on {analytics_data.get('peak_day', 'weekdays')}, "
+            f"trend: {trend_status}, top category: {analytics_data.get('top_category', 'miscellaneous')}."
+        ]
+
     def _live_price(self, symbol):
+        start = time.perf_counter()
         try:
+            import yfinance as yf
             tk = yf.Ticker(symbol)
             df = tk.history(period="1d", interval="1m")
             if df.empty:
+                PRICE_LOOKUPS.observe(time.perf_counter() - start, status="empty")
                 return f"❌ *{symbol.upper()}*: no recent trades."
             last = df.iloc[-1]
             chg = (last.Close - last.Open) / last.Open * 100
+            PRICE_LOOKUPS.observe(time.perf_counter() - start, status="ok")
             return f"📈 *{symbol.upper()}*\nPrice: **${last.Close:.2f}**\nChange: **{chg:+.2f}%**"
         except Exception as e:
+            PRICE_LOOKUPS.observe(time.perf_counter() - start, status="error")
             return f"⚠ *{symbol}*: {e}"
 
-    def answer(self, question, df_exp=None, df_inc=None, analytics_data=None):
+    def answer(self, question, df_exp=None, df_inc=None, analytics_data=None, summary=None):
         q_clean = question.strip()
         symbol_match = re.search(r"\b([A-Z]{2,5})\b", q_clean.upper())
         if "price" in q_clean.lower() and symbol_match:
             return self._live_price(symbol_match.group(1))
 
-        context = self._format_financial_summary(df_exp, df_inc, analytics_data)
+        context = self._format_financial_summary(df_exp, df_inc, analytics_data, summary)
 
         messages = [
             {
@@ -89,22 +132,34 @@ class SynBot:
         return self._call_cohere_stream(messages)
 
     def _call_cohere_stream(self, messages):
+        start = time.perf_counter()
         try:
+            from cohere import ClientV2  # Ensure cohere is installed: pip install cohere
             client = ClientV2(api_key=self.api_key)
             cohere_messages = [{"role": m["role"], "content": m["content"]} for m in messages]
             stream = client.chat_stream(model=self.model, messages=cohere_messages, temperature=0.3)
             output = []
             for event in stream:
                 if event.type == "content-delta":
+                    if not output:
+                        LLM_FIRST_TOKEN.observe(time.perf_counter() - start, model=self.model)
                     output.append(event.delta.message.content.text)
+            LLM_TOTAL.observe(time.perf_counter() - start, model=self.model, status="ok")
             return "".join(output).strip()
         except Exception as e:
+            LLM_TOTAL.observe(time.perf_counter() - start, model=self.model, status="error")
             return f"🤖 Cohere Error: {str(e)[:100]}"
 
+@trace_methods
 class SmartBudgetAdvisor:
     def __init__(self, analyzer=None):
         self.analyzer = analyzer
 
+    def project_fixed_costs(self, recurring):
+        """Monthly cost (paise) of the recurring charges that are still active, biggest first"""
+        items = sorted((r for r in recurring if r.get('active')), key=lambda r: r['monthly_cost'], reverse=True)
+        return {'monthly_total': sum(r['monthly_cost'] for r in items), 'items': items}
+
     def generate_budget_insights(self, user_data, patterns):
         insights = []
 
@@ -130,6 +185,15 @@ class SmartBudgetAdvisor:
                 'suggestion': f"Use envelope budgeting for {top_cat}, set monthly limits, and review weekly."
             })
 
+        fixed = self.project_fixed_costs(patterns.get('recurring', []))
+        if fixed['items']:
+            names = ", ".join(r['category'] for r in fixed['items'][:3])
+            insights.append({
+                'type': 'insight',
+                'message': f"🔁 About {format_inr(fixed['monthly_total'], 0)}/month goes to {len(fixed['items'])} recurring charge{'s' if len(fixed['items']) > 1 else ''}",
+                'suggestion': f"Biggest: {names}. Cancel subscriptions you no longer use and renegotiate bills before they renew."
+            })
+
         unusual = patterns.get('unusual_expenses', [])
         if unusual:
             count = len(unusual)
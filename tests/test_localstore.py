@@ -0,0 +1,20 @@
+from benchmarks.backend import InMemoryClient
+from database import ExpenseManager
+from localstore import LocalReplicaClient
+
+
+def test_own_writes_pick_up_server_anomaly_flags(tmp_path):
+    remote = InMemoryClient()
+    replica = LocalReplicaClient(remote, str(tmp_path / "replica.db"))
+    manager = ExpenseManager()
+    manager.supabase = replica
+    user = "a@example.com"
+    for day in range(1, 21):
+        manager.add_expense(user, "Food", 20000 + (day % 4) * 5000, f"2025-01-{day:02d}")
+    replica.sync_user(user)  # The server scores a write against the statistics before it
+    manager.add_expense(user, "Food", 9000000, "2025-01-25")
+    replica.sync_user(user)
+
+    assert [(r["amount_paise"], r["severity"]) for r in manager.get_flagged_expenses(user)] == [(9000000, "high")]
+    row = replica.table("expenses").select("*").eq("user_email", user).eq("date", "2025-01-25").execute().data[0]
+    assert row["remote_id"] is not None
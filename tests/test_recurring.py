@@ -0,0 +1,24 @@
+import pandas as pd
+from recurring import detect_recurring
+
+
+def _charges(rows):
+    return pd.DataFrame(rows, columns=['category', 'amount_paise', 'date']).assign(
+        date=lambda df: pd.to_datetime(df['date']))
+
+
+def test_same_price_subscriptions_on_different_days_are_separate_series():
+    rows = [("Entertainment", 49900, f"2025-{month:02d}-{day:02d}") for month in range(1, 9) for day in (5, 10)]
+    found = detect_recurring(_charges(rows), today="2025-08-20")
+
+    assert len(found) == 2
+    assert set(found['cadence']) == {"monthly"}
+    assert round(found['monthly_cost'].sum() / 100) == 998
+
+
+def test_a_series_matched_on_the_whole_bucket_is_reported_once():
+    rows = [("Rent", 2500000, f"2025-{month:02d}-01") for month in range(1, 9)]
+    found = detect_recurring(_charges(rows), today="2025-08-20")
+
+    assert len(found) == 1
+    assert found.loc[0, 'occurrences'] == 8
@@ -0,0 +1,81 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Streamlit runs each session's script in its own thread, so one trace per thread
+_local = threading.local()
+
+class Span:
+    __slots__ = ("name", "start", "duration", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.children = []
+
+    def close(self):
+        self.duration = time.perf_counter() - self.start
+
+def start_trace(name="rerun"):
+    """Begin collecting spans on this thread"""
+    root = Span(name)
+    _local.stack = [root]
+    return root
+
+def finish_trace():
+    """Stop collecting and return the root span (None if no trace was running)"""
+    stack = getattr(_local, "stack", None)
+    _local.stack = None
+    if not stack:
+        return None
+    root = stack[0]
+    root.close()
+    return root
+
+@contextmanager
+def span(name):
+    """Time a block as a child of the current span; free when no trace is running"""
+    stack = getattr(_local, "stack", None)
+    if not stack:
+        yield None
+        return
+    current = Span(name)
+    stack[-1].children.append(current)
+    stack.append(current)
+    try:
+        yield current
+    finally:
+        current.close()
+        stack.pop()
+
+def traced(name=None):
+    """Decorator form of span(); defaults to the function's qualified name"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not getattr(_local, "stack", None):
+                return func(*args, **kwargs)
+            with span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def trace_methods(cls):
+    """Class decorator that wraps every non-dunder method with traced()"""
+    for attr, value in list(vars(cls).items()):
+        if callable(value) and not attr.startswith("__"):
+            setattr(cls, attr, traced(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+def flatten(root):
+    """Yield (depth, name, milliseconds) for a span tree, depth-first"""
+    pending = [(0, root)]
+    while pending:
+        depth, node = pending.pop()
+        duration = node.duration if node.duration is not None else time.perf_counter() - node.start
+        yield depth, node.name, duration * 1000
+        pending.extend((depth + 1, child) for child in reversed(node.children))
@@ -0,0 +1,94 @@
+"""
+Time-windowed spending trends.
+
+Spending is laid out as one total per day, newest first and zero-filled, so
+quiet days count as quiet rather than being skipped. For each window w in
+WINDOWS the last w days are compared with the w days before them, as a ratio
+of rolling sums and as a ratio of exponentially weighted daily means (span w)
+taken now and w days ago. The input is normally the daily_summaries rollup
+(migrations/009), one row per day, so building the matrix costs O(days);
+raw expense rows work too, at O(rows), until that migration is applied.
+Everything after that is array arithmetic over at most HORIZON_DAYS columns
+per user.
+
+Windows end on the latest expense day, so a user who hasn't logged anything
+for a while isn't told their spending collapsed.
+"""
+import numpy as np
+import pandas as pd
+
+WINDOWS = (7, 30, 90)
+HEADLINE_WINDOWS = (30, 7)  # spending_trend: first of these with enough history
+HORIZON_DAYS = 730  # Older days weigh under e^-16 in the 90-day EWMA
+WINDOW_COLUMNS = [f"{kind}_{w}" for w in WINDOWS for kind in ("rolling", "ewma")]
+
+def daily_matrix(df, by=None):
+    """
+    Daily totals of a frame with date (datetime64) and amount_paise columns: expense
+    rows, or daily totals already (several rows on one day are simply added up).
+
+    Returns (keys, matrix, history_days): matrix[i, k] is key i's total k days
+    before its latest expense day, history_days[i] how many days its history
+    spans. Without `by` there is a single row and keys is [None].
+    """
+    day = df['date'].dt.normalize()
+    if by is None:
+        codes = np.zeros(len(df), dtype=np.int64)
+        keys = [None]
+        last, first = day.max(), day.min()
+        history_days = np.array([(last - first).days + 1])
+    else:
+        groups = day.groupby(df[by], observed=True)
+        codes = groups.ngroup().to_numpy()
+        bounds = groups.agg(['min', 'max'])
+        keys = list(bounds.index)
+        last = groups.transform('max')
+        history_days = ((bounds['max'] - bounds['min']).dt.days + 1).to_numpy()
+
+    age = (last - day).dt.days.to_numpy()
+    keep = age < HORIZON_DAYS
+    # float64 weights are exact for any realistic per-day total in paise
+    flat = np.bincount(codes[keep] * HORIZON_DAYS + age[keep], weights=df['amount_paise'].to_numpy()[keep],
+                       minlength=len(keys) * HORIZON_DAYS)
+    return keys, flat.reshape(len(keys), HORIZON_DAYS), history_days
+
+def _ratio(recent, previous):
+    # Same convention as before: no earlier spending reads as "no change"
+    return np.where(previous > 0, recent / np.where(previous > 0, previous, 1), 1.0)
+
+def window_ratios(matrix, history_days):
+    """{column: ratio per row} for WINDOW_COLUMNS; NaN where history is shorter than two windows"""
+    totals = np.cumsum(matrix, axis=1)  # totals[:, k] = spend over the newest k + 1 days
+    horizon = matrix.shape[1]
+    ages = np.arange(horizon)
+    ratios = {}
+    for w in WINDOWS:
+        enough = history_days >= 2 * w
+        recent = totals[:, w - 1]
+        previous = totals[:, 2 * w - 1] - recent
+        ratios[f"rolling_{w}"] = np.where(enough, _ratio(recent, previous), np.nan)
+
+        # Weights are normalised over the days each user's history covers, like pandas' ewm(adjust=True)
+        weights = (1 - 2 / (w + 1)) ** ages
+        covered = np.cumsum(weights)
+        now = (matrix * weights).sum(axis=1) / covered[np.clip(history_days, 1, horizon) - 1]
+        then = (matrix[:, w:] * weights[:-w]).sum(axis=1) / covered[np.clip(history_days - w, 1, horizon - w) - 1]
+        ratios[f"ewma_{w}"] = np.where(enough, _ratio(now, then), np.nan)
+    return ratios
+
+def spending_trends(df, by=None):
+    """
+    One row per `by` value (a single row without it): the per-window ratios
+    in WINDOW_COLUMNS plus `trend`, the headline ratio used by insights (the
+    first of HEADLINE_WINDOWS with enough history, otherwise 1).
+    """
+    keys, matrix, history_days = daily_matrix(df, by)
+    trends = pd.DataFrame(window_ratios(matrix, history_days), index=keys)[WINDOW_COLUMNS]
+    headline = pd.Series(1.0, index=trends.index)
+    for w in reversed(HEADLINE_WINDOWS):
+        headline = trends[f"rolling_{w}"].where(trends[f"rolling_{w}"].notna(), headline)
+    return trends.assign(trend=headline)
+
+def to_payload(row):
+    """(trend, {column: ratio or None}) for patterns payloads"""
+    return float(row['trend']), {col: None if np.isnan(row[col]) else float(row[col]) for col in WINDOW_COLUMNS}
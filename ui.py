@@ -1,9 +1,12 @@
 import streamlit as st
-from auth import AuthManager
-from database import ExpenseManager, IncomeManager, init_supabase
-from synbot import SynBot
+import importlib
+import tracing
+import metrics
+import health
+from auth import AuthManager, forget_session, remember_session, session_cookie
+from database import ExpenseManager, IncomeManager, begin_request, init_supabase, use_local_replica
+from money import format_inr
 from pages.login import login_page
-from pages import dashboard, add_transaction, view_expenses, ai_coach, smart_analytics
 from datetime import datetime
 
 # Page configuration
@@ -22,6 +25,15 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Data versions (cache keys) are read once per rerun
+begin_request()
+
+# Per-rerun timing for the opt-in performance panel
+if st.session_state.get("show_perf_panel"):
+    tracing.start_trace()
+else:
+    tracing.finish_trace()
+
 # Initialize session states
 for key, default in {
     "logged_in": False, 
@@ -39,37 +51,136 @@ for key, default in {
 
 # Initialize Supabase and managers
 supabase = init_supabase()
+data_client = use_local_replica()  # Before the managers below pick up the client
 
 if not supabase:
-    st.error("❌ Database connection failed. Please check your Supabase configuration.")
-    st.info("Contact support if this issue persists.")
-    st.stop()
+    if not data_client:
+        st.error("❌ Database connection failed. Please check your Supabase configuration.")
+        st.info("Contact support if this issue persists.")
+        st.stop()
+    # Expenses and income keep working from the local replica; sign-in needs the database
+    st.warning("⚠️ Can't reach the database. Working offline: entries are saved on this device and sync when the connection returns.")
+
+@st.cache_resource
+def start_metrics_exporter():
+    """Expose Prometheus metrics once per process if configured in secrets"""
+    port = st.secrets.get("metrics_port")
+    path = st.secrets.get("metrics_file")
+    if port:
+        metrics.start_http_server(int(port))
+    if path:
+        metrics.start_file_dumper(path)
+    return True
+
+start_metrics_exporter()
+
+# In-process analytics precompute if configured; otherwise run `python manage.py precompute --loop`
+if st.secrets.get("precompute_interval"):
+    from precompute import start_background_precompute
+    start_background_precompute(supabase, int(st.secrets["precompute_interval"]))
 
 # Initialize managers with Supabase
 auth = AuthManager(supabase)  # ✅ Updated: Pass supabase client to auth manager
 exp_mgr = ExpenseManager()
 inc_mgr = IncomeManager()
-synbot = SynBot()
 
-# Page navigation
+@st.cache_resource
+def get_synbot():
+    # Built on first use so the login screen never pays for cohere/yfinance
+    from synbot import SynBot
+    return SynBot()
+
+# Tokens used to travel in the URL; drop any left in old bookmarks
+if "session" in st.query_params:
+    del st.query_params["session"]
+
+# Restore a session from the signed token in the session cookie so a browser refresh skips the login form.
+# Cookies are read once per browser session, so this only runs on its first script run.
+if not st.session_state.get("session_checked"):
+    st.session_state.session_checked = True
+    if not st.session_state.logged_in and session_cookie():
+        restored_email = auth.verify_session_token(session_cookie())
+        if restored_email:
+            st.session_state.logged_in = True
+            st.session_state.user_email = restored_email
+        else:
+            st.session_state.forget_session = True
+
+# Login and logout leave the cookie change for the next run, since both end in st.rerun()
+if "session_token" in st.session_state:
+    remember_session(st.session_state.pop("session_token"))
+if st.session_state.pop("forget_session", False):
+    forget_session()
+
+def _page(module_name, func_name):
+    """Import a page module the first time it is navigated to"""
+    return getattr(importlib.import_module(module_name), func_name)
+
+# Page navigation (modules and their plotting/LLM dependencies load lazily)
 pages = {
-    "Dashboard": lambda: dashboard.dashboard_page(exp_mgr, inc_mgr),
-    "Add Transaction": lambda: add_transaction.add_transaction_page(exp_mgr, inc_mgr),
-    "View Expenses": lambda: view_expenses.view_expenses_page(exp_mgr, inc_mgr),
-    "Smart Analytics": lambda: smart_analytics.smart_analytics_page(exp_mgr, inc_mgr),
-    "NeuroBot": lambda: ai_coach.ai_coach_page(exp_mgr, inc_mgr, synbot),
+    "Dashboard": lambda: _page("pages.dashboard", "dashboard_page")(exp_mgr, inc_mgr),
+    "Add Transaction": lambda: _page("pages.add_transaction", "add_transaction_page")(exp_mgr, inc_mgr),
+    "View Expenses": lambda: _page("pages.view_expenses", "view_expenses_page")(exp_mgr, inc_mgr),
+    "Smart Analytics": lambda: _page("pages.smart_analytics", "smart_analytics_page")(exp_mgr, inc_mgr),
+    "NeuroBot": lambda: _page("pages.ai_coach", "ai_coach_page")(exp_mgr, inc_mgr, get_synbot()),
 }
 
 def test_database_connection():
-    """Test database connection"""
-    try:
-        if supabase:
-            result = supabase.table("expenses").select("count", count="exact").execute()
-            return True, f"✅ Database connected! {result.count} expenses in database"
-        else:
-            return False, "❌ Supabase client not initialized"
-    except Exception as e:
-        return False, f"❌ Database connection failed: {str(e)}"
+    """Cached health check: ping latency, pool state and the user's expense count from the month index"""
+    status = health.check_health(supabase)
+    if not status["ok"]:
+        return False, f"❌ Database connection failed: {status['error']}"
+    pool = status["pool"]
+    pool_text = f"{pool['open']} open / {pool['idle']} idle" if pool else "n/a"
+    user_count = sum(exp_mgr.get_month_index(st.session_state.user_email).values())
+    return True, (
+        f"✅ Database connected ({status['latency_ms']} ms, checked {status['checked_at'][11:]})\n\n"
+        f"Connection pool: {pool_text}\n\n"
+        f"Your expenses: ~{user_count:,}"
+    )
+
+def render_sync_status(client, user):
+    """Local replica state: online/offline, changes waiting to upload and changes the server refused"""
+    if not hasattr(client, "pending_count"):
+        return
+    pending = client.pending_count()
+    status = client.status
+    if client.is_loading(user):
+        st.sidebar.caption("⬇️ Downloading your data…")
+    elif status["error"] or not status["online"]:
+        st.sidebar.caption(f"📴 Offline — {pending} change{'s' if pending != 1 else ''} saved on this device")
+    elif pending:
+        st.sidebar.caption(f"🔄 Syncing {pending} change{'s' if pending != 1 else ''}…")
+    elif status["last_sync"]:
+        st.sidebar.caption(f"☁️ Synced at {status['last_sync']:%H:%M:%S}")
+
+    parked = [e for e in client.parked() if e["user_email"] in (user, None)]
+    if parked:
+        with st.sidebar.expander(f"⚠️ {len(parked)} change{'s' if len(parked) != 1 else ''} failed to sync"):
+            for entry in parked:
+                row = entry["data"] or {}
+                what = (f"{row.get('date', '')} {row.get('category', entry['tbl'])} {format_inr(row['amount_paise'])}"
+                        if "amount_paise" in row else f"Delete from {entry['tbl']}")
+                st.error(f"{what}: {entry['last_error']}")
+                col1, col2 = st.columns(2)
+                if col1.button("Retry", key=f"retry_sync_{entry['seq']}"):
+                    client.retry_parked(entry["seq"])
+                    st.rerun()
+                if col2.button("Discard", key=f"discard_sync_{entry['seq']}"):
+                    client.discard_parked(entry["seq"])
+                    st.rerun()
+
+def render_perf_panel(container):
+    """Show the span tree and timings collected during this rerun"""
+    root = tracing.finish_trace()
+    if not root:
+        return
+    tree = "\n".join(
+        f"{ms:9.1f} ms  {'  ' * depth}{name}" for depth, name, ms in tracing.flatten(root)
+    )
+    with container.expander("⏱️ Last rerun timings", expanded=True):
+        st.caption(f"Total: {root.duration * 1000:.1f} ms")
+        st.code(tree, language=None)
 
 def main_app():
     # Custom CSS for better UI
@@ -137,6 +248,11 @@ def main_app():
         else:
             st.sidebar.error(message)
     
+    render_sync_status(exp_mgr.supabase, st.session_state.user_email)
+
+    st.sidebar.checkbox("⏱️ Performance panel", key="show_perf_panel", help="Show where time went on each rerun")
+    perf_panel = st.sidebar.container()
+    
     # User info button
     if st.sidebar.button("👤 Account Info"):
         user_info = auth.get_user_info(st.session_state.user_email)
@@ -151,14 +267,18 @@ def main_app():
     # Logout button
     st.sidebar.markdown("---")
     if st.sidebar.button("🚪 Logout", type="primary", use_container_width=True):
-        # Clear all session state
+        # Revoke this user's session tokens everywhere, then clear all session state
+        auth.revoke_sessions(st.session_state.user_email)
         for key in list(st.session_state.keys()):
             del st.session_state[key]
+        st.query_params.clear()
         
         # Reset to logged out state
         st.session_state.logged_in = False
         st.session_state.user_email = ""
         st.session_state.page = "Dashboard"
+        st.session_state.session_checked = True
+        st.session_state.forget_session = True
         
         st.sidebar.success("👋 Successfully logged out!")
         st.rerun()
@@ -170,6 +290,9 @@ def main_app():
         st.error(f"Error loading page: {str(e)}")
         st.info("Please try refreshing the page or contact support.")
 
+    if st.session_state.get("show_perf_panel"):
+        render_perf_panel(perf_panel)
+
 # Main application logic
 if st.session_state.logged_in:
     main_app()
@@ -1,11 +1,10 @@
-import pandas as pd
-from fpdf import FPDF
 import io
 
 def export_df_to_csv(df):
     return df.to_csv(index=False).encode('utf-8')
 
 def export_df_to_pdf(df, title="Expense Report"):
+    from fpdf import FPDF  # Deferred: only needed when a PDF is actually exported
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", size=14)
@@ -55,6 +54,81 @@ def export_df_to_pdf(df, title="Expense Report"):
         
         return pdf_buffer.getvalue()
 
+def parse_dates(values):
+    """
+    CSV date cells as ISO 'YYYY-MM-DD' strings, NaN where a cell isn't a real date.
+    ISO dates (with or without a time) are read as such; anything else is read day
+    first, the way Indian bank exports write it (15/01/2025).
+    """
+    import pandas as pd
+    raw = pd.Series(values).astype(str).str.strip()
+    iso = raw.str.extract(r'^(\d{4}-\d{1,2}-\d{1,2})(?:[T ]|$)', expand=False)
+    parsed = pd.to_datetime(iso, errors="coerce", format="%Y-%m-%d")
+    other = iso.isna()
+    if other.any():
+        parsed[other] = pd.to_datetime(raw[other], errors="coerce", format="mixed", dayfirst=True)
+    return parsed.dt.strftime("%Y-%m-%d")
+
+def import_transactions_csv(file_content, user, exp_mgr, inc_mgr, categorizer=None, predictor=None):
+    """
+    Import expenses (Category, Amount, Date) or income (Amount, Date) from CSV text.
+    Bank exports with a Description column instead of (or as well as) Category are
+    imported as expenses, with missing categories filled in by the categorizer's
+    rules and then by predictor(descriptions, amounts, dates) if one is given.
+    Amounts are read as rupees and stored as paise; dates are sent as ISO dates.
+    Returns (kind, count_added, count_skipped); raises ValueError if the columns
+    aren't recognised.
+    """
+    import pandas as pd
+    from categorizer import get_categorizer, UNCATEGORIZED
+    from money import to_paise_series
+    df_import = pd.read_csv(file_content)
+    skipped = 0
+
+    if {"Amount", "Date"}.issubset(set(df_import.columns)):
+        # Rows with a missing or invalid date or a non-numeric/non-positive amount are skipped
+        df_import["Amount"] = pd.to_numeric(df_import["Amount"], errors="coerce")
+        df_import["Date"] = parse_dates(df_import["Date"].where(df_import["Date"].notna(), ""))
+        valid = (df_import["Amount"] > 0) & df_import["Date"].notna()
+        skipped = int((~valid).sum())
+        df_import = df_import[valid].copy()
+        df_import["Paise"] = to_paise_series(df_import["Amount"]).astype("int64")
+
+    if "Description" in df_import.columns:
+        guessed = (categorizer or get_categorizer()).categorize(df_import["Description"])
+        if "Category" in df_import.columns:
+            blank = df_import["Category"].isna() | (df_import["Category"].astype(str).str.strip() == "")
+            df_import["Category"] = df_import["Category"].where(~blank, guessed)
+        else:
+            df_import["Category"] = guessed
+
+    if predictor is not None and "Category" in df_import.columns and {"Amount", "Date"}.issubset(set(df_import.columns)):
+        unknown = (df_import["Category"].isna() | (df_import["Category"].astype(str).str.strip() == "")
+                   | (df_import["Category"] == UNCATEGORIZED))
+        if unknown.any():
+            descriptions = df_import.loc[unknown, "Description"] if "Description" in df_import.columns else [""] * int(unknown.sum())
+            predicted = predictor(descriptions, df_import.loc[unknown, "Paise"], df_import.loc[unknown, "Date"])
+            if predicted is not None:
+                df_import.loc[unknown, "Category"] = predicted
+
+    # Determine if import is expense or income by presence of 'Category' column
+    if "Category" in df_import.columns:
+        if not {"Category", "Amount", "Date"}.issubset(set(df_import.columns)):
+            raise ValueError("Expense import must have columns: Category, Amount, Date")
+        skipped += int(df_import["Category"].isna().sum())
+        df_import = df_import[df_import["Category"].notna()]
+        columns = [df_import["Category"].astype(str), df_import["Paise"], df_import["Date"]]
+        if "Description" in df_import.columns:
+            columns.append(df_import["Description"].fillna("").astype(str))
+        rows = zip(*columns)
+        return "expense", exp_mgr.add_expenses_bulk(user, rows), skipped
+
+    if {"Amount", "Date"}.issubset(set(df_import.columns)):
+        rows = zip(df_import["Paise"], df_import["Date"])
+        return "income", inc_mgr.add_income_bulk(user, rows), skipped
+
+    raise ValueError("CSV format not recognized for import.")
+
 def show_confirmation_dialog(action_type, details=""):
     """Show a confirmation dialog for destructive actions"""
     import streamlit as st
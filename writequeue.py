@@ -0,0 +1,184 @@
+"""
+Durable write-behind queue for manual entries.
+
+The Add Transaction form appends the row to a local SQLite file and returns
+immediately; a background thread flushes queued rows to Supabase in batches.
+Rows are sent strictly in the order they were queued: a flush takes the
+oldest contiguous run of same-table rows, and if it fails nothing behind it
+is sent until it succeeds. After MAX_ATTEMPTS a batch is parked as failed so
+the rest of the queue can move on; the UI lists failures for retry or discard.
+Every row gets a row_id when it is queued and is upserted on it
+(migrations/003_row_ids.sql), so resending a batch whose insert landed but
+whose response was lost doesn't duplicate it.
+
+With the local replica on (localstore.py) the Add Transaction form writes to
+the replica directly: its journal already is a durable write-behind queue.
+This queue then only drains rows left in it from before.
+
+One flusher per queue file: run a single app process per write_queue_path.
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import streamlit as st
+from metrics import execute_query
+from money import to_paise
+
+DEFAULT_QUEUE_PATH = "neurobux_queue.db"
+FLUSH_BATCH_SIZE = 100
+FLUSH_INTERVAL_SECONDS = 2
+MAX_ATTEMPTS = 5
+MAX_BACKOFF_SECONDS = 60
+
+TABLES = {"expense": "expenses", "income": "income"}
+
+_SCHEMA = """
+create table if not exists pending_writes (
+    seq         integer primary key autoincrement,
+    user_email  text    not null,
+    kind        text    not null,
+    payload     text    not null,
+    status      text    not null default 'pending',  -- 'pending' | 'failed'
+    attempts    integer not null default 0,
+    last_error  text,
+    enqueued_at text    not null
+)
+"""
+
+class WriteQueue:
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        self.path = path
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_flush = None  # {'at', 'sent'} or {'at', 'error'}
+        with self._db() as conn:
+            conn.execute(_SCHEMA)
+            # Rows queued before row_ids were assigned get theirs now, once, so retries reuse it
+            for row in conn.execute("select seq from pending_writes where json_extract(payload, '$.row_id') is null").fetchall():
+                conn.execute("update pending_writes set payload = json_set(payload, '$.row_id', ?) where seq = ?",
+                             (str(uuid.uuid4()), row['seq']))
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, user, kind, payload):
+        """Queue one row for the expenses/income table; returns its sequence number"""
+        if kind not in TABLES:
+            raise ValueError(f"Unknown transaction kind: {kind}")
+        payload = dict(payload, row_id=str(uuid.uuid4()))
+        with self._db() as conn:
+            cur = conn.execute(
+                "insert into pending_writes (user_email, kind, payload, enqueued_at) values (?, ?, ?, ?)",
+                (user, kind, json.dumps(payload), datetime.now().isoformat()))
+            seq = cur.lastrowid
+        self._wake.set()
+        return seq
+
+    def _rows(self, where, params):
+        with self._db() as conn:
+            rows = conn.execute(f"select * from pending_writes where {where} order by seq", params).fetchall()
+        return [dict(r, payload=json.loads(r['payload'])) for r in rows]
+
+    def pending(self, user):
+        return self._rows("user_email = ? and status = 'pending'", (user,))
+
+    def failures(self, user):
+        return self._rows("user_email = ? and status = 'failed'", (user,))
+
+    def retry(self, seq):
+        with self._db() as conn:
+            conn.execute("update pending_writes set status = 'pending', attempts = 0 where seq = ?", (seq,))
+        self._wake.set()
+
+    def discard(self, seq):
+        """Drop a failed row for good"""
+        with self._db() as conn:
+            conn.execute("delete from pending_writes where seq = ? and status = 'failed'", (seq,))
+
+    def _next_batch(self, conn):
+        """Oldest pending rows that share a table, in queue order"""
+        rows = conn.execute("select * from pending_writes where status = 'pending' order by seq limit ?",
+                            (FLUSH_BATCH_SIZE,)).fetchall()
+        batch = []
+        for row in rows:
+            if row['kind'] != rows[0]['kind']:
+                break
+            batch.append(row)
+        return batch
+
+    def flush_once(self, client):
+        """Send one batch; returns rows sent (0 when empty), raises on failure"""
+        from database import bump_data_version
+        # No transaction is held across the HTTP call, so enqueue never waits on the network
+        with self._db() as conn:
+            batch = self._next_batch(conn)
+        if not batch:
+            return 0
+        table = TABLES[batch[0]['kind']]
+        seqs = [row['seq'] for row in batch]
+        marks = ",".join("?" * len(seqs))
+        data = [_upgrade(dict(json.loads(row['payload']), user_email=row['user_email'])) for row in batch]
+        try:
+            execute_query(client.table(table).upsert(data, on_conflict="row_id"), table, "upsert")
+        except Exception as e:
+            with self._db() as conn:
+                conn.execute(f"update pending_writes set attempts = attempts + 1, last_error = ? where seq in ({marks})",
+                             [str(e)] + seqs)
+                conn.execute(f"update pending_writes set status = 'failed' where seq in ({marks}) and attempts >= ?",
+                             seqs + [MAX_ATTEMPTS])
+            raise
+        with self._db() as conn:
+            conn.execute(f"delete from pending_writes where seq in ({marks})", seqs)
+        for user in {row['user_email'] for row in batch}:
+            bump_data_version(user)
+        return len(batch)
+
+    def _run(self, client):
+        backoff = FLUSH_INTERVAL_SECONDS
+        while not self._stop.is_set():
+            try:
+                sent = 0
+                while (n := self.flush_once(client)):
+                    sent += n
+                if sent:
+                    self.last_flush = {'at': datetime.now(), 'sent': sent}
+                backoff = FLUSH_INTERVAL_SECONDS
+            except Exception as e:
+                self.last_flush = {'at': datetime.now(), 'error': str(e)}
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            self._wake.wait(backoff)
+            self._wake.clear()
+
+    def start(self, client):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, args=(client,), name="write-behind-flush", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+def _upgrade(payload):
+    """Entries queued before amounts moved to paise (migrations/008) carry rupees in 'amount'"""
+    if 'amount' in payload and 'amount_paise' not in payload:
+        payload['amount_paise'] = to_paise(payload.pop('amount'))
+    return payload
+
+@st.cache_resource
+def get_write_queue(_client):
+    """Process-wide queue with its flush thread running"""
+    return WriteQueue(st.secrets.get("write_queue_path", DEFAULT_QUEUE_PATH)).start(_client)